@@ -0,0 +1,18 @@
+-- Row count and last-altered time per raw source table, printed as JSON.
+-- Used by scripts/pipeline_state.py (run_pipeline_enhanced.py --changed-only)
+-- to detect source tables whose data changed since the last run.
+
+{% macro source_fingerprints(source_schema='raw') %}
+  {% set query %}
+    SELECT LOWER(table_name) AS table_name, row_count, last_altered
+    FROM {{ var('raw_database', target.database) }}.information_schema.tables
+    WHERE LOWER(table_schema) = LOWER('{{ source_schema }}')
+  {% endset %}
+  {% set fingerprints = {} %}
+  {% if execute %}
+    {% for row in run_query(query).rows %}
+      {% do fingerprints.update({row[0]: {'row_count': row[1], 'last_altered': row[2] | string}}) %}
+    {% endfor %}
+  {% endif %}
+  {{ print(tojson(fingerprints)) }}
+{% endmacro %}
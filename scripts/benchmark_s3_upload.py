@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+S3 Upload Throughput Benchmark
+Generates synthetic CMS-shaped IPPS CSVs at several scales and uploads them
+through s3_upload.upload_file_config against a local S3 stand-in, sweeping
+part size, concurrency and compression. Writes a JSON report with MB/s, peak
+RSS and S3 request counts per configuration, and can fail on regressions
+against an earlier report.
+
+Each trial runs in its own process so peak RSS is measured per configuration.
+By default trials use moto's in-process S3 mock; pass --endpoint-url to target
+a running local S3 server (moto_server, MinIO) instead.
+
+Usage:
+    python scripts/benchmark_s3_upload.py
+    python scripts/benchmark_s3_upload.py --scales 1 5 10 25 50 --compression none gzip zstd
+    python scripts/benchmark_s3_upload.py --baseline data/benchmarks/baseline.json --max-regression 0.15
+"""
+
+import argparse
+import csv
+import itertools
+import json
+import os
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+
+MB = 1024 * 1024
+IPPS_ROWS = 146427  # rows in the real ipps_charges.csv
+BENCHMARK_DIR = os.getenv('S3_BENCHMARK_DIR', 'data/benchmarks')
+
+IPPS_HEADER = [
+    'Rndrng_Prvdr_CCN', 'Rndrng_Prvdr_Org_Name', 'Rndrng_Prvdr_St', 'Rndrng_Prvdr_City',
+    'Rndrng_Prvdr_State_Abrvtn', 'Rndrng_Prvdr_State_FIPS', 'Rndrng_Prvdr_Zip5',
+    'Rndrng_Prvdr_RUCA', 'Rndrng_Prvdr_RUCA_Desc', 'DRG_Cd', 'DRG_Desc', 'Tot_Dschrgs',
+    'Avg_Submtd_Cvrd_Chrg', 'Avg_Tot_Pymt_Amt', 'Avg_Mdcr_Pymt_Amt'
+]
+STATES = [
+    ('AL', '01'), ('AZ', '04'), ('CA', '06'), ('CO', '08'), ('FL', '12'), ('GA', '13'),
+    ('IL', '17'), ('MA', '25'), ('MI', '26'), ('NY', '36'), ('NC', '37'), ('OH', '39'),
+    ('PA', '42'), ('TN', '47'), ('TX', '48'), ('WA', '53')
+]
+RUCA = [
+    ('1', 'Metropolitan area core: primary flow within an urbanized area of 50,000 and greater'),
+    ('4', 'Micropolitan area core: primary flow within an urban cluster of 10,000 through 49,999'),
+    ('10', 'Rural areas: primary flow to a tract outside a UA or UC')
+]
+DRG_WORDS = ['SEPTICEMIA', 'HEART FAILURE', 'PNEUMONIA', 'SIMPLE', 'RESPIRATORY', 'KIDNEY',
+             'INFECTION', 'PROCEDURES', 'DISORDERS', 'MAJOR', 'JOINT', 'REPLACEMENT']
+
+
+def generate_ipps_csv(path, rows, seed=42):
+    """Write a synthetic IPPS CSV with the real file's columns and value shapes."""
+    rng = random.Random(seed)
+    hospitals = []
+    for i in range(3000):
+        state, fips = rng.choice(STATES)
+        ruca, ruca_desc = rng.choice(RUCA)
+        hospitals.append([
+            f'{10000 + i * 7:06d}',
+            f"{rng.choice(['St. Mary', 'Regional', 'University', 'Memorial', 'Baptist'])} "
+            f"{rng.choice(['Medical Center', 'Hospital', 'Health System'])} {i}",
+            f'{rng.randint(1, 9999)} {rng.choice(["Main", "Oak", "Park", "Hospital"])} St',
+            rng.choice(['Springfield', 'Franklin', 'Greenville', 'Madison', 'Clinton']),
+            state, fips, f'{rng.randint(10000, 99999)}', ruca, ruca_desc
+        ])
+    drgs = [
+        (f'{code:03d}', ' '.join(rng.sample(DRG_WORDS, 4)) + rng.choice([' WITH MCC', ' WITH CC', '']))
+        for code in range(1, 800, 3)
+    ]
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(IPPS_HEADER)
+        for _ in range(rows):
+            charge = rng.uniform(5000, 400000)
+            payment = charge * rng.uniform(0.15, 0.4)
+            writer.writerow(rng.choice(hospitals) + list(rng.choice(drgs)) + [
+                rng.randint(11, 900),
+                f'{charge:,.2f}',
+                f'{payment:,.2f}',
+                f'{payment * rng.uniform(0.7, 0.95):,.2f}'
+            ])
+
+
+def ensure_dataset(work_dir, scale, seed=42):
+    """Return the synthetic CSV for a scale, generating it on first use."""
+    rows = int(IPPS_ROWS * scale)
+    path = Path(work_dir) / f'ipps_charges_{scale}x.csv'
+    if not path.exists():
+        print(f"Generating {path} ({rows:,} rows)...")
+        generate_ipps_csv(path, rows, seed=seed)
+    return path, rows
+
+
+class RequestCounter:
+    """Count S3 API calls (and HTTP sends, including retries) made by a boto3 client."""
+
+    def __init__(self, client):
+        self.operations = Counter()
+        self.http_requests = 0
+        self._lock = threading.Lock()
+        client.meta.events.register('before-call.s3', self._on_call)
+        client.meta.events.register('before-send.s3', self._on_send)
+
+    def _on_call(self, model, **kwargs):
+        with self._lock:
+            self.operations[model.name] += 1
+
+    def _on_send(self, **kwargs):
+        with self._lock:
+            self.http_requests += 1
+
+
+def peak_rss_bytes():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def run_trial(trial):
+    """Upload one file with one configuration (runs in a child process)."""
+    mock = None
+    if not os.getenv('S3_ENDPOINT_URL'):
+        from moto import mock_aws
+        mock = mock_aws()
+        mock.start()
+
+    import logging
+    import s3_upload
+    logging.getLogger().setLevel(logging.WARNING)
+
+    s3_client = s3_upload.initialize_s3_client()
+    counter = RequestCounter(s3_client)
+    transfer_config = s3_upload.build_transfer_config(
+        part_size_mb=trial['part_size_mb'], max_concurrency=trial['max_concurrency']
+    )
+    file_config = {
+        'local_path': trial['local_path'],
+        's3_key': f"benchmarks/{Path(trial['local_path']).name}",
+        'description': 'Upload benchmark',
+        'expected_rows': trial['rows'],
+        'expected_size_mb': 0
+    }
+
+    start = time.perf_counter()
+    result = s3_upload.upload_file_config(
+        s3_client, file_config, transfer_config,
+        compression=None if trial['compression'] == 'none' else trial['compression']
+    )
+    elapsed = time.perf_counter() - start
+
+    if mock is not None:
+        mock.stop()
+    source_bytes = Path(trial['local_path']).stat().st_size
+    return {
+        'status': result['status'],
+        'seconds': round(elapsed, 3),
+        'mb_per_second': round(source_bytes / MB / elapsed, 2) if elapsed else None,
+        'source_bytes': source_bytes,
+        'wire_bytes': result.get('compressed_bytes') or result.get('bytes'),
+        'peak_rss_bytes': peak_rss_bytes(),
+        'requests': dict(counter.operations),
+        'http_requests': counter.http_requests
+    }
+
+
+def run_trial_subprocess(trial):
+    completed = subprocess.run(
+        [sys.executable, __file__, '--trial', json.dumps(trial)],
+        capture_output=True, text=True
+    )
+    if completed.returncode != 0:
+        return {'status': 'failed', 'error': completed.stderr.strip().splitlines()[-1:]}
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def summarize(config, runs):
+    """Median figures over the repeats of one configuration."""
+    ok = [r for r in runs if r['status'] == 'success']
+    summary = dict(config)
+    summary['repeats'] = len(runs)
+    summary['failures'] = len(runs) - len(ok)
+    if ok:
+        summary.update({
+            'mb_per_second': round(statistics.median(r['mb_per_second'] for r in ok), 2),
+            'seconds': round(statistics.median(r['seconds'] for r in ok), 3),
+            'peak_rss_mb': round(statistics.median(r['peak_rss_bytes'] for r in ok) / MB, 1),
+            'source_bytes': ok[0]['source_bytes'],
+            'wire_bytes': ok[0]['wire_bytes'],
+            'requests': ok[0]['requests'],
+            'total_requests': sum(ok[0]['requests'].values()),
+            'http_requests': ok[0]['http_requests']
+        })
+    return summary
+
+
+def config_id(result):
+    return (f"{result['scale']}x/part{result['part_size_mb']}MB/"
+            f"conc{result['max_concurrency']}/{result['compression']}")
+
+
+def compare_to_baseline(results, baseline, max_regression):
+    """Return regressions in throughput or peak RSS beyond max_regression."""
+    previous = {config_id(r): r for r in baseline['results'] if 'mb_per_second' in r}
+    regressions = []
+    for result in results:
+        before = previous.get(config_id(result))
+        if not before or 'mb_per_second' not in result:
+            continue
+        if result['mb_per_second'] < before['mb_per_second'] * (1 - max_regression):
+            regressions.append(f"{config_id(result)}: {before['mb_per_second']} -> "
+                               f"{result['mb_per_second']} MB/s")
+        if result['peak_rss_mb'] > before['peak_rss_mb'] * (1 + max_regression):
+            regressions.append(f"{config_id(result)}: peak RSS {before['peak_rss_mb']} -> "
+                               f"{result['peak_rss_mb']} MB")
+        if result['total_requests'] > before['total_requests']:
+            regressions.append(f"{config_id(result)}: {before['total_requests']} -> "
+                               f"{result['total_requests']} S3 requests")
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark s3_upload.py transfer settings')
+    parser.add_argument('--scales', type=float, nargs='+', default=[1, 10],
+                        help='File sizes as multiples of the real ipps file (e.g. 1 5 10 25 50)')
+    parser.add_argument('--part-size-mb', type=int, nargs='+', default=[8, 16, 64])
+    parser.add_argument('--max-concurrency', type=int, nargs='+', default=[4, 10])
+    parser.add_argument('--compression', nargs='+', default=['none', 'gzip'],
+                        choices=['none', 'gzip', 'zstd'])
+    parser.add_argument('--repeats', type=int, default=3, help='Runs per configuration (median is reported)')
+    parser.add_argument('--endpoint-url', default=os.getenv('S3_ENDPOINT_URL'),
+                        help='Local S3 server to upload to (default: in-process moto mock)')
+    parser.add_argument('--work-dir', default=BENCHMARK_DIR,
+                        help='Where synthetic CSVs and reports are written')
+    parser.add_argument('--output', default=None, help='Report path (default: <work-dir>/s3_upload_<timestamp>.json)')
+    parser.add_argument('--baseline', default=None, help='Earlier report to compare against')
+    parser.add_argument('--max-regression', type=float, default=0.15,
+                        help='Allowed relative drop in MB/s or growth in peak RSS vs the baseline')
+    parser.add_argument('--trial', default=None, help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.trial:
+        print(json.dumps(run_trial(json.loads(args.trial))))
+        return
+
+    if args.endpoint_url:
+        os.environ['S3_ENDPOINT_URL'] = args.endpoint_url
+    for var in ('AWS_ACCESS_KEY_ID', 'AWS_SECRET_ACCESS_KEY'):
+        os.environ.setdefault(var, 'testing')
+    os.environ.setdefault('PIPELINE_TRACING', '0')  # keep trial traces out of logs/traces
+
+    results = []
+    for scale in args.scales:
+        local_path, rows = ensure_dataset(args.work_dir, scale)
+        for part_size_mb, max_concurrency, compression in itertools.product(
+                args.part_size_mb, args.max_concurrency, args.compression):
+            config = {
+                'scale': scale,
+                'rows': rows,
+                'part_size_mb': part_size_mb,
+                'max_concurrency': max_concurrency,
+                'compression': compression
+            }
+            trial = dict(config, local_path=str(local_path))
+            summary = summarize(config, [run_trial_subprocess(trial) for _ in range(args.repeats)])
+            results.append(summary)
+            if 'mb_per_second' in summary:
+                print(f"{config_id(summary):<40} {summary['mb_per_second']:>8.2f} MB/s  "
+                      f"{summary['peak_rss_mb']:>7.1f} MB RSS  {summary['total_requests']:>5} requests")
+            else:
+                print(f"{config_id(summary):<40} FAILED")
+
+    report = {
+        'generated_at': datetime.now(timezone.utc).isoformat(),
+        'backend': args.endpoint_url or 'moto (in-process)',
+        'python': sys.version.split()[0],
+        'results': results
+    }
+    output = Path(args.output or Path(args.work_dir) / f"s3_upload_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"\nReport: {output}")
+
+    failed = [config_id(r) for r in results if r['failures']]
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare_to_baseline(results, json.load(f), args.max_regression)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+    if failed:
+        print(f"Failed configurations: {', '.join(failed)}")
+    if failed or regressions:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
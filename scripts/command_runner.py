@@ -0,0 +1,140 @@
+"""
+Streaming command runner for the pipeline scripts
+Runs a shell command and forwards its stdout and stderr line by line to the
+console and a rotating log file as they are produced. Only a bounded tail of
+the output is kept in memory, for the error summary, so long and chatty
+commands (dbt run on the full project) show live progress at flat memory.
+"""
+
+import logging
+import os
+import subprocess
+import sys
+import threading
+from collections import deque
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from tracing import child_env
+
+COMMAND_LOG_PATH = os.getenv('PIPELINE_COMMAND_LOG', 'logs/pipeline_commands.log')
+COMMAND_LOG_MAX_BYTES = int(os.getenv('PIPELINE_COMMAND_LOG_MAX_MB', '10')) * 1024 * 1024
+COMMAND_LOG_BACKUPS = 5
+TAIL_LINES = 200
+MAX_LINE_CHARS = 64 * 1024  # longer lines are forwarded in pieces
+
+console_lock = threading.Lock()
+_logger_lock = threading.Lock()
+_usage = threading.local()
+
+
+def reset_usage():
+    _usage.last = None
+    _usage.stderr = None
+
+
+def last_usage() -> Optional[Dict]:
+    """Resource usage of the last command streamed by this thread (None if unavailable)
+
+    Keys: cpu_seconds (user + system) and peak_rss_bytes, covering the command
+    and the processes it waited for.
+    """
+    return getattr(_usage, 'last', None)
+
+
+def last_stderr() -> Optional[str]:
+    """Tail of the stderr of the last command streamed by this thread (None if none ran)
+
+    Only what the command wrote to stderr, for classifying failures without
+    matching ordinary progress output.
+    """
+    return getattr(_usage, 'stderr', None)
+
+
+def _wait(process: subprocess.Popen) -> int:
+    """Wait for the process, recording its rusage where the platform offers wait4"""
+    if not hasattr(os, 'wait4'):
+        return process.wait()
+    _, status, rusage = os.wait4(process.pid, 0)
+    process.returncode = os.waitstatus_to_exitcode(status)
+    peak = rusage.ru_maxrss if sys.platform == 'darwin' else rusage.ru_maxrss * 1024
+    _usage.last = {
+        'cpu_seconds': round(rusage.ru_utime + rusage.ru_stime, 3),
+        'peak_rss_bytes': peak
+    }
+    return process.returncode
+
+
+def get_command_logger(log_path: str = COMMAND_LOG_PATH) -> logging.Logger:
+    """Logger writing command output to a size-rotated file (configured once per path)."""
+    logger = logging.getLogger(f'pipeline.commands.{log_path}')
+    with _logger_lock:
+        if not logger.handlers:
+            Path(log_path).parent.mkdir(parents=True, exist_ok=True)
+            handler = RotatingFileHandler(
+                log_path, maxBytes=COMMAND_LOG_MAX_BYTES, backupCount=COMMAND_LOG_BACKUPS, encoding='utf-8'
+            )
+            handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+            logger.addHandler(handler)
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+    return logger
+
+
+def _forward(stream, label: str, console, logger: logging.Logger, tail: deque,
+             stream_tail: Optional[deque] = None):
+    prefix = f"[{label}] " if label else ""
+    for line in iter(lambda: stream.readline(MAX_LINE_CHARS), ''):
+        line = line.rstrip('\n')
+        tail.append(line)
+        if stream_tail is not None:
+            stream_tail.append(line)
+        logger.info(f"[{label or '-'}] {line}")
+        with console_lock:
+            print(f"{prefix}{line}", file=console, flush=True)
+    stream.close()
+
+
+def stream_command(command: str, label: Optional[str] = None, log_path: str = COMMAND_LOG_PATH,
+                   tail_lines: int = TAIL_LINES) -> Tuple[int, str]:
+    """Run a shell command, streaming its output; returns (exit code, output tail).
+
+    stdout goes to the console's stdout and stderr to its stderr, both to the
+    log file. ``label`` prefixes console lines so output from steps running
+    in parallel stays attributable. The tail holds the last ``tail_lines``
+    lines of both streams in arrival order. CPU time and peak RSS of the
+    command are available afterwards from ``last_usage()``, and the tail of
+    stderr alone from ``last_stderr()``. The command inherits the current
+    trace span as TRACEPARENT.
+    """
+    reset_usage()
+    logger = get_command_logger(log_path)
+    logger.info(f"[{label or '-'}] $ {command}")
+    tail: deque = deque(maxlen=tail_lines)
+    stderr_tail: deque = deque(maxlen=tail_lines)
+
+    process = subprocess.Popen(
+        command,
+        shell=True,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        errors='replace',
+        bufsize=1,
+        env=child_env()
+    )
+    readers = [
+        threading.Thread(target=_forward, args=(process.stdout, label, sys.stdout, logger, tail), daemon=True),
+        threading.Thread(target=_forward, args=(process.stderr, label, sys.stderr, logger, tail, stderr_tail),
+                         daemon=True)
+    ]
+    for reader in readers:
+        reader.start()
+    returncode = _wait(process)
+    for reader in readers:
+        reader.join()
+
+    _usage.stderr = '\n'.join(stderr_tail)
+    logger.info(f"[{label or '-'}] exit code {returncode}")
+    return returncode, '\n'.join(tail)
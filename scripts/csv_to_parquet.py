@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+CMS CSV to Parquet Conversion
+Streams raw CMS CSV files in bounded-memory blocks into typed, compressed,
+partitioned Parquet for the silver layer.
+
+Usage: python scripts/csv_to_parquet.py data/ipps_charges.csv [output_dir]
+"""
+
+import csv
+import shutil
+import sys
+from pathlib import Path
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pa_csv
+    import pyarrow.dataset as ds
+except ImportError:
+    pa = None
+
+MB = 1024 * 1024
+DEFAULT_BLOCK_SIZE_MB = 8
+DEFAULT_COMPRESSION = 'zstd'
+
+# Per-dataset typing and partitioning. Columns not listed stay as strings,
+# matching the VARCHAR raw tables in snowflake_setup.sql. Type rules mirror the
+# casts done in the dbt staging models so they only have to happen once.
+PARQUET_DATASETS = {
+    'ipps_charges': {
+        'partition_by': ['Rndrng_Prvdr_State_Abrvtn'],
+        'integer_columns': ['Tot_Dschrgs'],
+        'currency_columns': ['Avg_Submtd_Cvrd_Chrg', 'Avg_Tot_Pymt_Amt', 'Avg_Mdcr_Pymt_Amt'],
+        'decimal_columns': [],
+        'date_columns': []
+    },
+    'hospital_general_info': {
+        'partition_by': [],
+        'integer_columns': [],
+        'currency_columns': [],
+        'decimal_columns': [],
+        'date_columns': []
+    },
+    'readmissions': {
+        'partition_by': ['State'],
+        'integer_columns': ['Number of Discharges', 'Number of Readmissions'],
+        'currency_columns': [],
+        'decimal_columns': [
+            'Excess Readmission Ratio',
+            'Predicted Readmission Rate',
+            'Expected Readmission Rate'
+        ],
+        'date_columns': ['Start Date', 'End Date']
+    }
+}
+
+NUMBER_PATTERN = r'^-?[0-9]+(\.[0-9]+)?$'
+# Numbers are parsed at this scale, then rounded to the column's scale;
+# digits past it cannot change a rounding to 4 or fewer decimals
+PARSE_SCALE = 12
+
+
+def require_pyarrow():
+    """Exit with a helpful message if pyarrow is not installed."""
+    if pa is None:
+        print("ERROR: pyarrow not installed. Install with: pip install pyarrow")
+        sys.exit(1)
+
+
+def read_csv_header(local_path):
+    """Return the column names from the first line of a CSV file."""
+    with open(local_path, 'r', newline='', encoding='utf-8-sig') as f:
+        return next(csv.reader(f))
+
+
+def build_target_schema(columns, spec):
+    """Build the typed Arrow schema for a dataset."""
+    fields = []
+    for name in columns:
+        if name in spec['integer_columns']:
+            fields.append(pa.field(name, pa.int64()))
+        elif name in spec['currency_columns']:
+            fields.append(pa.field(name, pa.decimal128(18, 2)))
+        elif name in spec['decimal_columns']:
+            fields.append(pa.field(name, pa.decimal128(10, 4)))
+        elif name in spec['date_columns']:
+            fields.append(pa.field(name, pa.date32()))
+        else:
+            fields.append(pa.field(name, pa.string()))
+    return pa.schema(fields)
+
+
+def parse_number(values, target_type, strip_currency=False):
+    """Parse a string column into a numeric type; unparseable values become null.
+
+    Equivalent to the NULLIF/REPLACE/CAST chains in the staging models:
+    values with more decimals than the target scale are rounded half away
+    from zero, as Snowflake's CAST does, instead of failing the batch.
+    """
+    cleaned = pc.utf8_trim_whitespace(values)
+    if strip_currency:
+        cleaned = pc.replace_substring_regex(cleaned, pattern=r'[$,]', replacement='')
+    is_number = pc.and_(
+        pc.fill_null(pc.match_substring_regex(cleaned, pattern=NUMBER_PATTERN), False),
+        # Too many integer digits for the parse decimal: null, like other unparseable values
+        pc.fill_null(pc.match_substring_regex(cleaned, pattern=rf'^-?[0-9]{{1,{38 - PARSE_SCALE}}}(\.|$)'), False)
+    )
+    cleaned = pc.if_else(is_number, cleaned, pa.scalar(None, pa.string()))
+    cleaned = pc.replace_substring_regex(cleaned, pattern=rf'(\.[0-9]{{{PARSE_SCALE}}})[0-9]+$',
+                                         replacement=r'\1')
+    # Parse as a wide decimal (exact, unlike float64), round to the target scale, then narrow
+    parsed = pc.cast(cleaned, pa.decimal128(38, PARSE_SCALE))
+    scale = 0 if pa.types.is_integer(target_type) else target_type.scale
+    rounded = pc.round(parsed, ndigits=scale, round_mode='half_towards_infinity')
+    return pc.cast(rounded, target_type)
+
+
+def convert_batch(batch, schema, spec):
+    """Convert one all-string record batch to the target schema."""
+    arrays = []
+    for field in schema:
+        values = batch.column(batch.schema.get_field_index(field.name))
+        if field.name in spec['currency_columns']:
+            values = parse_number(values, field.type, strip_currency=True)
+        elif field.name in spec['integer_columns'] or field.name in spec['decimal_columns']:
+            values = parse_number(values, field.type)
+        elif field.name in spec['date_columns']:
+            values = pc.cast(
+                pc.strptime(values, format='%m/%d/%Y', unit='s', error_is_null=True),
+                pa.date32()
+            )
+        arrays.append(values)
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def convert_csv_to_parquet(local_path, output_dir, dataset=None,
+                           block_size_mb=DEFAULT_BLOCK_SIZE_MB,
+                           compression=DEFAULT_COMPRESSION):
+    """Stream a CMS CSV into a typed, partitioned Parquet dataset.
+
+    The CSV is read ``block_size_mb`` at a time, so memory stays bounded
+    regardless of file size. Any existing output in ``output_dir`` is replaced.
+
+    Returns a dict with row, file and byte counts for the written dataset.
+    """
+    require_pyarrow()
+    local_path = Path(local_path)
+    output_dir = Path(output_dir)
+    dataset = dataset or local_path.stem
+    spec = PARQUET_DATASETS.get(dataset, PARQUET_DATASETS['hospital_general_info'])
+
+    columns = read_csv_header(local_path)
+    schema = build_target_schema(columns, spec)
+
+    reader = pa_csv.open_csv(
+        local_path,
+        read_options=pa_csv.ReadOptions(block_size=int(block_size_mb * MB), encoding='utf8'),
+        convert_options=pa_csv.ConvertOptions(
+            column_types={name: pa.string() for name in columns},
+            strings_can_be_null=True
+        )
+    )
+
+    row_count = 0
+
+    def batches():
+        nonlocal row_count
+        for batch in reader:
+            row_count += batch.num_rows
+            yield convert_batch(batch, schema, spec)
+
+    if output_dir.exists():
+        shutil.rmtree(output_dir)
+
+    partition_by = [name for name in spec['partition_by'] if name in columns]
+    partitioning = None
+    if partition_by:
+        partitioning = ds.partitioning(
+            pa.schema([schema.field(name) for name in partition_by]),
+            flavor='hive'
+        )
+
+    ds.write_dataset(
+        batches(),
+        output_dir,
+        schema=schema,
+        format='parquet',
+        partitioning=partitioning,
+        basename_template='part-{i}.parquet',
+        file_options=ds.ParquetFileFormat().make_write_options(compression=compression),
+        existing_data_behavior='overwrite_or_ignore'
+    )
+
+    files = sorted(p for p in output_dir.rglob('*.parquet'))
+    return {
+        'dataset': dataset,
+        'rows': row_count,
+        'files': [str(p.relative_to(output_dir)).replace('\\', '/') for p in files],
+        'bytes': sum(p.stat().st_size for p in files),
+        'source_bytes': local_path.stat().st_size,
+        'compression': compression
+    }
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python scripts/csv_to_parquet.py <csv_path> [output_dir]")
+        sys.exit(1)
+
+    local_path = Path(sys.argv[1])
+    output_dir = Path(sys.argv[2]) if len(sys.argv) > 2 else Path('data/parquet') / local_path.stem
+
+    print("=" * 60)
+    print(f"Converting {local_path} to Parquet")
+    print("=" * 60)
+
+    stats = convert_csv_to_parquet(local_path, output_dir)
+
+    ratio = stats['source_bytes'] / stats['bytes'] if stats['bytes'] else 0
+    print(f"Rows: {stats['rows']:,}")
+    print(f"Files: {len(stats['files'])}")
+    print(f"Size: {stats['bytes'] / MB:.2f} MB ({ratio:.1f}x smaller than CSV)")
+    print(f"Output: {output_dir}")
+
+
+if __name__ == "__main__":
+    main()
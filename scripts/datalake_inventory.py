@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+Data Lake Inventory
+Keeps a local SQLite index of every object in the data lake bucket and answers
+"what is in bronze/silver/gold and how big is it" without listing S3.
+
+Usage:
+    python scripts/datalake_inventory.py refresh --full    # parallel listing of the whole bucket
+    python scripts/datalake_inventory.py refresh           # incremental, from new manifests
+    python scripts/datalake_inventory.py sizes
+    python scripts/datalake_inventory.py latest [--dataset ipps_charges]
+    python scripts/datalake_inventory.py stale --days 30
+"""
+
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from s3_upload import BRONZE_LAYER, GOLD_LAYER, MB, S3_BUCKET_NAME, SILVER_LAYER, initialize_s3_client
+
+logger = logging.getLogger(__name__)
+
+INVENTORY_PATH = os.getenv('DATALAKE_INVENTORY_PATH', 'data/datalake_inventory.db')
+DEFAULT_MAX_WORKERS = int(os.getenv('DATALAKE_INVENTORY_MAX_WORKERS', '8'))
+DEFAULT_SHARD_DEPTH = 3
+
+# Layer root -> the path segment after it names the dataset
+LAYER_ROOTS = [
+    (f'{BRONZE_LAYER}/', 'bronze'),
+    (f'{SILVER_LAYER}/', 'silver'),
+    (f'{GOLD_LAYER}/marts/', 'gold'),
+    (f'{GOLD_LAYER}/', 'gold'),
+    ('metadata/', 'metadata'),
+    ('logs/', 'logs')
+]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS objects (
+    key TEXT PRIMARY KEY,
+    layer TEXT NOT NULL,
+    dataset TEXT,
+    size INTEGER NOT NULL,
+    etag TEXT,
+    last_modified TEXT NOT NULL,
+    indexed_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_objects_layer ON objects (layer);
+CREATE INDEX IF NOT EXISTS idx_objects_dataset ON objects (layer, dataset, last_modified);
+CREATE INDEX IF NOT EXISTS idx_objects_last_modified ON objects (last_modified);
+
+CREATE TABLE IF NOT EXISTS processed_manifests (
+    key TEXT PRIMARY KEY,
+    processed_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS refreshes (
+    refreshed_at TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    objects INTEGER NOT NULL,
+    seconds REAL NOT NULL
+);
+"""
+
+
+def open_inventory(path=INVENTORY_PATH):
+    """Open (and create if needed) the inventory database."""
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def classify_key(key):
+    """Return (layer, dataset) for an S3 key."""
+    for root, layer in LAYER_ROOTS:
+        if key.startswith(root):
+            rest = key[len(root):]
+            dataset = rest.split('/', 1)[0] if '/' in rest else None
+            return layer, dataset
+    return 'other', None
+
+
+def to_row(key, size, etag, last_modified, indexed_at):
+    layer, dataset = classify_key(key)
+    if isinstance(last_modified, datetime):
+        last_modified = last_modified.astimezone(timezone.utc).isoformat()
+    return (key, layer, dataset, size, etag, last_modified, indexed_at)
+
+
+def upsert_objects(conn, rows):
+    conn.executemany(
+        "INSERT OR REPLACE INTO objects (key, layer, dataset, size, etag, last_modified, indexed_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        rows
+    )
+
+
+# -- Listing -------------------------------------------------------------
+
+def discover_shards(s3_client, prefix='', depth=DEFAULT_SHARD_DEPTH):
+    """Split the bucket into prefixes that can be listed independently.
+
+    Walks ``depth`` levels of "folders" with delimiter listings. Returns
+    ``(shards, loose_objects)`` where loose_objects are objects found directly
+    at a walked level (e.g. folder markers) that no shard will cover.
+    """
+    loose = []
+    frontier = [prefix]
+    for _ in range(depth):
+        next_frontier = []
+        for current in frontier:
+            paginator = s3_client.get_paginator('list_objects_v2')
+            for page in paginator.paginate(Bucket=S3_BUCKET_NAME, Prefix=current, Delimiter='/'):
+                loose.extend(page.get('Contents', []))
+                next_frontier.extend(p['Prefix'] for p in page.get('CommonPrefixes', []))
+        frontier = next_frontier
+        if not frontier:
+            break
+    return frontier, loose
+
+
+def list_shard(s3_client, prefix):
+    """List every object under one prefix."""
+    objects = []
+    paginator = s3_client.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=S3_BUCKET_NAME, Prefix=prefix):
+        objects.extend(page.get('Contents', []))
+    return objects
+
+
+def list_prefixes_parallel(s3_client, prefixes, max_workers=DEFAULT_MAX_WORKERS):
+    """List several prefixes concurrently and return all objects found."""
+    objects = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for shard_objects in executor.map(lambda p: list_shard(s3_client, p), prefixes):
+            objects.extend(shard_objects)
+    return objects
+
+
+def refresh_full(conn, s3_client, max_workers=DEFAULT_MAX_WORKERS, depth=DEFAULT_SHARD_DEPTH):
+    """Rebuild the index from a parallel, prefix-sharded listing of the bucket."""
+    shards, loose = discover_shards(s3_client, depth=depth)
+    logger.info(f"Listing {len(shards)} prefix shards with {max_workers} workers...")
+    objects = loose + list_prefixes_parallel(s3_client, shards, max_workers=max_workers)
+
+    indexed_at = datetime.now(timezone.utc).isoformat()
+    with conn:
+        conn.execute("DELETE FROM objects")
+        upsert_objects(conn, [
+            to_row(o['Key'], o['Size'], o.get('ETag'), o['LastModified'], indexed_at) for o in objects
+        ])
+        # Everything the manifests describe is now covered by the listing
+        manifest_keys = [o['Key'] for o in objects if is_manifest_key(o['Key'])]
+        conn.executemany(
+            "INSERT OR REPLACE INTO processed_manifests (key, processed_at) VALUES (?, ?)",
+            [(key, indexed_at) for key in manifest_keys]
+        )
+    return len(objects)
+
+
+# -- Incremental refresh from manifests ------------------------------------
+
+def is_manifest_key(key):
+    name = key.rsplit('/', 1)[-1]
+    return key.startswith('metadata/') and name.endswith('.json') and 'manifest' in name
+
+
+def refresh_incremental(conn, s3_client, max_workers=DEFAULT_MAX_WORKERS):
+    """Apply manifests written since the last refresh.
+
+    Bronze uploads are indexed straight from the manifest entries. Silver and
+    gold outputs are recorded per prefix in their manifests, so only those
+    prefixes are relisted. Only the small metadata/ prefix is listed to find
+    new manifests.
+    """
+    processed = {row[0] for row in conn.execute("SELECT key FROM processed_manifests")}
+    manifest_objects = [o for o in list_shard(s3_client, 'metadata/') if is_manifest_key(o['Key'])]
+    new_manifests = sorted(
+        (o for o in manifest_objects if o['Key'] not in processed),
+        key=lambda o: o['LastModified']
+    )
+    indexed_at = datetime.now(timezone.utc).isoformat()
+    rows = []
+    relist_prefixes = set()
+
+    for obj in new_manifests:
+        body = s3_client.get_object(Bucket=S3_BUCKET_NAME, Key=obj['Key'])['Body'].read()
+        manifest = json.loads(body)
+        rows.append(to_row(obj['Key'], obj['Size'], obj.get('ETag'), obj['LastModified'], indexed_at))
+
+        for entry in manifest.get('files', []):
+            if entry.get('status') != 'success' or entry.get('bytes') is None:
+                continue
+            size = entry.get('compressed_bytes') or entry['bytes']
+            rows.append(to_row(entry['s3_key'], size, entry.get('etag'),
+                               manifest['upload_timestamp'], indexed_at))
+        for entry in manifest.get('silver', []) + manifest.get('tables', []):
+            if entry.get('status') == 'success' and entry.get('s3_prefix'):
+                relist_prefixes.add(entry['s3_prefix'])
+
+    relisted = list_prefixes_parallel(s3_client, sorted(relist_prefixes), max_workers=max_workers)
+    with conn:
+        for prefix in relist_prefixes:
+            conn.execute("DELETE FROM objects WHERE substr(key, 1, ?) = ?", (len(prefix), prefix))
+        upsert_objects(conn, rows)
+        upsert_objects(conn, [
+            to_row(o['Key'], o['Size'], o.get('ETag'), o['LastModified'], indexed_at) for o in relisted
+        ])
+        conn.executemany(
+            "INSERT OR REPLACE INTO processed_manifests (key, processed_at) VALUES (?, ?)",
+            [(o['Key'], indexed_at) for o in new_manifests]
+        )
+    logger.info(f"Applied {len(new_manifests)} new manifests, relisted {len(relist_prefixes)} prefixes")
+    return len(rows) + len(relisted)
+
+
+# -- Queries ---------------------------------------------------------------
+
+def size_by_layer(conn):
+    return conn.execute(
+        "SELECT layer, COUNT(*), SUM(size) FROM objects GROUP BY layer ORDER BY SUM(size) DESC"
+    ).fetchall()
+
+
+def latest_versions(conn, dataset=None):
+    """Most recent object per (layer, dataset)."""
+    sql = (
+        "SELECT layer, dataset, key, size, MAX(last_modified) FROM objects "
+        "WHERE dataset IS NOT NULL AND key NOT LIKE '%/.keep' "
+    )
+    params = []
+    if dataset:
+        sql += "AND dataset = ? "
+        params.append(dataset)
+    sql += "GROUP BY layer, dataset ORDER BY layer, dataset"
+    return conn.execute(sql, params).fetchall()
+
+
+def stale_objects(conn, days=30, layer=None):
+    """Objects not modified in the last ``days`` days, oldest first."""
+    cutoff = (datetime.now(timezone.utc) - timedelta(days=days)).isoformat()
+    sql = "SELECT key, layer, size, last_modified FROM objects WHERE last_modified < ? AND key NOT LIKE '%/.keep' "
+    params = [cutoff]
+    if layer:
+        sql += "AND layer = ? "
+        params.append(layer)
+    sql += "ORDER BY last_modified"
+    return conn.execute(sql, params).fetchall()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Index and query the data lake bucket')
+    parser.add_argument('--db', default=INVENTORY_PATH, help='Inventory SQLite file')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    refresh = subparsers.add_parser('refresh', help='Update the index from S3')
+    refresh.add_argument('--full', action='store_true', help='Relist the whole bucket')
+    refresh.add_argument('--max-workers', type=int, default=DEFAULT_MAX_WORKERS)
+    refresh.add_argument('--shard-depth', type=int, default=DEFAULT_SHARD_DEPTH,
+                         help='Folder levels used to split the bucket into listing shards')
+
+    subparsers.add_parser('sizes', help='Object count and size per layer')
+
+    latest = subparsers.add_parser('latest', help='Latest object per dataset')
+    latest.add_argument('--dataset', default=None)
+
+    stale = subparsers.add_parser('stale', help='Objects not modified recently')
+    stale.add_argument('--days', type=int, default=30)
+    stale.add_argument('--layer', default=None)
+
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    conn = open_inventory(args.db)
+    start = time.perf_counter()
+
+    if args.command == 'refresh':
+        s3_client = initialize_s3_client()
+        if args.full or not conn.execute("SELECT 1 FROM refreshes LIMIT 1").fetchone():
+            count = refresh_full(conn, s3_client, max_workers=args.max_workers, depth=args.shard_depth)
+            mode = 'full'
+        else:
+            count = refresh_incremental(conn, s3_client, max_workers=args.max_workers)
+            mode = 'incremental'
+        elapsed = time.perf_counter() - start
+        with conn:
+            conn.execute(
+                "INSERT INTO refreshes (refreshed_at, mode, objects, seconds) VALUES (?, ?, ?, ?)",
+                (datetime.now(timezone.utc).isoformat(), mode, count, round(elapsed, 3))
+            )
+        print(f"{mode.capitalize()} refresh indexed {count:,} objects in {elapsed:.2f}s")
+
+    elif args.command == 'sizes':
+        print(f"{'Layer':<10} {'Objects':>10} {'Size (MB)':>12}")
+        for layer, count, size in size_by_layer(conn):
+            print(f"{layer:<10} {count:>10,} {(size or 0) / MB:>12.2f}")
+
+    elif args.command == 'latest':
+        for layer, dataset, key, size, last_modified in latest_versions(conn, args.dataset):
+            print(f"{layer:<8} {dataset:<28} {last_modified}  {size / MB:>9.2f} MB  {key}")
+
+    elif args.command == 'stale':
+        rows = stale_objects(conn, args.days, args.layer)
+        for key, layer, size, last_modified in rows:
+            print(f"{last_modified}  {layer:<8} {size / MB:>9.2f} MB  {key}")
+        print(f"{len(rows):,} objects older than {args.days} days")
+
+    if args.command != 'refresh':
+        print(f"({(time.perf_counter() - start) * 1000:.1f} ms)")
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
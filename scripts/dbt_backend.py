@@ -0,0 +1,99 @@
+"""
+In-process dbt execution for the pipeline runners
+Calls dbt through its Python API (dbtRunner, dbt-core >= 1.5) inside the
+runner's own process. The project is parsed once and the resulting manifest
+is handed to every later invocation, so run/test/docs steps skip the parse a
+fresh `dbt` process would repeat.
+"""
+
+import json
+import shlex
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# Commands that do not need (or must run before) a parsed project
+NO_MANIFEST_COMMANDS = ('deps', 'clean', 'debug', 'parse')
+
+
+class InProcessDbt:
+    """Run dbt commands in this process, reusing one parsed manifest.
+
+    dbt does not support concurrent invocations in one process, so calls are
+    serialized; non-dbt steps can still run alongside them.
+    """
+
+    def __init__(self):
+        from dbt.cli.main import dbtRunner
+        self._runner_class = dbtRunner
+        self._lock = threading.Lock()
+        self.manifest = None
+        self.parse_seconds: Optional[float] = None
+        self.reused: List[str] = []
+
+    def parse(self):
+        """Parse the project once; later invocations reuse the manifest."""
+        start = time.perf_counter()
+        result = self._runner_class().invoke(['parse'])
+        if not result.success:
+            raise RuntimeError(f"dbt parse failed: {result.exception}")
+        self.manifest = result.result
+        self.parse_seconds = time.perf_counter() - start
+        print(f"📦 Parsed dbt project in {self.parse_seconds:.1f}s (manifest reused by later steps)")
+
+    def invoke(self, command: str) -> Tuple[bool, str]:
+        """Run a `dbt ...` command line; returns (success, error text).
+
+        On failure the error text is the exception, or else the messages of
+        the failed nodes, one `unique_id: message` line each.
+        """
+        args = shlex.split(command)
+        if args and args[0] == 'dbt':
+            args = args[1:]
+
+        with self._lock:
+            if args[0] not in NO_MANIFEST_COMMANDS:
+                if self.manifest is None:
+                    self.parse()
+                self.reused.append(command)
+                runner = self._runner_class(manifest=self.manifest)
+            else:
+                runner = self._runner_class()
+            result = runner.invoke(args)
+
+        if result.exception:
+            return False, str(result.exception)
+        if not result.success:
+            return False, '\n'.join(_failed_node_messages(result.result))
+        return True, ""
+
+    def parse_time_saved(self) -> Dict:
+        """Estimated parse time not spent: one parse per reusing step, minus the one we did."""
+        if self.parse_seconds is None:
+            return {'parse_seconds': None, 'steps_reusing_manifest': 0, 'seconds_saved': 0.0}
+        return {
+            'parse_seconds': round(self.parse_seconds, 3),
+            'steps_reusing_manifest': len(self.reused),
+            'per_step_seconds_saved': round(self.parse_seconds, 3),
+            'seconds_saved': round(self.parse_seconds * (len(self.reused) - 1), 3)
+        }
+
+
+def _failed_node_messages(execution_result) -> List[str]:
+    """`unique_id: message` of the failed nodes in a RunExecutionResult"""
+    messages = []
+    for r in getattr(execution_result, 'results', None) or []:
+        if str(getattr(r.status, 'value', r.status)) in ('error', 'fail', 'runtime error'):
+            messages.append(f"{r.node.unique_id}: {r.message}")
+    return messages
+
+
+def only_tests_failed(run_results_path: Path) -> bool:
+    """True when every failed node in run_results.json is a test (models all built)."""
+    if not run_results_path.exists():
+        return False
+    with open(run_results_path, 'r') as f:
+        results = json.load(f).get('results', [])
+    failures = [r for r in results if r.get('status') in ('error', 'fail', 'runtime error')]
+    return bool(failures) and all(r.get('unique_id', '').startswith('test.') for r in failures)
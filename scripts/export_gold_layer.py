@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+"""
+Gold Layer Export
+Unloads the marts tables to the S3 gold layer as partitioned Parquet.
+Tables export in parallel; per-table row and byte stats go into a manifest.
+
+Usage:
+    python scripts/export_gold_layer.py                      # Snowflake (dbt profile credentials)
+    python scripts/export_gold_layer.py --backend duckdb --duckdb-path marts.duckdb
+"""
+
+import argparse
+import json
+import logging
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from pathlib import Path
+
+import yaml
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+except ImportError:
+    print("ERROR: pyarrow not installed. Install with: pip install pyarrow")
+    sys.exit(1)
+
+from manifest_store import append_manifest_records
+from profiling import span
+from s3_upload import GOLD_LAYER, MB, S3_BUCKET_NAME, initialize_s3_client
+
+logger = logging.getLogger(__name__)
+
+# Marts tables to export and how to partition them in the gold layer. Facts are
+# partitioned by state (joined from dim_geography): geography_key is a hash of
+# state/city/zip with thousands of values, far too many directories to write.
+STATE_FROM_GEOGRAPHY = (
+    "SELECT f.*, g.state_abbreviation FROM {schema}.{table} f "
+    "LEFT JOIN (SELECT DISTINCT geography_key, state_abbreviation FROM {schema}.dim_geography) g "
+    "ON f.geography_key = g.geography_key"
+)
+# States, DC, territories and the null partition, with headroom
+MAX_STATE_PARTITIONS = 100
+
+GOLD_EXPORT_TABLES = {
+    'fct_inpatient_charges': {'partition_by': ['state_abbreviation'], 'query': STATE_FROM_GEOGRAPHY,
+                              'max_partitions': MAX_STATE_PARTITIONS},
+    'fct_readmissions': {'partition_by': ['state_abbreviation'], 'query': STATE_FROM_GEOGRAPHY,
+                         'max_partitions': MAX_STATE_PARTITIONS},
+    'fct_hospital_summary': {'partition_by': []},
+    'fct_state_summary': {'partition_by': []},
+    'dim_hospitals': {'partition_by': []},
+    'dim_drg_codes': {'partition_by': []},
+    'dim_geography': {'partition_by': []},
+    'dim_dates': {'partition_by': []}
+}
+
+MARTS_SCHEMA = os.getenv('GOLD_EXPORT_SCHEMA', 'raw_marts')
+GOLD_EXPORT_WORK_DIR = os.getenv('GOLD_EXPORT_WORK_DIR', 'data/gold_export')
+DEFAULT_MAX_WORKERS = int(os.getenv('GOLD_EXPORT_MAX_WORKERS', '4'))
+BATCH_ROWS = 100_000
+
+
+def read_dbt_profiles():
+    """Read Snowflake credentials from the dbt profile"""
+    profiles_path = Path.home() / ".dbt" / "profiles.yml"
+    if not profiles_path.exists():
+        return None
+
+    try:
+        with open(profiles_path, 'r') as f:
+            profiles = yaml.safe_load(f)
+
+        if 'healthcare_analytics' in profiles:
+            dev = profiles['healthcare_analytics']['outputs'].get('dev', {})
+            return {
+                'account': dev.get('account', ''),
+                'user': dev.get('user', ''),
+                'password': dev.get('password', ''),
+                'database': dev.get('database', 'HEALTHCARE_ANALYTICS'),
+                'warehouse': dev.get('warehouse', 'transforming_wh'),
+                'role': dev.get('role', 'ACCOUNTADMIN')
+            }
+    except Exception as e:
+        logger.error(f"Could not read dbt profiles: {e}")
+
+    return None
+
+
+def create_connection_factory(backend, duckdb_path=None):
+    """Return a zero-argument function that opens one warehouse connection.
+
+    Each export worker opens its own connection so queries run concurrently.
+    """
+    if backend == 'duckdb':
+        import duckdb
+        root = duckdb.connect(duckdb_path or ':memory:', read_only=bool(duckdb_path))
+        return root.cursor
+
+    from sqlalchemy import create_engine
+    creds = read_dbt_profiles()
+    if not creds:
+        raise RuntimeError("Could not read Snowflake credentials from ~/.dbt/profiles.yml")
+    connection_string = (
+        f"snowflake://{creds['user']}:{creds['password']}@{creds['account']}/{creds['database']}"
+        f"?warehouse={creds['warehouse']}&role={creds['role']}"
+    )
+    engine = create_engine(connection_string)
+    return engine.raw_connection
+
+
+def iter_arrow_batches(connection, backend, sql):
+    """Yield Arrow record batches for a query without materializing the result."""
+    if backend == 'duckdb':
+        with span('sql.execute'):
+            reader = connection.execute(sql).fetch_record_batch(BATCH_ROWS)
+        yield from reader
+        return
+
+    cursor = connection.cursor()
+    try:
+        with span('sql.execute'):
+            cursor.execute(sql)
+        for table in cursor.fetch_arrow_batches():
+            yield from table.to_batches()
+    finally:
+        cursor.close()
+
+
+def normalize_batch(batch):
+    """Lower-case column names and widen integers to int64.
+
+    Snowflake returns upper-case names and may pick a different integer width
+    per batch; normalizing keeps one schema for the whole table.
+    """
+    arrays = []
+    fields = []
+    for field, column in zip(batch.schema, batch.columns):
+        if pa.types.is_integer(field.type) and field.type != pa.int64():
+            column = column.cast(pa.int64())
+        arrays.append(column)
+        fields.append(pa.field(field.name.lower(), column.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=pa.schema(fields))
+
+
+def upload_directory(s3_client, local_dir, s3_prefix):
+    """Upload every file under local_dir to s3_prefix and delete stale keys there.
+
+    Nothing is deleted when local_dir holds no files.
+    """
+    uploaded = set()
+    for path in sorted(local_dir.rglob('*.parquet')):
+        key = f"{s3_prefix}{path.relative_to(local_dir).as_posix()}"
+        with span('s3.upload_file'):
+            s3_client.upload_file(
+                str(path),
+                S3_BUCKET_NAME,
+                key,
+                ExtraArgs={
+                    'Metadata': {'data_layer': 'gold', 'file_type': 'parquet'},
+                    'ContentType': 'application/vnd.apache.parquet',
+                    'ServerSideEncryption': 'AES256'
+                }
+            )
+        uploaded.add(key)
+
+    if not uploaded:
+        # An empty export (empty source table, failed write) must not wipe the
+        # previous export: keep the existing objects until new files replace them
+        logger.warning(f"No files exported to {s3_prefix}; keeping its existing objects")
+        return [], 0
+
+    stale = []
+    paginator = s3_client.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=S3_BUCKET_NAME, Prefix=s3_prefix):
+        stale.extend(obj['Key'] for obj in page.get('Contents', []) if obj['Key'] not in uploaded)
+    for i in range(0, len(stale), 1000):
+        s3_client.delete_objects(
+            Bucket=S3_BUCKET_NAME,
+            Delete={'Objects': [{'Key': key} for key in stale[i:i + 1000]]}
+        )
+    return sorted(uploaded), len(stale)
+
+
+def export_table(connection_factory, backend, s3_client, table_name, schema=MARTS_SCHEMA,
+                 work_dir=GOLD_EXPORT_WORK_DIR, compression='zstd'):
+    """Export one marts table to the gold layer and return its stats."""
+    start = time.perf_counter()
+    spec = GOLD_EXPORT_TABLES.get(table_name, {'partition_by': []})
+    local_dir = Path(work_dir) / table_name
+    if local_dir.exists():
+        shutil.rmtree(local_dir)
+    local_dir.mkdir(parents=True)
+
+    connection = connection_factory()
+    try:
+        batches = (normalize_batch(b) for b in iter_arrow_batches(
+            connection, backend, spec.get('query', "SELECT * FROM {schema}.{table}").format(
+                schema=schema, table=table_name
+            )
+        ))
+        first = next(batches, None)
+        row_count = 0
+
+        if first is not None:
+            target_schema = first.schema
+
+            def counted():
+                nonlocal row_count
+                row_count += first.num_rows
+                yield first
+                for batch in batches:
+                    for cast_batch in pa.Table.from_batches([batch]).cast(target_schema).to_batches():
+                        row_count += cast_batch.num_rows
+                        yield cast_batch
+
+            partition_by = [c for c in spec['partition_by'] if c in target_schema.names]
+            ds.write_dataset(
+                counted(),
+                local_dir,
+                schema=target_schema,
+                format='parquet',
+                partitioning=partition_by or None,
+                partitioning_flavor='hive' if partition_by else None,
+                max_partitions=spec.get('max_partitions', 1024),
+                basename_template='part-{i}.parquet',
+                file_options=ds.ParquetFileFormat().make_write_options(compression=compression),
+                existing_data_behavior='overwrite_or_ignore'
+            )
+    finally:
+        connection.close()
+
+    s3_prefix = f"{GOLD_LAYER}/marts/{table_name}/"
+    keys, deleted = upload_directory(s3_client, local_dir, s3_prefix)
+    total_bytes = sum(p.stat().st_size for p in local_dir.rglob('*.parquet'))
+    elapsed = time.perf_counter() - start
+
+    if keys:
+        logger.info(f"✓ {table_name}: {row_count:,} rows, {len(keys)} files, "
+                    f"{total_bytes / MB:.2f} MB in {elapsed:.2f}s")
+    return {
+        'table': table_name,
+        # 'empty' is not a good manifest status, so current.json keeps pointing at the previous export
+        'status': 'success' if keys else 'empty',
+        's3_prefix': s3_prefix,
+        'rows': row_count,
+        'files': len(keys),
+        'bytes': total_bytes,
+        'stale_objects_deleted': deleted,
+        'seconds': round(elapsed, 3)
+    }
+
+
+def export_tables(connection_factory, backend, s3_client, tables, max_workers=DEFAULT_MAX_WORKERS, **kwargs):
+    """Export tables in parallel; failures are recorded per table, not raised."""
+    results = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(export_table, connection_factory, backend, s3_client, table, **kwargs): table
+            for table in tables
+        }
+        for future in as_completed(futures):
+            table = futures[future]
+            try:
+                results[table] = future.result()
+            except Exception as e:
+                logger.error(f"Failed to export {table}: {str(e)}")
+                results[table] = {'table': table, 'status': 'failed', 'error': str(e)}
+    return [results[table] for table in tables]
+
+
+def create_export_manifest(s3_client, results, backend, elapsed):
+    """Write the gold export manifest next to the upload manifests."""
+    manifest = {
+        'export_timestamp': datetime.now(timezone.utc).isoformat(),
+        'bucket': S3_BUCKET_NAME,
+        'backend': backend,
+        'seconds': round(elapsed, 3),
+        'total_rows': sum(r.get('rows', 0) for r in results),
+        'total_bytes': sum(r.get('bytes', 0) for r in results),
+        'tables': results
+    }
+    manifest_key = f"metadata/gold_export_manifest_{datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S')}.json"
+    s3_client.put_object(
+        Bucket=S3_BUCKET_NAME,
+        Key=manifest_key,
+        Body=json.dumps(manifest, indent=2),
+        ContentType='application/json',
+        Metadata={'purpose': 'gold_export_manifest'}
+    )
+    logger.info(f"Created export manifest: {manifest_key}")
+    
+    records = [
+        {'layer': 'gold', 'dataset': r['table'], 'timestamp': manifest['export_timestamp'], **r}
+        for r in results
+    ]
+    try:
+        append_manifest_records(s3_client, S3_BUCKET_NAME, records, 'gold_export', manifest_key=manifest_key)
+    except Exception as e:
+        # current.json would silently go stale - fail the run instead
+        logger.error(f"Could not append to the manifest log: {str(e)}")
+        raise
+    return manifest_key
+
+
+def parse_args(argv=None):
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Export marts tables to the S3 gold layer as Parquet')
+    parser.add_argument('--backend', choices=['snowflake', 'duckdb'], default='snowflake',
+                        help='Warehouse to read the marts tables from')
+    parser.add_argument('--duckdb-path', default=None,
+                        help='DuckDB database file holding the marts schema (duckdb backend)')
+    parser.add_argument('--schema', default=MARTS_SCHEMA,
+                        help='Schema containing the marts tables')
+    parser.add_argument('--tables', nargs='+', default=list(GOLD_EXPORT_TABLES),
+                        help='Tables to export (default: all marts tables)')
+    parser.add_argument('--max-workers', type=int, default=DEFAULT_MAX_WORKERS,
+                        help='Tables exported at once')
+    parser.add_argument('--work-dir', default=GOLD_EXPORT_WORK_DIR,
+                        help='Local directory for Parquet output before upload')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    logger.info("=" * 60)
+    logger.info("Gold Layer Export - Healthcare Analytics Platform")
+    logger.info("=" * 60)
+
+    s3_client = initialize_s3_client()
+    connection_factory = create_connection_factory(args.backend, args.duckdb_path)
+
+    start = time.perf_counter()
+    results = export_tables(
+        connection_factory, args.backend, s3_client, args.tables,
+        max_workers=args.max_workers, schema=args.schema, work_dir=args.work_dir
+    )
+    elapsed = time.perf_counter() - start
+    manifest_key = create_export_manifest(s3_client, results, args.backend, elapsed)
+
+    failed = [r['table'] for r in results if r['status'] == 'failed']
+    empty = [r['table'] for r in results if r['status'] == 'empty']
+    logger.info("\n" + "=" * 60)
+    logger.info("Export Summary")
+    logger.info("=" * 60)
+    logger.info(f"Exported: {len(results) - len(failed) - len(empty)}/{len(results)} tables in {elapsed:.2f}s")
+    logger.info(f"Manifest: s3://{S3_BUCKET_NAME}/{manifest_key}")
+    if empty:
+        logger.warning(f"Empty tables (previous export kept): {', '.join(empty)}")
+    if failed:
+        logger.error(f"Failed tables: {', '.join(failed)}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
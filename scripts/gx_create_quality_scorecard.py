@@ -2,18 +2,37 @@
 """
 Generate data quality scorecard from Great Expectations validation results
 Creates a summary report with quality scores and trends
+
+Scores are computed from the latest stored validation result of the suite
+(written by gx_run_checkpoint.py or gx_validate_marts.py), or the result of a
+given run ID, so no warehouse query is needed. --revalidate runs a fresh
+validation first, for a cold start with nothing stored yet.
+
+Usage:
+    python scripts/gx_create_quality_scorecard.py [--suite marts.fct_inpatient_charges]
+        [--run-id gx_run_checkpoint/20250101T020000.000000Z] [--revalidate] [--profile]
 """
 
+import argparse
+import os
 import sys
 import json
 from pathlib import Path
 from datetime import datetime
 import great_expectations as gx
 
+from gx_results import (DATASOURCE_NAME, expectation_category, expectation_type, load_validation_result,
+                        new_run_time, result_to_dict, save_validation_result)
+from profiling import add_profile_argument, profiled, span
+from scorecard_history import history_path, open_history, record_result
+from tracing import start_span
+
+DEFAULT_SUITE = "marts.fct_inpatient_charges"
+
 def calculate_quality_score(validation_result):
     """Calculate overall data quality score (0-100)"""
-    total_expectations = len(validation_result.results)
-    passed_expectations = sum(1 for r in validation_result.results if r.success)
+    total_expectations = len(validation_result['results'])
+    passed_expectations = sum(1 for r in validation_result['results'] if r.get('success'))
     
     if total_expectations == 0:
         return 0
@@ -30,78 +49,99 @@ def calculate_category_scores(validation_result):
         'consistency': []
     }
     
-    for result in validation_result.results:
-        exp_type = result.expectation_config.get('expectation_type', '')
-        
-        if 'not_null' in exp_type or 'null' in exp_type:
-            categories['completeness'].append(result)
-        elif 'unique' in exp_type:
-            categories['uniqueness'].append(result)
-        elif 'between' in exp_type or 'in_set' in exp_type:
-            categories['validity'].append(result)
-        else:
-            categories['consistency'].append(result)
+    for result in validation_result['results']:
+        categories[expectation_category(expectation_type(result))].append(result)
     
     category_scores = {}
     for category, results in categories.items():
         if len(results) == 0:
             category_scores[category] = None
         else:
-            passed = sum(1 for r in results if r.success)
-            category_scores[category] = round((passed / len(results)) * 100, 2) if len(results) > 0 else None
+            passed = sum(1 for r in results if r.get('success'))
+            category_scores[category] = round((passed / len(results)) * 100, 2)
     
     return category_scores
 
-def main():
+def revalidate(context, suite_name):
+    """Run a fresh validation of the suite and store its result"""
+    datasource = context.fluent_datasources[DATASOURCE_NAME]
+    asset = datasource.get_asset(suite_name.split(".", 1)[1])
+    batch_request = asset.build_batch_request()
+    
+    with span("gx.get_validator"):
+        validator = context.get_validator(
+            batch_request=batch_request,
+            expectation_suite_name=suite_name
+        )
+    
+    with span("gx.validate"):
+        validation_result = result_to_dict(validator.validate())
+    
+    save_validation_result(
+        validation_result, suite_name, "gx_create_quality_scorecard", new_run_time(),
+        validations_dir=Path(context.root_directory) / "uncommitted" / "validations"
+    )
+    return validation_result
+
+def create_scorecard(suite_name=DEFAULT_SUITE, run_id=None, fresh=False):
     print("=" * 60)
     print("Generate Data Quality Scorecard")
     print("=" * 60)
     print()
     
-    context = gx.get_context()
+    with span("gx.get_context"):
+        context = gx.get_context()
+    validations_dir = Path(context.root_directory) / "uncommitted" / "validations"
     
-    # Run a fresh validation to get results
-    print("Running validation to get latest results...")
-    
-    datasource = context.fluent_datasources["snowflake_datasource"]
-    asset = datasource.get_asset("fct_inpatient_charges")
-    batch_request = asset.build_batch_request()
-    suite_name = "marts.fct_inpatient_charges"
-    
-    validator = context.get_validator(
-        batch_request=batch_request,
-        expectation_suite_name=suite_name
-    )
-    
-    # Run validation
-    validation_result = validator.validate()
+    if fresh:
+        print("Running validation to get latest results...")
+        validation_result = revalidate(context, suite_name)
+    else:
+        try:
+            with span("gx.load_result", suite=suite_name):
+                validation_result = load_validation_result(suite_name, run_id, validations_dir)
+        except FileNotFoundError as e:
+            print(f"ERROR: {e}")
+            print("Run gx_run_checkpoint.py first, or pass --revalidate")
+            sys.exit(1)
+        print(f"Using stored validation result: {validation_result['meta'].get('result_path')}")
+    
+    run = validation_result.get('meta', {}).get('run_id') or {}
+    run_id = f"{run['run_name']}/{run['run_time']}" if run.get('run_name') else None
     
     # Extract results
-    results = validation_result.results
+    results = validation_result['results']
     total_expectations = len(results)
-    passed = sum(1 for r in results if r.success)
+    passed = sum(1 for r in results if r.get('success'))
     failed = total_expectations - passed
     
     # Calculate scores
-    overall_score = round((passed / total_expectations) * 100, 2) if total_expectations > 0 else 0
+    overall_score = calculate_quality_score(validation_result)
+    category_scores = calculate_category_scores(validation_result)
     
     print()
     print("=" * 60)
     print("Data Quality Scorecard")
     print("=" * 60)
     print()
+    if run_id:
+        print(f"Run: {run_id}")
     print(f"Overall Quality Score: {overall_score}%")
     print(f"  Passed: {passed}/{total_expectations}")
     print(f"  Failed: {failed}/{total_expectations}")
     print()
+    print("Category Scores:")
+    for category, score in category_scores.items():
+        print(f"  {category:<13} " + (f"{score}%" if score is not None else "n/a"))
+    print()
     
     # Show failed expectations
-    failed_expectations = [r for r in results if not r.success]
+    failed_expectations = [r for r in results if not r.get('success')]
     if failed_expectations:
         print("Failed Expectations:")
         for exp in failed_expectations:
-            exp_type = exp.expectation_config.get('expectation_type', 'Unknown')
-            column = exp.expectation_config.get('kwargs', {}).get('column', 'N/A')
+            exp_type = expectation_type(exp) or 'Unknown'
+            column = exp.get('expectation_config', {}).get('kwargs', {}).get('column', 'N/A')
             print(f"  - {exp_type} on {column}")
     else:
         print("[OK] All expectations passed!")
@@ -136,10 +176,13 @@ def main():
     scorecard_data = {
         "timestamp": datetime.now().isoformat(),
         "overall_score": overall_score,
+        "category_scores": category_scores,
         "total_expectations": total_expectations,
         "passed": passed,
         "failed": failed,
-        "suite_name": suite_name
+        "suite_name": suite_name,
+        "run_id": run_id,
+        "revalidated": fresh
     }
     
     with open(scorecard_path, 'w') as f:
@@ -147,6 +190,29 @@ def main():
     
     print()
     print(f"Scorecard saved to: {scorecard_path}")
+    
+    # Append to the history (a run already recorded, e.g. scored twice, is kept once)
+    with span("scorecard.record"):
+        history_db = history_path(context.root_directory)
+        recorded = record_result(open_history(history_db), suite_name, validation_result)
+    print(f"Scorecard history: {history_db}" + ("" if recorded else " (run already recorded)"))
+    print("  Trends: python scripts/scorecard_history.py trend")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate the data quality scorecard")
+    parser.add_argument("--suite", default=DEFAULT_SUITE, help="Expectation suite to score")
+    parser.add_argument("--run-id", default=None,
+                        help="Stored run to score, <run time> or <run name>/<run time> (default: latest)")
+    parser.add_argument("--revalidate", action="store_true",
+                        help="Validate against the warehouse instead of reading the stored result")
+    add_profile_argument(parser)
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    with profiled(args.profile, "gx_create_quality_scorecard"), \
+            start_span("gx_create_quality_scorecard", warehouse=os.getenv("SNOWFLAKE_WAREHOUSE")):
+        create_scorecard(args.suite, args.run_id, fresh=args.revalidate)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,125 @@
+"""
+Validation results in the GX validations store
+Writes ExpectationSuiteValidationResult JSON under gx/uncommitted/validations/
+in the store's own layout (<suite name parts>/<run name>/<run time>/<batch id>.json),
+so every validation run leaves a result data docs can render and later steps
+can read back without querying the warehouse again.
+
+A run ID is "<run time>" or "<run name>/<run time>".
+"""
+
+import json
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+VALIDATIONS_DIR = Path("gx") / "uncommitted" / "validations"
+RUN_TIME_FORMAT = "%Y%m%dT%H%M%S.%fZ"
+DATASOURCE_NAME = "snowflake_datasource"
+
+
+def new_run_time() -> str:
+    return datetime.now(timezone.utc).strftime(RUN_TIME_FORMAT)
+
+
+def result_to_dict(result) -> Dict:
+    """JSON-ready form of a GX validation result (or an already plain dict)"""
+    if hasattr(result, "to_json_dict"):
+        return result.to_json_dict()
+    return result
+
+
+def expectation_type(item: Dict) -> str:
+    """Expectation type of one entry of a result's results list"""
+    config = item.get("expectation_config", {})
+    return config.get("expectation_type") or config.get("type", "")
+
+
+def expectation_category(exp_type: str) -> str:
+    """Scorecard category of an expectation type"""
+    if "not_null" in exp_type or "null" in exp_type:
+        return "completeness"
+    elif "unique" in exp_type:
+        return "uniqueness"
+    elif "between" in exp_type or "in_set" in exp_type:
+        return "validity"
+    return "consistency"
+
+
+def summarize_result(result: Dict) -> Dict:
+    """Counts and failed expectations of a validation result dict"""
+    statistics = result.get("statistics", {})
+    failed = []
+    for item in result.get("results", []):
+        if item.get("success"):
+            continue
+        config = item.get("expectation_config", {})
+        failed.append({
+            "expectation_type": expectation_type(item),
+            "column": config.get("kwargs", {}).get("column"),
+            "observed_value": (item.get("result") or {}).get("observed_value")
+        })
+    return {
+        "success": result.get("success"),
+        "evaluated_expectations": statistics.get("evaluated_expectations", len(result.get("results", []))),
+        "successful_expectations": statistics.get("successful_expectations"),
+        "failed_expectations": failed
+    }
+
+
+def save_validation_result(result, suite_name: str, run_name: str, run_time: str,
+                           batch_id: Optional[str] = None, validations_dir: Path = VALIDATIONS_DIR) -> Path:
+    """Store a validation result; returns the file written"""
+    batch_id = batch_id or f"{DATASOURCE_NAME}-{suite_name.split('.')[-1]}"
+    path = Path(validations_dir).joinpath(*suite_name.split("."), run_name, run_time, f"{batch_id}.json")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    data = result_to_dict(result)
+    data.setdefault("meta", {}).update({
+        "expectation_suite_name": suite_name,
+        "run_id": {"run_name": run_name, "run_time": run_time}
+    })
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2, default=str)
+    return path
+
+
+def list_validation_results(suite_name: str, run_name: Optional[str] = None,
+                            validations_dir: Path = VALIDATIONS_DIR) -> List[Dict]:
+    """Stored results of a suite, oldest first: run_name, run_time, run_id, path"""
+    suite_dir = Path(validations_dir).joinpath(*suite_name.split("."))
+    runs = []
+    for path in suite_dir.glob(f"{run_name or '*'}/*/*.json"):
+        name, run_time = path.parent.parent.name, path.parent.name
+        runs.append({"run_name": name, "run_time": run_time, "run_id": f"{name}/{run_time}", "path": path})
+    # Run times share RUN_TIME_FORMAT, so they sort chronologically as strings
+    return sorted(runs, key=lambda r: (r["run_time"], r["run_name"]))
+
+
+def list_validation_suites(validations_dir: Path = VALIDATIONS_DIR) -> List[str]:
+    """Names of the suites with stored results (<suite parts>/<run name>/<run time>/<id>.json)"""
+    validations_dir = Path(validations_dir)
+    suites = set()
+    for path in validations_dir.glob("**/*.json"):
+        parts = path.relative_to(validations_dir).parts[:-3]
+        if parts:
+            suites.add(".".join(parts))
+    return sorted(suites)
+
+
+def load_validation_result(suite_name: str, run_id: Optional[str] = None,
+                           validations_dir: Path = VALIDATIONS_DIR) -> Dict:
+    """The latest stored result of a suite, or the one of run_id"""
+    run_name, _, run_time = run_id.rpartition("/") if run_id else ("", "", "")
+    runs = [r for r in list_validation_results(suite_name, run_name or None, validations_dir)
+            if not run_time or r["run_time"] == run_time]
+    if not runs:
+        raise FileNotFoundError(
+            f"No stored validation result for {suite_name}" + (f" (run {run_id})" if run_id else "")
+            + f" in {validations_dir}"
+        )
+    latest = runs[-1]
+    with open(latest["path"], "r") as f:
+        result = json.load(f)
+    result.setdefault("meta", {}).setdefault("run_id", {"run_name": latest["run_name"], "run_time": latest["run_time"]})
+    result["meta"]["result_path"] = str(latest["path"])
+    return result
@@ -4,17 +4,24 @@ Run Great Expectations Checkpoint
 Replaces: great_expectations checkpoint run
 """
 
+import argparse
+import os
 import sys
 from pathlib import Path
 
+from gx_results import new_run_time, save_validation_result
+from profiling import add_profile_argument, profiled, span
+from tracing import start_span
+
 try:
     import great_expectations as gx
 except ImportError:
     print("ERROR: Great Expectations not installed.")
     sys.exit(1)
 
-def main():
-    context = gx.get_context()
+def run_checkpoint():
+    with span("gx.get_context"):
+        context = gx.get_context()
     
     checkpoint_name = "marts_checkpoint"
     
@@ -38,13 +45,20 @@ def main():
     
     try:
         # Run validation directly using validator
-        validator = context.get_validator(
-            batch_request=batch_request,
-            expectation_suite_name=suite_name
-        )
+        with span("gx.get_validator"):
+            validator = context.get_validator(
+                batch_request=batch_request,
+                expectation_suite_name=suite_name
+            )
         
         # Run validation
-        result = validator.validate()
+        with span("gx.validate") as traced:
+            result = validator.validate()
+            traced.set(
+                success=result.success,
+                evaluated_expectations=result.statistics.get('evaluated_expectations'),
+                successful_expectations=result.statistics.get('successful_expectations')
+            )
         
         print("=" * 60)
         print("Validation Results")
@@ -81,7 +95,11 @@ def main():
         print(f"  Successful: {stats.get('successful_expectations', 0)}")
         print(f"  Failed: {stats.get('unsuccessful_expectations', 0)}")
         print()
-        print("Validation results saved to: gx/uncommitted/validations/")
+        result_path = save_validation_result(
+            result, suite_name, "gx_run_checkpoint", new_run_time(),
+            validations_dir=Path(context.root_directory) / "uncommitted" / "validations"
+        )
+        print(f"Validation results saved to: {result_path}")
         print()
         print("Next step:")
         print("  Build data docs: python scripts/gx_docs_build.py")
@@ -92,6 +110,18 @@ def main():
         traceback.print_exc()
         sys.exit(1)
 
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Validate marts.fct_inpatient_charges")
+    add_profile_argument(parser)
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    with profiled(args.profile, "gx_run_checkpoint"), \
+            start_span("gx_run_checkpoint", suite="marts.fct_inpatient_charges",
+                       warehouse=os.getenv("SNOWFLAKE_WAREHOUSE")):
+        run_checkpoint()
+
 if __name__ == "__main__":
     main()
 
@@ -0,0 +1,585 @@
+#!/usr/bin/env python3
+"""
+Single-scan SQL validation engine
+Compiles the column and table expectations of a GX suite into one aggregate
+SELECT - a conditional count or aggregate per expectation - so a suite costs a
+single table scan instead of one metric query per expectation. Results are
+mapped back to GX-style validation results (success, observed values,
+unexpected counts and percentages) in the shape validator.validate() returns,
+so they can be stored, scored and rendered like any other result.
+
+Expectations it cannot compile are reported as unsupported; callers fall back
+to GX for those suites. Uniqueness is counted as surplus duplicates
+(non-null rows minus distinct values): pass/fail is exact for the default
+mostly=1, while GX's unexpected_count (every row of a duplicated value) would
+need a GROUP BY.
+
+Fast mode validates a subset for intra-day checks: a deterministic hash
+sample of a key (--sample-fraction, on charge_key by default) or one partition
+(--state, --drg-range). Hashing the key keeps all rows of a key together, so
+key uniqueness is still exact within the sample. Results are marked as
+sampled; column-map expectations get a Wilson confidence interval on the
+unexpected percent and say whether the verdict is conclusive at that
+confidence. Row counts and sums are extrapolated from a hash sample and
+skipped for a partition; an exact row count is judged against the confidence
+interval of the extrapolated count. Distinct-value counts are skipped for both.
+
+Runs on a SQLAlchemy engine (the GX Snowflake datasource) or any DB-API
+connection, so it can be tested locally against DuckDB:
+    python scripts/gx_sql_engine.py --suite-file suite.json --duckdb-path marts.duckdb --schema main
+    python scripts/gx_sql_engine.py --sample-fraction 0.05 [--confidence 0.95]
+    python scripts/gx_sql_engine.py --state CA | --drg-range 1-100
+"""
+
+import argparse
+import json
+import math
+import re
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from decimal import Decimal
+from pathlib import Path
+from statistics import NormalDist
+from typing import Callable, Dict, List, Optional, Tuple
+
+from gx_results import DATASOURCE_NAME
+from profiling import span
+
+EXPECTATIONS_DIR = Path("gx") / "expectations"
+DEFAULT_SCHEMA = "raw_marts"
+DEFAULT_SAMPLE_KEY = "charge_key"
+# Key hashed for a sample of each marts table (gx_validate_marts.py)
+SAMPLE_KEYS = {
+    "fct_inpatient_charges": "charge_key",
+    "fct_readmissions": "readmission_key",
+    "fct_state_summary": "state_summary_key",
+    "dim_hospitals": "hospital_key",
+    "dim_drg_codes": "drg_key",
+    "dim_geography": "geography_key",
+    "dim_dates": "date_key"
+}
+HASH_BUCKETS = 10000
+
+# Totals that scale with the sample fraction, and expectations a subset cannot answer
+SCALED_EXPECTATIONS = {
+    "expect_table_row_count_to_be_between",
+    "expect_table_row_count_to_equal",
+    "expect_column_sum_to_be_between"
+}
+UNSAMPLEABLE_EXPECTATIONS = {"expect_column_unique_value_count_to_be_between"}
+_IDENTIFIER_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+def quote_identifier(name: str) -> str:
+    """Plain identifiers stay unquoted (Snowflake upper-cases them); anything else is double-quoted"""
+    if _IDENTIFIER_RE.match(name):
+        return name
+    return '"' + name.replace('"', '""') + '"'
+
+
+def sql_literal(value) -> str:
+    if value is None:
+        return "NULL"
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, (int, float, Decimal)):
+        return repr(value) if not isinstance(value, Decimal) else str(value)
+    if isinstance(value, (date, datetime)):
+        value = value.isoformat()
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def _plain(value):
+    """JSON-friendly observed value (Decimal and dates from the driver)"""
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+@dataclass
+class CompiledSuite:
+    """One aggregate query plus, per expectation, how to read its result from the row"""
+    suite_name: str
+    sql: str
+    evaluators: List[Tuple[Dict, Callable[[Dict], Tuple[bool, Dict]]]] = field(default_factory=list)
+    unsupported: List[Dict] = field(default_factory=list)
+
+
+class _Builder:
+    """Collects select-list aggregates, sharing COUNT(*) and per-column COUNT(col)"""
+
+    def __init__(self):
+        self.select: Dict[str, str] = {"element_count": "COUNT(*)"}
+
+    def add(self, expression: str) -> str:
+        for alias, existing in self.select.items():
+            if existing == expression:
+                return alias
+        alias = f"a{len(self.select)}"
+        self.select[alias] = expression
+        return alias
+
+    def nonmissing(self, column: str) -> str:
+        return self.add(f"COUNT({quote_identifier(column)})")
+
+    def count_where(self, condition: str) -> str:
+        return self.add(f"SUM(CASE WHEN {condition} THEN 1 ELSE 0 END)")
+
+
+def _expectation_type(expectation: Dict) -> str:
+    return expectation.get("type") or expectation.get("expectation_type", "")
+
+
+def _column_map_result(row: Dict, nonmissing_alias: Optional[str], unexpected_alias: str,
+                       mostly: float) -> Tuple[bool, Dict]:
+    """GX column-map result; with nonmissing_alias None, nulls are the unexpected values"""
+    element_count = row["element_count"] or 0
+    unexpected = int(row[unexpected_alias] or 0)
+    if nonmissing_alias is None:
+        base = element_count
+        missing = None
+    else:
+        base = int(row[nonmissing_alias] or 0)
+        missing = element_count - base
+    unexpected_percent = unexpected / base * 100 if base else 0.0
+    result = {
+        "element_count": element_count,
+        "unexpected_count": unexpected,
+        "unexpected_percent": unexpected_percent,
+        "unexpected_percent_total": unexpected / element_count * 100 if element_count else 0.0,
+        "partial_unexpected_list": []
+    }
+    if missing is not None:
+        result.update({
+            "missing_count": missing,
+            "missing_percent": missing / element_count * 100 if element_count else 0.0,
+            "unexpected_percent_nonmissing": unexpected_percent
+        })
+    success = (1 - unexpected_percent / 100) >= mostly if base else True
+    return success, result
+
+
+def _within(value, min_value, max_value, strict_min=False, strict_max=False) -> bool:
+    if value is None:
+        return False
+    if min_value is not None and (value <= min_value if strict_min else value < min_value):
+        return False
+    if max_value is not None and (value >= max_value if strict_max else value > max_value):
+        return False
+    return True
+
+
+def _compile_expectation(builder: _Builder, expectation: Dict) -> Optional[Callable[[Dict], Tuple[bool, Dict]]]:
+    """Register the expectation's aggregates; returns its evaluator, or None if unsupported"""
+    kind = _expectation_type(expectation)
+    kwargs = expectation.get("kwargs", {})
+    mostly = kwargs.get("mostly", 1.0)
+    column = kwargs.get("column")
+    col = quote_identifier(column) if column else None
+
+    if kind == "expect_table_row_count_to_be_between":
+        return lambda row: (
+            _within(row["element_count"], kwargs.get("min_value"), kwargs.get("max_value")),
+            {"observed_value": row["element_count"]}
+        )
+    if kind == "expect_table_row_count_to_equal":
+        return lambda row: (row["element_count"] == kwargs["value"], {"observed_value": row["element_count"]})
+    if column is None:
+        return None
+
+    if kind == "expect_column_values_to_not_be_null":
+        unexpected = builder.count_where(f"{col} IS NULL")
+        return lambda row: _column_map_result(row, None, unexpected, mostly)
+    if kind == "expect_column_values_to_be_null":
+        unexpected = builder.nonmissing(column)
+        return lambda row: _column_map_result(row, None, unexpected, mostly)
+
+    if kind == "expect_column_values_to_be_between":
+        nonmissing = builder.nonmissing(column)
+        bounds = []
+        if kwargs.get("min_value") is not None:
+            bounds.append(f"{col} {'<=' if kwargs.get('strict_min') else '<'} {sql_literal(kwargs['min_value'])}")
+        if kwargs.get("max_value") is not None:
+            bounds.append(f"{col} {'>=' if kwargs.get('strict_max') else '>'} {sql_literal(kwargs['max_value'])}")
+        unexpected = builder.count_where(f"{col} IS NOT NULL AND ({' OR '.join(bounds) or '1 = 0'})")
+        return lambda row: _column_map_result(row, nonmissing, unexpected, mostly)
+    if kind in ("expect_column_values_to_be_in_set", "expect_column_values_to_not_be_in_set"):
+        nonmissing = builder.nonmissing(column)
+        values = [v for v in kwargs.get("value_set") or [] if v is not None]
+        membership = f"{col} IN ({', '.join(sql_literal(v) for v in values)})" if values else "1 = 0"
+        if kind == "expect_column_values_to_be_in_set":
+            membership = f"NOT ({membership})"
+        unexpected = builder.count_where(f"{col} IS NOT NULL AND {membership}")
+        return lambda row: _column_map_result(row, nonmissing, unexpected, mostly)
+    if kind == "expect_column_values_to_be_unique":
+        nonmissing = builder.nonmissing(column)
+        unexpected = builder.add(f"COUNT({col}) - COUNT(DISTINCT {col})")
+        return lambda row: _column_map_result(row, nonmissing, unexpected, mostly)
+
+    aggregates = {
+        "expect_column_min_to_be_between": "MIN",
+        "expect_column_max_to_be_between": "MAX",
+        "expect_column_mean_to_be_between": "AVG",
+        "expect_column_sum_to_be_between": "SUM",
+        "expect_column_unique_value_count_to_be_between": "COUNT(DISTINCT"
+    }
+    if kind in aggregates:
+        function = aggregates[kind]
+        alias = builder.add(f"{function} {col})" if function.endswith("DISTINCT") else f"{function}({col})")
+
+        def evaluate(row):
+            observed = _plain(row[alias])
+            return _within(observed, kwargs.get("min_value"), kwargs.get("max_value"),
+                           kwargs.get("strict_min", False), kwargs.get("strict_max", False)), \
+                {"observed_value": observed}
+        return evaluate
+    return None
+
+
+def compile_suite(suite: Dict, table: str, schema: Optional[str] = DEFAULT_SCHEMA,
+                  where: Optional[str] = None) -> CompiledSuite:
+    """Compile a suite (GX suite JSON) into one aggregate query over schema.table [WHERE where]"""
+    builder = _Builder()
+    compiled = CompiledSuite(suite_name=suite.get("name") or suite.get("expectation_suite_name", ""), sql="")
+    for expectation in suite.get("expectations", []):
+        evaluate = _compile_expectation(builder, expectation)
+        if evaluate is None:
+            compiled.unsupported.append(expectation)
+        else:
+            compiled.evaluators.append((expectation, evaluate))
+
+    source = f"{quote_identifier(schema)}.{quote_identifier(table)}" if schema else quote_identifier(table)
+    select_list = ",\n       ".join(f"{expression} AS {alias}" for alias, expression in builder.select.items())
+    compiled.sql = f"SELECT {select_list}\nFROM {source}" + (f"\nWHERE {where}" if where else "")
+    return compiled
+
+
+def execute_aggregate(connection, sql: str) -> Dict:
+    """Run a one-row query on a SQLAlchemy engine or DB-API connection; keys lower-cased"""
+    with span("sql.execute", engine="single_scan"):
+        if hasattr(connection, "dialect") and hasattr(connection, "connect"):
+            with connection.connect() as conn:
+                result = conn.exec_driver_sql(sql)
+                names, row = list(result.keys()), result.fetchone()
+        else:
+            cursor = connection.cursor()
+            try:
+                cursor.execute(sql)
+                names, row = [d[0] for d in cursor.description], cursor.fetchone()
+            finally:
+                cursor.close()
+    return {name.lower(): value for name, value in zip(names, row)}
+
+
+def table_columns(connection, table: str, schema: Optional[str] = DEFAULT_SCHEMA) -> List[str]:
+    """Lower-cased column names of a table (a zero-row query, no scan)"""
+    relation = f"{quote_identifier(schema)}.{quote_identifier(table)}" if schema else quote_identifier(table)
+    sql = f"SELECT * FROM {relation} WHERE 1 = 0"
+    if hasattr(connection, "dialect") and hasattr(connection, "connect"):
+        with connection.connect() as conn:
+            names = list(conn.exec_driver_sql(sql).keys())
+    else:
+        cursor = connection.cursor()
+        try:
+            cursor.execute(sql)
+            names = [d[0] for d in cursor.description]
+        finally:
+            cursor.close()
+    return [name.lower() for name in names]
+
+
+def evaluate_compiled(compiled: CompiledSuite, row: Dict) -> Dict:
+    """GX-style suite validation result from the aggregate row"""
+    results = []
+    for expectation, evaluate in compiled.evaluators:
+        success, result = evaluate(row)
+        kind = _expectation_type(expectation)
+        results.append({
+            "success": bool(success),
+            "expectation_config": {
+                "type": kind,
+                "expectation_type": kind,
+                "kwargs": expectation.get("kwargs", {}),
+                "meta": expectation.get("meta", {})
+            },
+            "result": result,
+            "exception_info": {"raised_exception": False, "exception_message": None, "exception_traceback": None}
+        })
+    evaluated = len(results)
+    successful = sum(1 for r in results if r["success"])
+    return {
+        "success": successful == evaluated,
+        "results": results,
+        "statistics": {
+            "evaluated_expectations": evaluated,
+            "successful_expectations": successful,
+            "unsuccessful_expectations": evaluated - successful,
+            "success_percent": successful / evaluated * 100 if evaluated else None
+        },
+        "suite_name": compiled.suite_name,
+        "meta": {
+            "expectation_suite_name": compiled.suite_name,
+            "validation_engine": "single_scan_sql",
+            "unsupported_expectations": [_expectation_type(e) for e in compiled.unsupported]
+        }
+    }
+
+
+@dataclass
+class Sample:
+    """The row subset of a fast validation: a hash sample (fraction set) or a partition"""
+    where: str
+    description: str
+    fraction: Optional[float] = None
+    confidence: float = 0.95
+    columns: List[str] = field(default_factory=list)  # the table must have these
+
+
+def hash_sample(fraction: float, key: str = DEFAULT_SAMPLE_KEY, confidence: float = 0.95) -> Sample:
+    """Deterministic sample of about fraction of the rows: the same keys on every run"""
+    if not 0 < fraction <= 1:
+        raise ValueError(f"Sample fraction must be in (0, 1], got {fraction}")
+    buckets = max(1, round(fraction * HASH_BUCKETS))
+    return Sample(
+        where=f"MOD(ABS(HASH({quote_identifier(key)})), {HASH_BUCKETS}) < {buckets}",
+        description=f"hash({key}) sample of {buckets / HASH_BUCKETS:.2%}",
+        fraction=buckets / HASH_BUCKETS,
+        confidence=confidence,
+        columns=[key.lower()]
+    )
+
+
+def state_partition(state: str, schema: Optional[str] = DEFAULT_SCHEMA, confidence: float = 0.95) -> Sample:
+    """Rows of one state (through dim_geography; the fact table only has geography_key)"""
+    geography = f"{quote_identifier(schema)}.dim_geography" if schema else "dim_geography"
+    return Sample(
+        where=f"geography_key IN (SELECT geography_key FROM {geography} "
+              f"WHERE state_abbreviation = {sql_literal(state.upper())})",
+        description=f"partition state = {state.upper()}",
+        confidence=confidence,
+        columns=["geography_key"]
+    )
+
+
+def drg_partition(low: int, high: int, confidence: float = 0.95) -> Sample:
+    """Rows with a DRG code in [low, high]"""
+    return Sample(
+        where=f"CAST(drg_code AS INTEGER) BETWEEN {int(low)} AND {int(high)}",
+        description=f"partition DRG {int(low)}-{int(high)}",
+        confidence=confidence,
+        columns=["drg_code"]
+    )
+
+
+def wilson_interval(count: int, n: int, confidence: float = 0.95) -> Tuple[float, float]:
+    """Wilson score interval for the proportion count / n"""
+    if n == 0:
+        return 0.0, 1.0
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    p = count / n
+    denominator = 1 + z * z / n
+    centre = (p + z * z / (2 * n)) / denominator
+    half_width = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denominator
+    return max(0.0, centre - half_width), min(1.0, centre + half_width)
+
+
+def scaled_count_interval(count: int, fraction: float, confidence: float = 0.95) -> Tuple[float, float]:
+    """Confidence interval of a table row count from the count in a sample of fraction of its rows"""
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    half_width = z * math.sqrt(count * (1 - fraction))
+    return max(0.0, (count - half_width) / fraction), (count + half_width) / fraction
+
+
+def _apply_sample(result: Dict, sample: Sample) -> Dict:
+    """Mark a result computed on a sample: bounds on column-map results, totals scaled or skipped"""
+    kept, skipped = [], []
+    for item in result["results"]:
+        config, outcome = item["expectation_config"], item["result"]
+        kind, kwargs = config["type"], config["kwargs"]
+        if kind in UNSAMPLEABLE_EXPECTATIONS or (kind in SCALED_EXPECTATIONS and sample.fraction is None):
+            skipped.append(kind)
+            continue
+        if kind in SCALED_EXPECTATIONS:
+            outcome["sample_observed_value"] = outcome["observed_value"]
+            if outcome["observed_value"] is not None:
+                outcome["observed_value"] = round(outcome["observed_value"] / sample.fraction, 2)
+            outcome["estimated_from_sample"] = True
+            if kind == "expect_table_row_count_to_equal":
+                # An extrapolated count is never exact: pass when the expected count is within its interval
+                low, high = scaled_count_interval(outcome["sample_observed_value"], sample.fraction,
+                                                  sample.confidence)
+                outcome["confidence_interval"] = {
+                    "confidence": sample.confidence,
+                    "observed_value_lower": round(low, 2),
+                    "observed_value_upper": round(high, 2)
+                }
+                item["success"] = low <= kwargs.get("value") <= high
+            else:
+                item["success"] = _within(outcome["observed_value"], kwargs.get("min_value"), kwargs.get("max_value"),
+                                          kwargs.get("strict_min", False), kwargs.get("strict_max", False))
+        elif "unexpected_count" in outcome:
+            base = outcome["element_count"] - outcome.get("missing_count", 0)
+            low, high = wilson_interval(outcome["unexpected_count"], base, sample.confidence)
+            allowed = 1 - kwargs.get("mostly", 1.0)
+            outcome["confidence_interval"] = {
+                "confidence": sample.confidence,
+                "unexpected_percent_lower": round(low * 100, 4),
+                "unexpected_percent_upper": round(high * 100, 4)
+            }
+            # Conclusive when the whole interval is on one side of the allowed unexpected share
+            outcome["conclusive"] = low > allowed if not item["success"] else high <= allowed
+        kept.append(item)
+
+    evaluated = len(kept)
+    successful = sum(1 for r in kept if r["success"])
+    result.update({
+        "results": kept,
+        "success": successful == evaluated,
+        "statistics": {
+            "evaluated_expectations": evaluated,
+            "successful_expectations": successful,
+            "unsuccessful_expectations": evaluated - successful,
+            "success_percent": successful / evaluated * 100 if evaluated else None
+        }
+    })
+    result["meta"]["sample"] = {
+        "sampled": True,
+        "description": sample.description,
+        "where": sample.where,
+        "fraction": sample.fraction,
+        "confidence": sample.confidence,
+        "skipped_expectations": skipped
+    }
+    return result
+
+
+def validate_suite_sql(connection, suite: Dict, table: str, schema: Optional[str] = DEFAULT_SCHEMA,
+                       where: Optional[str] = None, sample: Optional[Sample] = None) -> Dict:
+    """Validate a suite with one table scan (of a sample, if given); returns a GX-style result dict"""
+    if sample is not None:
+        where = f"({where}) AND ({sample.where})" if where else sample.where
+    compiled = compile_suite(suite, table, schema, where)
+    start = time.perf_counter()
+    row = execute_aggregate(connection, compiled.sql)
+    result = evaluate_compiled(compiled, row)
+    if sample is not None:
+        result = _apply_sample(result, sample)
+    result["meta"].update({"query_seconds": round(time.perf_counter() - start, 3), "sql": compiled.sql})
+    return result
+
+
+def load_suite_file(suite_name: str, expectations_dir: Path = EXPECTATIONS_DIR) -> Dict:
+    """A suite from the expectations store directory (marts/x.json or marts.x.json)"""
+    for path in (Path(expectations_dir).joinpath(*suite_name.split(".")).with_suffix(".json"),
+                 Path(expectations_dir) / f"{suite_name}.json"):
+        if path.exists():
+            with open(path, "r") as f:
+                return json.load(f)
+    raise FileNotFoundError(f"Suite {suite_name} not found in {expectations_dir}")
+
+
+def suite_to_dict(suite) -> Dict:
+    return suite.to_json_dict() if hasattr(suite, "to_json_dict") else suite
+
+
+def gx_engine(context):
+    """The SQLAlchemy engine of the GX Snowflake datasource"""
+    return context.fluent_datasources[DATASOURCE_NAME].get_engine()
+
+
+def print_result(result: Dict):
+    sample = result["meta"].get("sample")
+    if sample:
+        print(f"SAMPLED: {sample['description']} - verdicts are estimates for the full table")
+    for item in result["results"]:
+        config, outcome = item["expectation_config"], item["result"]
+        column = config["kwargs"].get("column")
+        observed = outcome.get("observed_value", outcome.get("unexpected_count"))
+        bounds = outcome.get("confidence_interval")
+        detail = ""
+        if bounds and "observed_value_lower" in bounds:
+            detail = (f"  estimated {bounds['observed_value_lower']:.0f}-{bounds['observed_value_upper']:.0f} "
+                      f"at {bounds['confidence']:.0%}")
+        elif bounds:
+            detail = (f"  unexpected {bounds['unexpected_percent_lower']:.3f}-{bounds['unexpected_percent_upper']:.3f}% "
+                      f"at {bounds['confidence']:.0%}" + ("" if outcome["conclusive"] else ", inconclusive"))
+        elif outcome.get("estimated_from_sample"):
+            detail = "  estimated"
+        print(f"  {'PASS' if item['success'] else 'FAIL'}  {config['type']}"
+              + (f" on {column}" if column else "") + f"  ({observed}){detail}")
+    stats = result["statistics"]
+    print(f"\n{stats['successful_expectations']}/{stats['evaluated_expectations']} expectations passed "
+          f"in one query ({result['meta']['query_seconds']:.2f}s)")
+    if result["meta"]["unsupported_expectations"]:
+        print(f"Not compiled (validate with GX): {', '.join(result['meta']['unsupported_expectations'])}")
+    if sample and sample["skipped_expectations"]:
+        print(f"Not meaningful on a {'sample' if sample['fraction'] else 'partition'}: "
+              f"{', '.join(sample['skipped_expectations'])}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Validate a GX suite with a single aggregate SQL scan")
+    parser.add_argument("--suite", default="marts.fct_inpatient_charges",
+                        help="Suite name, loaded from gx/expectations (or --suite-file)")
+    parser.add_argument("--suite-file", default=None, help="Suite JSON file")
+    parser.add_argument("--table", default=None, help="Table to validate (default: suite name after 'marts.')")
+    parser.add_argument("--schema", default=DEFAULT_SCHEMA)
+    parser.add_argument("--where", default=None, help="Optional row filter")
+    fast = parser.add_mutually_exclusive_group()
+    fast.add_argument("--sample-fraction", type=float, default=None,
+                      help="Validate a deterministic hash sample of this fraction of the rows")
+    fast.add_argument("--state", default=None, help="Validate one state's rows")
+    fast.add_argument("--drg-range", default=None, metavar="LOW-HIGH", help="Validate rows with DRG codes in a range")
+    parser.add_argument("--sample-key", default=DEFAULT_SAMPLE_KEY, help="Column hashed for --sample-fraction")
+    parser.add_argument("--confidence", type=float, default=0.95,
+                        help="Confidence level of the bounds on sampled results")
+    parser.add_argument("--duckdb-path", default=None,
+                        help="Validate a DuckDB database instead of the GX Snowflake datasource")
+    parser.add_argument("--show-sql", action="store_true")
+    parser.add_argument("--output", default=None, help="Write the result JSON here")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.suite_file:
+        with open(args.suite_file, "r") as f:
+            suite = json.load(f)
+    else:
+        suite = load_suite_file(args.suite)
+    suite_name = suite.get("name") or args.suite
+    table = args.table or suite_name.split(".")[-1]
+
+    if args.duckdb_path:
+        import duckdb
+        connection = duckdb.connect(args.duckdb_path, read_only=True)
+    else:
+        import great_expectations as gx
+        connection = gx_engine(gx.get_context())
+
+    sample = None
+    if args.sample_fraction is not None:
+        sample = hash_sample(args.sample_fraction, args.sample_key, args.confidence)
+    elif args.state:
+        sample = state_partition(args.state, args.schema, args.confidence)
+    elif args.drg_range:
+        low, _, high = args.drg_range.partition("-")
+        sample = drg_partition(int(low), int(high or low), args.confidence)
+
+    result = validate_suite_sql(connection, suite, table, args.schema, args.where, sample)
+    if args.show_sql:
+        print(result["meta"]["sql"] + "\n")
+    print(f"Suite: {suite_name} on {args.schema}.{table}")
+    print_result(result)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2, default=str)
+    sys.exit(0 if result["success"] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Validate all marts suites concurrently
+Discovers every marts.* expectation suite and validates them on a bounded
+thread pool sharing one data context, so a full marts validation takes about
+as long as the slowest table. Validators are built one at a time (the context
+is not thread-safe); the validations themselves - the warehouse queries - run
+in parallel on the datasource's connection pool.
+
+With --engine sql each suite is validated by one aggregate query
+(gx_sql_engine.py) instead of a query per expectation; suites with
+expectations the engine cannot compile fall back to GX.
+
+--sample-fraction, --state and --drg-range run a fast intra-day validation of
+a hash sample or one partition of every table (with the SQL engine). Tables
+without the sample's column, and suites that fall back to GX, are validated
+in full. Sampled results are stored apart from full ones, in
+gx/uncommitted/fast_validations/, and are not added to the scorecard history.
+
+Each suite's result is stored in the validations store (gx_results.py) under
+one run time, and a combined summary with per-suite timings is written to
+gx/uncommitted/marts_validation/<run time>.json.
+
+Usage:
+    python scripts/gx_validate_marts.py [--max-workers 4] [--engine gx|sql] [--suites marts.dim_hospitals ...] [--profile]
+    python scripts/gx_validate_marts.py --sample-fraction 0.05 | --state CA | --drg-range 1-100 [--confidence 0.95]
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+try:
+    import great_expectations as gx
+except ImportError:
+    print("ERROR: Great Expectations not installed.")
+    sys.exit(1)
+
+from gx_results import DATASOURCE_NAME, new_run_time, result_to_dict, save_validation_result, summarize_result
+from gx_sql_engine import (DEFAULT_SAMPLE_KEY, DEFAULT_SCHEMA, SAMPLE_KEYS, Sample, compile_suite, drg_partition,
+                           gx_engine, hash_sample, state_partition, suite_to_dict, table_columns,
+                           validate_suite_sql)
+from profiling import add_profile_argument, profiled, span
+from scorecard_history import history_path, open_history, record_result
+from tracing import start_span
+
+SUITE_PREFIX = "marts."
+RUN_NAME = "marts_validation"
+FAST_RUN_NAME = "marts_fast_validation"
+DEFAULT_MAX_WORKERS = int(os.getenv("GX_MAX_WORKERS", "4"))
+
+
+def discover_suites(context, prefix: str = SUITE_PREFIX) -> List[str]:
+    """Names of all expectation suites starting with prefix"""
+    try:
+        names = [suite.name for suite in context.suites.all()]
+    except AttributeError:
+        names = context.list_expectation_suite_names()
+    return sorted(name for name in names if name.startswith(prefix))
+
+
+def build_sampler(args) -> Optional[Callable[[str, str], Sample]]:
+    """The sample or partition of a table (table, schema) asked for on the command line, if any"""
+    if args.sample_fraction is not None:
+        return lambda table, schema: hash_sample(
+            args.sample_fraction, args.sample_key or SAMPLE_KEYS.get(table, DEFAULT_SAMPLE_KEY), args.confidence
+        )
+    if args.state:
+        return lambda table, schema: state_partition(args.state, schema, args.confidence)
+    if args.drg_range:
+        low, _, high = args.drg_range.partition("-")
+        return lambda table, schema: drg_partition(int(low), int(high or low), args.confidence)
+    return None
+
+
+def validate_suite(context, suite_name: str, build_lock: threading.Lock, run_time: str,
+                   validations_dir: Path, engine: str = "gx",
+                   sampler: Optional[Callable[[str, str], Sample]] = None) -> Dict:
+    """Build the suite's validator (serialized), validate and store the result"""
+    table_name = suite_name.split(".", 1)[1]
+    entry = {"suite": suite_name, "table": table_name, "engine": engine}
+    start = time.perf_counter()
+    with start_span("gx.suite", suite=suite_name, engine=engine) as traced:
+        try:
+            with build_lock, span("gx.get_validator", suite=suite_name):
+                asset = context.fluent_datasources[DATASOURCE_NAME].get_asset(table_name)
+                suite = suite_to_dict(context.suites.get(suite_name)) if engine == "sql" else None
+                schema = getattr(asset, "schema_name", None) or DEFAULT_SCHEMA
+                table = getattr(asset, "table_name", None) or table_name
+                if suite is not None and compile_suite(suite, table, schema).unsupported:
+                    print(f"  {suite_name}: expectations the SQL engine cannot compile - validating with GX"
+                          + (" (all rows)" if sampler else ""))
+                    entry["engine"] = engine = "gx"
+                if engine == "gx":
+                    validator = context.get_validator(
+                        batch_request=asset.build_batch_request(),
+                        expectation_suite_name=suite_name
+                    )
+            sample = None
+            if sampler is not None and engine == "sql":
+                sample = sampler(table, schema)
+                if not set(sample.columns) <= set(table_columns(gx_engine(context), table, schema)):
+                    print(f"  {suite_name}: no {', '.join(sample.columns)} column - validating all rows")
+                    sample = None
+            if sampler is not None:
+                entry["sample"] = sample.description if sample else None
+            built = time.perf_counter()
+            with span("gx.validate", suite=suite_name):
+                if engine == "sql":
+                    result = validate_suite_sql(gx_engine(context), suite, table, schema, sample=sample)
+                else:
+                    result = result_to_dict(validator.validate())
+            finished = time.perf_counter()
+        except Exception as e:
+            traced.fail(e)
+            entry.update({"status": "error", "error": str(e), "seconds": round(time.perf_counter() - start, 3)})
+            return entry
+
+        entry.update(summarize_result(result))
+        entry.update({
+            "status": "passed" if result.get("success") else "failed",
+            "build_seconds": round(built - start, 3),
+            "validate_seconds": round(finished - built, 3),
+            "seconds": round(finished - start, 3),
+            "result_path": str(save_validation_result(result, suite_name, FAST_RUN_NAME if sampler else RUN_NAME,
+                                                      run_time, validations_dir=validations_dir))
+        })
+        traced.set(status=entry["status"], evaluated_expectations=entry["evaluated_expectations"])
+    return entry
+
+
+def validate_suites(context, suite_names: List[str], max_workers: int = DEFAULT_MAX_WORKERS,
+                    engine: str = "gx", sampler: Optional[Callable[[str, str], Sample]] = None) -> Dict:
+    """Validate suites in parallel (sampled, with a sampler); returns the combined result"""
+    run_time = new_run_time()
+    store = "fast_validations" if sampler else "validations"
+    validations_dir = Path(context.root_directory) / "uncommitted" / store
+    build_lock = threading.Lock()
+    start = time.perf_counter()
+    suites = {}
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="gx-validate") as pool:
+        futures = {
+            pool.submit(validate_suite, context, name, build_lock, run_time, validations_dir, engine, sampler): name
+            for name in suite_names
+        }
+        for future in as_completed(futures):
+            entry = future.result()
+            suites[entry["suite"]] = entry
+            print(f"  {entry['status'].upper():<7} {entry['suite']} ({entry['seconds']:.1f}s)"
+                  + (f" [{entry['sample'] or 'all rows'}]" if sampler else ""), flush=True)
+    wall_seconds = time.perf_counter() - start
+
+    return {
+        "run_name": FAST_RUN_NAME if sampler else RUN_NAME,
+        "run_time": run_time,
+        "sampled": sampler is not None,
+        "success": all(s["status"] == "passed" for s in suites.values()),
+        "wall_seconds": round(wall_seconds, 3),
+        "suite_seconds_total": round(sum(s["seconds"] for s in suites.values()), 3),
+        "max_workers": max_workers,
+        "engine": engine,
+        "suites": {name: suites[name] for name in sorted(suites)}
+    }
+
+
+def print_combined(combined: Dict):
+    print()
+    print("=" * 60)
+    print("Marts Validation Results")
+    print("=" * 60)
+    print(f"{'suite':<34} {'status':<7} {'passed':>9} {'build s':>8} {'validate s':>11}")
+    for name, entry in combined["suites"].items():
+        passed = (f"{entry.get('successful_expectations', 0)}/{entry.get('evaluated_expectations', 0)}"
+                  if entry["status"] != "error" else "-")
+        print(f"{name:<34} {entry['status']:<7} {passed:>9} "
+              f"{entry.get('build_seconds', 0):>8.2f} {entry.get('validate_seconds', 0):>11.2f}")
+        for failed in entry.get("failed_expectations", []):
+            print(f"   - {failed['expectation_type']}"
+                  + (f" on {failed['column']}" if failed.get("column") else "")
+                  + (f" (observed {failed['observed_value']})" if failed.get("observed_value") is not None else ""))
+        if entry["status"] == "error":
+            print(f"   ERROR: {entry['error']}")
+    print()
+    print(f"Wall time: {combined['wall_seconds']:.1f}s for {combined['suite_seconds_total']:.1f}s of suite time "
+          f"({combined['max_workers']} workers)")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Validate all marts expectation suites concurrently")
+    parser.add_argument("--max-workers", type=int, default=DEFAULT_MAX_WORKERS,
+                        help="Suites validated at once (also bounds warehouse connections)")
+    parser.add_argument("--suites", nargs="+", default=None,
+                        help="Validate only these suites (default: every marts.* suite)")
+    parser.add_argument("--engine", choices=["gx", "sql"], default="gx",
+                        help="gx: GX metric queries; sql: one aggregate query per suite (gx_sql_engine.py)")
+    fast = parser.add_mutually_exclusive_group()
+    fast.add_argument("--sample-fraction", type=float, default=None,
+                      help="Validate a deterministic hash sample of this fraction of each table (implies --engine sql)")
+    fast.add_argument("--state", default=None, help="Validate one state's rows (implies --engine sql)")
+    fast.add_argument("--drg-range", default=None, metavar="LOW-HIGH",
+                      help="Validate rows with DRG codes in a range (implies --engine sql)")
+    parser.add_argument("--sample-key", default=None,
+                        help="Column hashed for --sample-fraction (default: each table's key)")
+    parser.add_argument("--confidence", type=float, default=0.95,
+                        help="Confidence level of the bounds on sampled results")
+    add_profile_argument(parser)
+    return parser.parse_args(argv)
+
+
+def run_validation(args):
+    with span("gx.get_context"):
+        context = gx.get_context()
+
+    suite_names = args.suites or discover_suites(context)
+    if not suite_names:
+        print("ERROR: No marts.* expectation suites found")
+        sys.exit(1)
+
+    sampler = build_sampler(args)
+    engine = "sql" if sampler else args.engine
+
+    print("=" * 60)
+    print(f"Validating {len(suite_names)} marts suites ({args.max_workers} workers"
+          + (", sampled" if sampler else "") + ")")
+    print("=" * 60)
+    combined = validate_suites(context, suite_names, max_workers=args.max_workers, engine=engine, sampler=sampler)
+    print_combined(combined)
+
+    summary_path = Path(context.root_directory) / "uncommitted" / "marts_validation" / f"{combined['run_time']}.json"
+    summary_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(summary_path, "w") as f:
+        json.dump(combined, f, indent=2, default=str)
+    print(f"Combined result: {summary_path}")
+    if not combined["sampled"]:
+        # The history follows full validations; sampled verdicts are estimates
+        history = open_history(history_path(context.root_directory))
+        for entry in combined["suites"].values():
+            if entry.get("result_path"):
+                with open(entry["result_path"], "r") as f:
+                    record_result(history, entry["suite"], json.load(f))
+    store = "fast_validations" if combined["sampled"] else "validations"
+    print(f"Suite results:   {Path(context.root_directory) / 'uncommitted' / store}/")
+
+    if any(entry["status"] == "error" for entry in combined["suites"].values()):
+        sys.exit(1)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    with profiled(args.profile, "gx_validate_marts"), \
+            start_span("gx_validate_marts", warehouse=os.getenv("SNOWFLAKE_WAREHOUSE")):
+        run_validation(args)
+
+
+if __name__ == "__main__":
+    main()
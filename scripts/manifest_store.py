@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+Consolidated Upload Manifest Store
+Append-only log of what each upload/export run wrote, one record per dataset,
+kept under metadata/manifest_log/:
+
+    segments/<timestamp>_<run>.jsonl   one small segment per run (append)
+    compacted/<timestamp>.jsonl        all records, sorted by dataset and time
+    current.json                       latest good record per dataset + index
+
+current.json is rewritten on every append, so the current version of a
+dataset resolves with a single small read. Compaction folds segments into a
+new compacted file and records each dataset's byte range in it, so one
+dataset's history is a single ranged read.
+
+Writers update current.json with a conditional put (If-Match on the ETag they
+read) and re-read and re-apply their change when another writer got there
+first, so an upload and a gold export running at the same time (or an append
+during compaction) never lose each other's records. Conditional puts need
+boto3/botocore 1.35.69 or newer.
+
+Usage:
+    python scripts/manifest_store.py current [--layer bronze] [--dataset ipps_charges]
+    python scripts/manifest_store.py history --dataset ipps_charges
+    python scripts/manifest_store.py compact
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import time
+import uuid
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_LOG_PREFIX = 'metadata/manifest_log'
+CURRENT_KEY = f'{MANIFEST_LOG_PREFIX}/current.json'
+SEGMENTS_PREFIX = f'{MANIFEST_LOG_PREFIX}/segments/'
+COMPACTED_PREFIX = f'{MANIFEST_LOG_PREFIX}/compacted/'
+COMPACT_AFTER_SEGMENTS = int(os.getenv('MANIFEST_COMPACT_AFTER_SEGMENTS', '20'))
+CURRENT_UPDATE_ATTEMPTS = 10
+
+# Statuses that mean the dataset's object is in place and usable
+GOOD_STATUSES = ('success', 'skipped')
+
+
+def _get_json(s3_client, bucket, key, default=None):
+    try:
+        body = s3_client.get_object(Bucket=bucket, Key=key)['Body'].read()
+    except s3_client.exceptions.NoSuchKey:
+        return default
+    return json.loads(body)
+
+
+def _put(s3_client, bucket, key, body, content_type):
+    s3_client.put_object(
+        Bucket=bucket,
+        Key=key,
+        Body=body,
+        ContentType=content_type,
+        Metadata={'purpose': 'manifest_log'}
+    )
+
+
+def _empty_current():
+    return {'datasets': {}, 'compacted_key': None, 'offsets': {}, 'segments': 0}
+
+
+class ConcurrentUpdateError(RuntimeError):
+    """current.json kept changing under us for CURRENT_UPDATE_ATTEMPTS attempts"""
+
+
+def _is_precondition_failure(error):
+    response = getattr(error, 'response', None) or {}
+    return (response.get('Error', {}).get('Code') in ('PreconditionFailed', 'ConditionalRequestConflict')
+            or response.get('ResponseMetadata', {}).get('HTTPStatusCode') in (409, 412))
+
+
+def update_current(s3_client, bucket, apply):
+    """Read-modify-write current.json with optimistic concurrency.
+
+    ``apply(current)`` changes the document in place (return False to skip
+    the write); it is called again on a fresh read whenever another writer
+    updated current.json in between, so it must derive its change from the
+    document it is given. Returns the document written (or the one skipped).
+    """
+    for attempt in range(CURRENT_UPDATE_ATTEMPTS):
+        try:
+            response = s3_client.get_object(Bucket=bucket, Key=CURRENT_KEY)
+            current, condition = json.loads(response['Body'].read()), {'IfMatch': response['ETag']}
+        except s3_client.exceptions.NoSuchKey:
+            current, condition = _empty_current(), {'IfNoneMatch': '*'}
+        if apply(current) is False:
+            return current
+        try:
+            s3_client.put_object(
+                Bucket=bucket,
+                Key=CURRENT_KEY,
+                Body=json.dumps(current, indent=2, sort_keys=True),
+                ContentType='application/json',
+                Metadata={'purpose': 'manifest_log'},
+                **condition
+            )
+            return current
+        except s3_client.exceptions.ClientError as e:
+            if not _is_precondition_failure(e):
+                raise
+        delay = 0.05 * 2 ** attempt
+        time.sleep(delay + random.uniform(0, delay))
+    raise ConcurrentUpdateError(f"Could not update {CURRENT_KEY} after {CURRENT_UPDATE_ATTEMPTS} attempts")
+
+
+def dataset_id(layer, dataset):
+    return f'{layer}/{dataset}'
+
+
+def append_manifest_records(s3_client, bucket, records, run_type, manifest_key=None):
+    """Append one run's records to the log and update current.json.
+
+    Each record needs ``layer``, ``dataset``, ``status`` and ``timestamp``;
+    any other fields (s3_key, rows, bytes, sha256, etag...) are kept as is.
+    Compacts the log once COMPACT_AFTER_SEGMENTS segments have accumulated.
+    Returns the segment key.
+    """
+    if not records:
+        return None
+    for record in records:
+        record.setdefault('run_type', run_type)
+        if manifest_key:
+            record.setdefault('manifest_key', manifest_key)
+
+    stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%fZ')
+    segment_key = f'{SEGMENTS_PREFIX}{stamp}_{run_type}_{uuid.uuid4().hex[:8]}.jsonl'
+    body = ''.join(json.dumps(r, sort_keys=True) + '\n' for r in records)
+    _put(s3_client, bucket, segment_key, body, 'application/x-ndjson')
+
+    def apply(current):
+        for record in records:
+            if record['status'] not in GOOD_STATUSES:
+                continue
+            ds_id = dataset_id(record['layer'], record['dataset'])
+            previous = current['datasets'].get(ds_id)
+            if record['status'] == 'skipped' and previous and previous.get('etag') == record.get('etag'):
+                # Same object as before - keep the record of the run that wrote it
+                previous['verified_at'] = record['timestamp']
+            elif previous is None or previous['timestamp'] <= record['timestamp']:
+                current['datasets'][ds_id] = dict(record)
+        current['segments'] = current.get('segments', 0) + 1
+        current['updated_at'] = datetime.now(timezone.utc).isoformat()
+
+    current = update_current(s3_client, bucket, apply)
+    logger.info(f"Appended {len(records)} records to manifest log: {segment_key}")
+
+    if current['segments'] >= COMPACT_AFTER_SEGMENTS:
+        compact_manifest_log(s3_client, bucket)
+    return segment_key
+
+
+def _list_keys(s3_client, bucket, prefix):
+    keys = []
+    paginator = s3_client.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        keys.extend(obj['Key'] for obj in page.get('Contents', []))
+    return sorted(keys)
+
+
+def _read_jsonl(s3_client, bucket, key, byte_range=None):
+    kwargs = {'Bucket': bucket, 'Key': key}
+    if byte_range:
+        kwargs['Range'] = f'bytes={byte_range[0]}-{byte_range[1] - 1}'
+    body = s3_client.get_object(**kwargs)['Body'].read().decode('utf-8')
+    return [json.loads(line) for line in body.splitlines() if line.strip()]
+
+
+def compact_manifest_log(s3_client, bucket):
+    """Fold all segments into a new compacted file and drop the merged segments.
+
+    The compacted file is sorted by (layer/dataset, timestamp); current.json
+    records the byte range each dataset occupies in it. Segments appended
+    while compacting are left for the next compaction; if another compaction
+    finishes first, this one discards its output.
+    """
+    current = _get_json(s3_client, bucket, CURRENT_KEY, _empty_current())
+    segment_keys = _list_keys(s3_client, bucket, SEGMENTS_PREFIX)
+    if not segment_keys:
+        return current.get('compacted_key')
+
+    records = []
+    try:
+        if current.get('compacted_key'):
+            records.extend(_read_jsonl(s3_client, bucket, current['compacted_key']))
+        for key in segment_keys:
+            records.extend(_read_jsonl(s3_client, bucket, key))
+    except s3_client.exceptions.NoSuchKey:
+        # Another compaction committed and removed what it merged
+        logger.info("Manifest log was compacted concurrently; skipping this compaction")
+        return _get_json(s3_client, bucket, CURRENT_KEY, _empty_current()).get('compacted_key')
+    records.sort(key=lambda r: (dataset_id(r['layer'], r['dataset']), r['timestamp']))
+
+    lines = []
+    offsets = {}
+    position = 0
+    for record in records:
+        line = (json.dumps(record, sort_keys=True) + '\n').encode('utf-8')
+        ds_id = dataset_id(record['layer'], record['dataset'])
+        start, _ = offsets.get(ds_id, (position, position))
+        offsets[ds_id] = (start, position + len(line))
+        lines.append(line)
+        position += len(line)
+
+    compacted_key = f"{COMPACTED_PREFIX}{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%fZ')}.jsonl"
+    _put(s3_client, bucket, compacted_key, b''.join(lines), 'application/x-ndjson')
+
+    previous = current.get('compacted_key')
+
+    def apply(latest):
+        if latest.get('compacted_key') != previous:
+            return False
+        latest.update({
+            'compacted_key': compacted_key,
+            'offsets': offsets,
+            'segments': max(0, latest.get('segments', 0) - len(segment_keys)),
+            'compacted_at': datetime.now(timezone.utc).isoformat()
+        })
+
+    if update_current(s3_client, bucket, apply).get('compacted_key') != compacted_key:
+        # Another compaction replaced the compacted file (and merged these segments) first
+        s3_client.delete_object(Bucket=bucket, Key=compacted_key)
+        logger.info("Manifest log was compacted concurrently; discarded this compaction")
+        return previous
+
+    stale = segment_keys + ([previous] if previous else [])
+    for i in range(0, len(stale), 1000):
+        s3_client.delete_objects(
+            Bucket=bucket,
+            Delete={'Objects': [{'Key': key} for key in stale[i:i + 1000]]}
+        )
+    logger.info(f"Compacted {len(segment_keys)} segments ({len(records)} records) into {compacted_key}")
+    return compacted_key
+
+
+def resolve_current(s3_client, bucket, layer='bronze', dataset=None):
+    """Return the latest good record(s) for a layer with one small read.
+
+    With ``dataset`` returns that dataset's record (or None); otherwise a
+    dict of dataset -> record for the layer.
+    """
+    current = _get_json(s3_client, bucket, CURRENT_KEY, _empty_current())
+    if dataset:
+        return current['datasets'].get(dataset_id(layer, dataset))
+    return {
+        record['dataset']: record
+        for record in current['datasets'].values()
+        if record['layer'] == layer
+    }
+
+
+def dataset_history(s3_client, bucket, layer, dataset):
+    """All records for one dataset: a ranged read of the compacted file plus recent segments."""
+    current = _get_json(s3_client, bucket, CURRENT_KEY, _empty_current())
+    ds_id = dataset_id(layer, dataset)
+    records = []
+    if current.get('compacted_key') and ds_id in current.get('offsets', {}):
+        records.extend(_read_jsonl(s3_client, bucket, current['compacted_key'], current['offsets'][ds_id]))
+    for key in _list_keys(s3_client, bucket, SEGMENTS_PREFIX):
+        try:
+            segment = _read_jsonl(s3_client, bucket, key)
+        except s3_client.exceptions.NoSuchKey:
+            continue  # merged and removed by a compaction since the listing
+        records.extend(r for r in segment if r['layer'] == layer and r['dataset'] == dataset)
+    # A compaction removes merged segments after committing, so a record can briefly be in both
+    unique = {json.dumps(r, sort_keys=True): r for r in records}
+    return sorted(unique.values(), key=lambda r: r['timestamp'])
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Query and compact the consolidated manifest log')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    current = subparsers.add_parser('current', help='Current version per dataset')
+    current.add_argument('--layer', default='bronze', choices=['bronze', 'silver', 'gold'])
+    current.add_argument('--dataset', default=None)
+
+    history = subparsers.add_parser('history', help='All recorded versions of a dataset')
+    history.add_argument('--layer', default='bronze', choices=['bronze', 'silver', 'gold'])
+    history.add_argument('--dataset', required=True)
+
+    subparsers.add_parser('compact', help='Fold segments into a compacted file')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    from s3_upload import S3_BUCKET_NAME, initialize_s3_client
+
+    args = parse_args(argv)
+    s3_client = initialize_s3_client()
+
+    if args.command == 'current':
+        if args.dataset:
+            records = {args.dataset: resolve_current(s3_client, S3_BUCKET_NAME, args.layer, args.dataset)}
+        else:
+            records = resolve_current(s3_client, S3_BUCKET_NAME, args.layer)
+        print(json.dumps(records, indent=2, sort_keys=True))
+    elif args.command == 'history':
+        for record in dataset_history(s3_client, S3_BUCKET_NAME, args.layer, args.dataset):
+            print(json.dumps(record, sort_keys=True))
+    elif args.command == 'compact':
+        compacted_key = compact_manifest_log(s3_client, S3_BUCKET_NAME)
+        print(f"Compacted manifest log: {compacted_key}")
+
+
+if __name__ == '__main__':
+    main()
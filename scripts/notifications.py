@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+"""
+Background notification dispatcher for Slack webhooks
+notify() only enqueues; a worker thread posts through one pooled HTTP session,
+so the pipeline never waits on Slack. Repeated alerts (same status and text)
+within DEDUP_WINDOW are suppressed, and past RATE_LIMIT messages per
+RATE_PERIOD further alerts are collapsed into a single digest message.
+Payloads that cannot be delivered (connection errors, 429, 5xx) are appended
+to a spool file and re-sent after the next successful delivery or run;
+spool lines that cannot be read are moved to <spool>.corrupt. Errors in the
+worker are logged and never stop it.
+
+Usage:
+    python scripts/notifications.py stand-in [--port 8765] [--fail-status 503]
+    python scripts/notifications.py send "message" [--status failure] [--webhook-url http://localhost:8765]
+"""
+
+import argparse
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from collections import Counter, OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from tracing import start_span
+
+SPOOL_PATH = os.getenv('NOTIFY_SPOOL_PATH', 'logs/notification_spool.jsonl')
+MAX_QUEUE = 100
+RATE_LIMIT = int(os.getenv('NOTIFY_RATE_LIMIT', '5'))          # messages ...
+RATE_PERIOD = float(os.getenv('NOTIFY_RATE_PERIOD', '60'))     # ... per this many seconds
+DEDUP_WINDOW = float(os.getenv('NOTIFY_DEDUP_WINDOW', '300'))  # seconds
+FLUSH_TIMEOUT = float(os.getenv('NOTIFY_FLUSH_TIMEOUT', '5'))  # longest wait at exit
+REQUEST_TIMEOUT = (3.05, 5)
+DIGEST_LINES = 10
+USERNAME = "Healthcare Analytics Pipeline"
+
+STATUS_EMOJI = {
+    "success": ":white_check_mark:",
+    "failure": ":x:",
+    "failed": ":x:",
+    "warning": ":warning:",
+    "info": ":information_source:"
+}
+
+_FLUSH = object()
+_STOP = object()
+
+logger = logging.getLogger('pipeline.notifications')
+
+
+class NotificationDispatcher:
+    """Queue-backed, rate-limited webhook sender running on a daemon thread."""
+
+    def __init__(self, webhook_url: str, max_queue: int = MAX_QUEUE, rate_limit: int = RATE_LIMIT,
+                 rate_period: float = RATE_PERIOD, dedup_window: float = DEDUP_WINDOW,
+                 spool_path: str = SPOOL_PATH):
+        self.webhook_url = webhook_url
+        self.rate_limit = rate_limit
+        self.rate_period = rate_period
+        self.dedup_window = dedup_window
+        self.spool_path = Path(spool_path)
+
+        self.session = requests.Session()
+        self.session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        self.session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=2))
+
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._spool_lock = threading.Lock()
+        self._recent: OrderedDict = OrderedDict()  # dedup key -> last sent (monotonic)
+        self._sent_times: List[float] = []
+        self._digest: Counter = Counter()           # (status, text) -> suppressed count
+        self.stats = Counter()
+        self._thread = threading.Thread(target=self._run, name='notification-dispatcher', daemon=True)
+        self._thread.start()
+
+    # Producer side -------------------------------------------------------
+
+    def notify(self, text: str, status: str = "info", **fields) -> bool:
+        """Queue a message; returns False if the queue is full and it was dropped."""
+        try:
+            self._queue.put_nowait((status, text, fields))
+            return True
+        except queue.Full:
+            self.stats['dropped'] += 1
+            return False
+
+    def flush(self, timeout: float = FLUSH_TIMEOUT) -> bool:
+        """Wait until everything queued so far (and any digest) has been handled."""
+        done = threading.Event()
+        try:
+            self._queue.put((_FLUSH, done), timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def close(self, timeout: float = FLUSH_TIMEOUT):
+        """Flush, stop the worker and spool whatever could not be sent in time."""
+        if not self._thread.is_alive():
+            return
+        if not self.flush(timeout):
+            self._spool_queued()
+        else:
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+        self.session.close()
+
+    # Worker side ---------------------------------------------------------
+
+    def _run(self):
+        try:
+            self._drain_spool()
+        except Exception:
+            logger.exception("Could not re-send spooled notifications")
+        while True:
+            try:
+                item = self._queue.get(timeout=1.0)
+            except queue.Empty:
+                item = None
+            if item is _STOP:
+                return
+            # One bad message (or a failing spool write) must not kill the worker:
+            # every later alert would be queued and silently lost
+            try:
+                if item is None:
+                    self._maybe_send_digest()
+                elif isinstance(item, tuple) and item[0] is _FLUSH:
+                    try:
+                        self._maybe_send_digest(force=True)
+                    finally:
+                        item[1].set()
+                else:
+                    status, text, fields = item
+                    self._handle(status, text, fields)
+                    self._maybe_send_digest()
+            except Exception:
+                self.stats['errors'] += 1
+                logger.exception("Notification dispatcher error; continuing")
+
+    def _handle(self, status: str, text: str, fields: Dict):
+        now = time.monotonic()
+        key = (status, text)
+        last = self._recent.get(key)
+        if last is not None and now - last < self.dedup_window:
+            self.stats['deduplicated'] += 1
+            return
+        self._recent[key] = now
+        self._recent.move_to_end(key)
+        while len(self._recent) > 1000:
+            self._recent.popitem(last=False)
+
+        if not self._take_token(now):
+            self._digest[key] += 1
+            self.stats['digested'] += 1
+            return
+        self._deliver(build_payload(text, status, **fields))
+
+    def _take_token(self, now: float) -> bool:
+        self._sent_times = [t for t in self._sent_times if now - t < self.rate_period]
+        if len(self._sent_times) >= self.rate_limit:
+            return False
+        self._sent_times.append(now)
+        return True
+
+    def _maybe_send_digest(self, force: bool = False):
+        if not self._digest or (not force and not self._take_token(time.monotonic())):
+            return
+        total = sum(self._digest.values())
+        lines = [f"{count}x [{status}] {text}" for (status, text), count in self._digest.most_common(DIGEST_LINES)]
+        if len(self._digest) > DIGEST_LINES:
+            lines.append(f"... and {len(self._digest) - DIGEST_LINES} more")
+        if self.stats['dropped']:
+            lines.append(f"({self.stats['dropped']} alerts dropped: queue full)")
+        worst = 'failure' if any(s in ('failure', 'failed') for s, _ in self._digest) else 'warning'
+        self._digest.clear()
+        self._deliver(build_payload(f"Alert digest: {total} alerts suppressed\n" + "\n".join(lines), worst))
+
+    def _post(self, payload: Dict) -> str:
+        """Post one payload: 'sent', 'rejected' (4xx, not retryable) or 'retry' (spool it)"""
+        with start_span("slack.post") as traced:
+            try:
+                response = self.session.post(self.webhook_url, json=payload, timeout=REQUEST_TIMEOUT)
+                traced.set(http_status=response.status_code)
+                if response.status_code == 429 or response.status_code >= 500:
+                    raise requests.HTTPError(f"HTTP {response.status_code}")
+            except requests.RequestException as e:
+                traced.fail(e)
+                logger.warning("Slack unreachable (%s); notification spooled to %s", e, self.spool_path)
+                return 'retry'
+            if response.status_code >= 400:
+                # Bad payload or revoked webhook: sending it again will not help
+                traced.fail(f"HTTP {response.status_code}")
+                self.stats['rejected'] += 1
+                logger.warning("Slack rejected notification: HTTP %s", response.status_code)
+                return 'rejected'
+        self.stats['sent'] += 1
+        return 'sent'
+
+    def _deliver(self, payload: Dict) -> bool:
+        """Post one payload; transient failures go to the spool."""
+        outcome = self._post(payload)
+        if outcome == 'retry':
+            self._spool([payload])
+        elif outcome == 'sent':
+            self._drain_spool()
+        return outcome == 'sent'
+
+    # Spool -----------------------------------------------------------------
+
+    def _spool(self, payloads: List[Dict]):
+        with self._spool_lock:
+            self.spool_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.spool_path, 'a') as f:
+                for payload in payloads:
+                    f.write(json.dumps(payload) + '\n')
+        self.stats['spooled'] += len(payloads)
+
+    def _spool_queued(self):
+        payloads = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(item, tuple) and len(item) == 3:
+                payloads.append(build_payload(item[1], item[0], **item[2]))
+        if payloads:
+            self._spool(payloads)
+
+    def _drain_spool(self):
+        """Re-send spooled payloads; more than the rate limit are sent as one digest."""
+        with self._spool_lock:
+            if not self.spool_path.exists():
+                return
+            payloads, corrupt = [], []
+            with open(self.spool_path, 'r', errors='replace') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        payload = json.loads(line)
+                    except ValueError:
+                        payload = None
+                    if isinstance(payload, dict):
+                        payloads.append(payload)
+                    else:
+                        corrupt.append(line if line.endswith('\n') else line + '\n')
+            if corrupt:
+                # E.g. a line cut short by a crash mid-write: keep it for inspection
+                with open(f"{self.spool_path}.corrupt", 'a') as f:
+                    f.writelines(corrupt)
+                self.stats['corrupt_spooled'] += len(corrupt)
+                logger.warning("Moved %d unreadable spool line(s) to %s.corrupt", len(corrupt), self.spool_path)
+            self.spool_path.unlink()
+        if not payloads:
+            return
+        if len(payloads) > self.rate_limit:
+            texts = [p.get('attachments', [{}])[0].get('text') or p.get('text', '') for p in payloads]
+            payloads = [build_payload(
+                f"Delivered late: {len(texts)} notifications spooled while Slack was unreachable\n"
+                + "\n".join(texts[-DIGEST_LINES:]), 'warning'
+            )]
+        for i, payload in enumerate(payloads):
+            # Rejected (4xx) payloads are dropped like live ones; stop at the first transient failure
+            if self._post(payload) == 'retry':
+                self._spool(payloads[i:])
+                return
+
+
+def build_payload(text: str, status: str = "info", username: str = USERNAME,
+                  icon_emoji: str = ":hospital:") -> Dict:
+    """Slack webhook payload in the format send_slack_alert.py has always used"""
+    return {
+        "text": f"{STATUS_EMOJI.get(status, STATUS_EMOJI['info'])} {text}",
+        "username": username,
+        "icon_emoji": icon_emoji,
+        "attachments": [
+            {
+                "color": "good" if status == "success" else "danger" if status in ("failure", "failed") else "warning",
+                "text": text,
+                "footer": "Healthcare Analytics Platform",
+                "ts": int(time.time())
+            }
+        ]
+    }
+
+
+_dispatchers: Dict[str, NotificationDispatcher] = {}
+_dispatchers_lock = threading.Lock()
+
+
+def get_dispatcher(webhook_url: Optional[str] = None) -> Optional[NotificationDispatcher]:
+    """Process-wide dispatcher for a webhook (SLACK_WEBHOOK_URL by default), flushed at exit"""
+    webhook_url = webhook_url or os.getenv('SLACK_WEBHOOK_URL')
+    if not webhook_url:
+        return None
+    with _dispatchers_lock:
+        dispatcher = _dispatchers.get(webhook_url)
+        if dispatcher is None:
+            dispatcher = _dispatchers[webhook_url] = NotificationDispatcher(webhook_url)
+        return dispatcher
+
+
+@atexit.register
+def close_dispatchers(timeout: float = FLUSH_TIMEOUT):
+    for dispatcher in list(_dispatchers.values()):
+        dispatcher.close(timeout)
+
+
+def serve_stand_in(port: int, fail_status: Optional[int] = None):
+    """Local webhook receiver that prints every payload (or answers fail_status)"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            status = fail_status or 200
+            self.send_response(status)
+            self.end_headers()
+            self.wfile.write(b'ok' if status == 200 else b'error')
+            text = json.loads(body or b'{}').get('text', '')
+            print(f"[{time.strftime('%H:%M:%S')}] HTTP {status}  {text}", flush=True)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+    print(f"Webhook stand-in listening on http://127.0.0.1:{port} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Slack notification dispatcher')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    stand_in = subparsers.add_parser('stand-in', help='Run a local webhook receiver for testing')
+    stand_in.add_argument('--port', type=int, default=8765)
+    stand_in.add_argument('--fail-status', type=int, default=None,
+                          help='Answer every request with this HTTP status (e.g. 503)')
+
+    send = subparsers.add_parser('send', help='Send one notification through the dispatcher')
+    send.add_argument('message')
+    send.add_argument('--status', default='info', choices=sorted(STATUS_EMOJI))
+    send.add_argument('--webhook-url', default=os.getenv('SLACK_WEBHOOK_URL'))
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.command == 'stand-in':
+        serve_stand_in(args.port, args.fail_status)
+    elif args.command == 'send':
+        dispatcher = get_dispatcher(args.webhook_url)
+        if dispatcher is None:
+            raise SystemExit("No webhook URL: pass --webhook-url or set SLACK_WEBHOOK_URL")
+        dispatcher.notify(args.message, args.status)
+        dispatcher.close()
+        print(dict(dispatcher.stats))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""
+State tracking for run_pipeline_enhanced.py --changed-only
+Keeps the manifest.json and raw-source fingerprints (row count and last-altered
+time per raw.* table) of the last successful run, and turns the differences
+into a dbt selector: modified models (state:modified+) plus everything
+downstream of changed source tables (source:raw.<table>+).
+"""
+
+import json
+import shlex
+import shutil
+import subprocess
+from pathlib import Path
+from typing import Dict, List, Optional
+
+STATE_DIR = Path(".pipeline_state")
+FINGERPRINTS_FILE = "source_fingerprints.json"
+SOURCE_NAME = "raw"
+
+
+def fetch_source_fingerprints() -> Dict[str, Dict]:
+    """Query row count / last-altered per raw table through dbt's own connection"""
+    result = subprocess.run(
+        "dbt run-operation source_fingerprints --quiet",
+        shell=True, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Could not fingerprint raw sources: {result.stderr or result.stdout}")
+    for line in reversed(result.stdout.strip().splitlines()):
+        if line.startswith("{"):
+            return json.loads(line)
+    raise RuntimeError(f"No fingerprints in dbt output: {result.stdout[-500:]}")
+
+
+def load_previous_fingerprints(state_dir: Path = STATE_DIR) -> Optional[Dict[str, Dict]]:
+    path = state_dir / FINGERPRINTS_FILE
+    if not path.exists():
+        return None
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def has_previous_manifest(state_dir: Path = STATE_DIR) -> bool:
+    return (state_dir / "manifest.json").exists()
+
+
+def changed_sources(previous: Dict[str, Dict], current: Dict[str, Dict]) -> List[str]:
+    """Raw tables that are new or whose row count / last-altered time moved"""
+    return sorted(table for table, fingerprint in current.items() if previous.get(table) != fingerprint)
+
+
+def list_models(select: Optional[str] = None, state_dir: Path = STATE_DIR) -> List[str]:
+    """Model names matching a selector (all models without one), via dbt ls"""
+    command = "dbt ls --quiet --resource-type model --output name"
+    if select:
+        command += f" --select {shlex.quote(select)} --state {shlex.quote(str(state_dir))}"
+    result = subprocess.run(command, shell=True, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"dbt ls failed: {result.stderr or result.stdout}")
+    return [line.strip() for line in result.stdout.splitlines() if line.strip()]
+
+
+def plan_changed_only(state_dir: Path = STATE_DIR) -> Dict:
+    """Work out what a --changed-only run has to build.
+
+    Returns selector (None = build everything), the selected and total model
+    counts, the changed source tables and the current fingerprints (saved
+    once the run succeeds).
+    """
+    fingerprints = fetch_source_fingerprints()
+    previous = load_previous_fingerprints(state_dir)
+    total = list_models()
+
+    if previous is None or not has_previous_manifest(state_dir):
+        return {
+            'selector': None,
+            'reason': "no previous state - building everything",
+            'selected': total,
+            'total': len(total),
+            'changed_sources': [],
+            'fingerprints': fingerprints
+        }
+
+    sources = changed_sources(previous, fingerprints)
+    selector = " ".join(["state:modified+"] + [f"source:{SOURCE_NAME}.{table}+" for table in sources])
+    selected = list_models(selector, state_dir)
+    return {
+        'selector': selector,
+        'reason': "modified models and changed sources",
+        'selected': selected,
+        'total': len(total),
+        'changed_sources': sources,
+        'fingerprints': fingerprints
+    }
+
+
+def layer_selector(selector: str, layer: str) -> str:
+    """Intersect each part of a union selector with a model layer"""
+    return " ".join(f"{part},{layer}" for part in selector.split())
+
+
+def save_state(fingerprints: Dict[str, Dict], target_dir: Path = Path("target"),
+               state_dir: Path = STATE_DIR):
+    """Record the manifest and source fingerprints of a successful run"""
+    state_dir.mkdir(parents=True, exist_ok=True)
+    shutil.copy2(target_dir / "manifest.json", state_dir / "manifest.json")
+    with open(state_dir / FINGERPRINTS_FILE, "w") as f:
+        json.dump(fingerprints, f, indent=2, sort_keys=True)
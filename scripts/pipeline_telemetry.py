@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+"""
+Pipeline Timing Telemetry
+Stores per-step (wall time, CPU time, peak RSS, attempts) and per-dbt-node
+(execution_time from run_results.json) timings of every run_pipeline_enhanced.py
+run in a local SQLite history, and writes the latest run as a Prometheus
+textfile for node_exporter's textfile collector.
+
+The regressions command compares a run_results.json with a rolling baseline of
+each node's previous execution times and exits non-zero when a model or test
+slows down past --fail-ratio, so it can gate CI.
+
+Usage:
+    python scripts/pipeline_telemetry.py regressions [--run-results target/run_results.json] [--record]
+    python scripts/pipeline_telemetry.py top [--days 7] [--limit 15]
+    python scripts/pipeline_telemetry.py trend --node fct_inpatient_charges [--weeks 8]
+    python scripts/pipeline_telemetry.py steps [--runs 10]
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import statistics
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List
+
+from pipeline_state import STATE_DIR
+
+HISTORY_PATH = os.getenv('PIPELINE_HISTORY_PATH', str(STATE_DIR / 'run_history.db'))
+PROMETHEUS_TEXTFILE = os.getenv('PIPELINE_PROM_TEXTFILE', 'logs/pipeline_metrics.prom')
+
+# Regression detection defaults
+BASELINE_RUNS = 20          # previous executions per node in the rolling baseline
+MIN_BASELINE_SAMPLES = 5    # fewer than this and a node is not judged
+MIN_SECONDS = 1.0           # ignore nodes faster than this (noise)
+WARN_RATIO = 1.5            # flag significant slowdowns from this ratio to the baseline median
+FAIL_RATIO = 3.0            # exit non-zero from this ratio
+MIN_ROBUST_Z = 3.0          # (current - median) / (1.4826 * MAD) needed to call it significant
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    started_at TEXT NOT NULL,
+    status TEXT NOT NULL,
+    wall_seconds REAL
+);
+
+CREATE TABLE IF NOT EXISTS step_runs (
+    run_id TEXT NOT NULL,
+    step TEXT NOT NULL,
+    status TEXT NOT NULL,
+    wall_seconds REAL,
+    cpu_seconds REAL,
+    peak_rss_bytes INTEGER,
+    attempts INTEGER,
+    PRIMARY KEY (run_id, step)
+);
+
+CREATE TABLE IF NOT EXISTS node_runs (
+    run_id TEXT NOT NULL,
+    step TEXT NOT NULL,
+    unique_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    resource_type TEXT NOT NULL,
+    status TEXT,
+    execution_time REAL,
+    started_at TEXT NOT NULL,
+    invocation_id TEXT,
+    PRIMARY KEY (run_id, step, unique_id)
+);
+CREATE INDEX IF NOT EXISTS idx_node_runs_name ON node_runs (name, started_at);
+CREATE INDEX IF NOT EXISTS idx_node_runs_unique_id ON node_runs (unique_id, started_at);
+CREATE INDEX IF NOT EXISTS idx_node_runs_started ON node_runs (started_at);
+"""
+
+
+def open_history(path=HISTORY_PATH):
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    _migrate(conn)
+    return conn
+
+
+def _migrate(conn):
+    """Bring histories created by older versions up to SCHEMA"""
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(node_runs)")}
+    if 'invocation_id' not in columns:
+        with conn:
+            conn.execute("ALTER TABLE node_runs ADD COLUMN invocation_id TEXT")
+
+
+def node_timings(run_results: Dict) -> List[Dict]:
+    """Per-node timings from a dbt run_results.json document"""
+    timings = []
+    invocation_id = run_results.get('metadata', {}).get('invocation_id')
+    for result in run_results.get('results', []):
+        unique_id = result.get('unique_id', '')
+        timings.append({
+            'unique_id': unique_id,
+            'name': unique_id.split('.')[-1],
+            'resource_type': unique_id.split('.')[0],
+            'status': result.get('status'),
+            'execution_time': result.get('execution_time'),
+            'invocation_id': invocation_id
+        })
+    return timings
+
+
+def record_run(conn, run_id: str, started_at: str, status: str, wall_seconds: float,
+               steps: Dict[str, Dict], nodes: Dict[str, List[Dict]]):
+    """Append one run: ``steps`` is step -> result, ``nodes`` is step -> node timings"""
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO runs (run_id, started_at, status, wall_seconds) VALUES (?, ?, ?, ?)",
+            (run_id, started_at, status, wall_seconds)
+        )
+        conn.executemany(
+            "INSERT OR REPLACE INTO step_runs VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [
+                (run_id, step, r['status'], r.get('seconds'), r.get('cpu_seconds'),
+                 r.get('peak_rss_bytes'), r.get('attempts'))
+                for step, r in steps.items() if not r.get('previous_run')
+            ]
+        )
+        conn.executemany(
+            "INSERT OR REPLACE INTO node_runs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (run_id, step, n['unique_id'], n['name'], n['resource_type'], n['status'],
+                 n['execution_time'], started_at, n.get('invocation_id'))
+                for step, step_nodes in nodes.items() for n in step_nodes
+            ]
+        )
+
+
+def _labels(**labels) -> str:
+    def escape(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{' + ','.join(f'{key}="{escape(value)}"' for key, value in labels.items()) + '}'
+
+
+def write_prometheus_textfile(run_id: str, status: str, wall_seconds: float, steps: Dict[str, Dict],
+                              nodes: Dict[str, List[Dict]], path: str = PROMETHEUS_TEXTFILE):
+    """Write the run's metrics in Prometheus text format (atomically, for the textfile collector)"""
+    metrics = {
+        'pipeline_last_run_timestamp_seconds': ('gauge', 'Unix time the last pipeline run finished',
+                                                [('', datetime.now(timezone.utc).timestamp())]),
+        'pipeline_last_run_success': ('gauge', '1 if the last pipeline run succeeded',
+                                      [('', 1 if status == 'success' else 0)]),
+        'pipeline_run_duration_seconds': ('gauge', 'Wall time of the last pipeline run',
+                                          [('', wall_seconds)]),
+        'pipeline_step_duration_seconds': ('gauge', 'Wall time per pipeline step', []),
+        'pipeline_step_cpu_seconds': ('gauge', 'CPU time (user + system) per pipeline step', []),
+        'pipeline_step_peak_rss_bytes': ('gauge', 'Peak resident memory per pipeline step', []),
+        'pipeline_step_attempts': ('gauge', 'Attempts per pipeline step (retries + 1)', []),
+        'dbt_node_execution_seconds': ('gauge', 'dbt execution_time per node in the last run', []),
+    }
+    for step, result in steps.items():
+        if result.get('previous_run') or result['status'] in ('disabled', 'not_run'):
+            continue
+        labels = _labels(step=step, status=result['status'])
+        metrics['pipeline_step_duration_seconds'][2].append((labels, result.get('seconds', 0)))
+        metrics['pipeline_step_attempts'][2].append((labels, result.get('attempts', 1)))
+        if result.get('cpu_seconds') is not None:
+            metrics['pipeline_step_cpu_seconds'][2].append((labels, result['cpu_seconds']))
+        if result.get('peak_rss_bytes') is not None:
+            metrics['pipeline_step_peak_rss_bytes'][2].append((labels, result['peak_rss_bytes']))
+    for step, step_nodes in nodes.items():
+        for node in step_nodes:
+            if node['execution_time'] is not None:
+                metrics['dbt_node_execution_seconds'][2].append((
+                    _labels(step=step, node=node['name'], resource_type=node['resource_type'],
+                            status=node['status']),
+                    node['execution_time']
+                ))
+
+    lines = []
+    for name, (metric_type, help_text, samples) in metrics.items():
+        if not samples:
+            continue
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        lines.extend(f"{name}{labels} {value}" for labels, value in samples)
+
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = f"{path}.{run_id}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+    os.replace(tmp_path, path)
+
+
+# -- Queries ---------------------------------------------------------------
+
+def top_nodes(conn, days: int = 7, limit: int = 15):
+    """Nodes with the most total execution time over the window"""
+    since = (datetime.now(timezone.utc) - timedelta(days=days)).isoformat()
+    return conn.execute(
+        "SELECT name, resource_type, COUNT(*), SUM(execution_time), AVG(execution_time), MAX(execution_time) "
+        "FROM node_runs WHERE started_at >= ? AND execution_time IS NOT NULL "
+        "GROUP BY name, resource_type ORDER BY SUM(execution_time) DESC LIMIT ?",
+        (since, limit)
+    ).fetchall()
+
+
+def weekly_trend(conn, node: str, weeks: int = 8):
+    """Average execution time of one node per calendar week"""
+    since = (datetime.now(timezone.utc) - timedelta(weeks=weeks)).isoformat()
+    return conn.execute(
+        "SELECT strftime('%Y-W%W', started_at) AS week, COUNT(*), AVG(execution_time), MAX(execution_time) "
+        "FROM node_runs WHERE name = ? AND started_at >= ? AND execution_time IS NOT NULL "
+        "GROUP BY week ORDER BY week",
+        (node, since)
+    ).fetchall()
+
+
+def baseline_times(conn, unique_id: str, exclude_invocation: str = None, runs: int = BASELINE_RUNS):
+    """A node's most recent successful execution times, newest first"""
+    return [row[0] for row in conn.execute(
+        "SELECT execution_time FROM node_runs "
+        "WHERE unique_id = ? AND execution_time IS NOT NULL AND status IN ('success', 'pass') "
+        "AND (invocation_id IS NULL OR invocation_id != ?) "
+        "ORDER BY started_at DESC LIMIT ?",
+        (unique_id, exclude_invocation or '', runs)
+    ).fetchall()]
+
+
+def detect_regressions(conn, run_results: Dict, baseline_runs: int = BASELINE_RUNS,
+                       min_samples: int = MIN_BASELINE_SAMPLES, min_seconds: float = MIN_SECONDS,
+                       warn_ratio: float = WARN_RATIO, min_z: float = MIN_ROBUST_Z) -> List[Dict]:
+    """Nodes in run_results that are significantly slower than their rolling baseline.
+
+    A node is flagged when it takes at least ``min_seconds``, at least
+    ``warn_ratio`` times its baseline median, and its robust z-score (distance
+    from the median in scaled median absolute deviations) is at least
+    ``min_z`` - so a node that is merely noisy does not trip the gate.
+    """
+    flagged = []
+    invocation_id = run_results.get('metadata', {}).get('invocation_id')
+    for node in node_timings(run_results):
+        current = node['execution_time']
+        if current is None or current < min_seconds:
+            continue
+        baseline = baseline_times(conn, node['unique_id'], invocation_id, baseline_runs)
+        if len(baseline) < min_samples:
+            continue
+        median = statistics.median(baseline)
+        mad = statistics.median(abs(t - median) for t in baseline)
+        ratio = current / median if median > 0 else float('inf')
+        z = (current - median) / (1.4826 * mad) if mad > 0 else (float('inf') if current > median else 0.0)
+        if ratio >= warn_ratio and z >= min_z:
+            flagged.append({
+                'unique_id': node['unique_id'],
+                'name': node['name'],
+                'resource_type': node['resource_type'],
+                'execution_time': round(current, 3),
+                'baseline_median': round(median, 3),
+                'baseline_samples': len(baseline),
+                'ratio': round(ratio, 2),
+                'robust_z': round(z, 1) if z != float('inf') else None
+            })
+    return sorted(flagged, key=lambda r: r['ratio'], reverse=True)
+
+
+def recent_steps(conn, runs: int = 10):
+    return conn.execute(
+        "SELECT r.run_id, r.status, s.step, s.status, s.wall_seconds, s.cpu_seconds, s.peak_rss_bytes, s.attempts "
+        "FROM step_runs s JOIN runs r ON r.run_id = s.run_id "
+        "WHERE r.run_id IN (SELECT run_id FROM runs ORDER BY started_at DESC LIMIT ?) "
+        "ORDER BY r.started_at DESC, s.step",
+        (runs,)
+    ).fetchall()
+
+
+def _num(value, spec: str = '.1f', suffix: str = '') -> str:
+    """A report value, or "-" when it was not recorded (NULL)"""
+    return f"{value:{spec}}{suffix}" if value is not None else "-"
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Query pipeline timing history')
+    parser.add_argument('--history', default=HISTORY_PATH, help='Run history database')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    top = subparsers.add_parser('top', help='Nodes that dominate runtime')
+    top.add_argument('--days', type=int, default=7)
+    top.add_argument('--limit', type=int, default=15)
+
+    trend = subparsers.add_parser('trend', help='Weekly execution time of one node')
+    trend.add_argument('--node', required=True, help='Model/test name, e.g. fct_inpatient_charges')
+    trend.add_argument('--weeks', type=int, default=8)
+
+    regressions = subparsers.add_parser('regressions', help='Compare run_results.json with the rolling baseline')
+    regressions.add_argument('--run-results', default='target/run_results.json')
+    regressions.add_argument('--baseline-runs', type=int, default=BASELINE_RUNS,
+                             help='Previous executions per node in the baseline')
+    regressions.add_argument('--min-samples', type=int, default=MIN_BASELINE_SAMPLES)
+    regressions.add_argument('--min-seconds', type=float, default=MIN_SECONDS,
+                             help='Ignore nodes faster than this')
+    regressions.add_argument('--warn-ratio', type=float, default=WARN_RATIO,
+                             help='Report significant slowdowns from this multiple of the baseline median')
+    regressions.add_argument('--fail-ratio', type=float, default=FAIL_RATIO,
+                             help='Exit non-zero when any slowdown reaches this multiple')
+    regressions.add_argument('--min-z', type=float, default=MIN_ROBUST_Z,
+                             help='Robust z-score needed to call a slowdown significant')
+    regressions.add_argument('--record', action='store_true',
+                             help='Append these results to the history afterwards (e.g. in CI)')
+    regressions.add_argument('--output', default=None, help='Write the report as JSON')
+
+    steps = subparsers.add_parser('steps', help='Step timings of recent runs')
+    steps.add_argument('--runs', type=int, default=10)
+    return parser.parse_args(argv)
+
+
+def report_regressions(conn, args) -> int:
+    """Print (and optionally save) the regression report; returns the exit code"""
+    with open(args.run_results, 'r') as f:
+        run_results = json.load(f)
+    flagged = detect_regressions(
+        conn, run_results, baseline_runs=args.baseline_runs, min_samples=args.min_samples,
+        min_seconds=args.min_seconds, warn_ratio=args.warn_ratio, min_z=args.min_z
+    )
+    failing = [r for r in flagged if r['ratio'] >= args.fail_ratio]
+
+    if flagged:
+        print(f"{'node':<45} {'type':<6} {'now s':>8} {'median s':>9} {'ratio':>6} {'z':>6}")
+        for r in flagged:
+            marker = "FAIL" if r in failing else "warn"
+            z = f"{r['robust_z']:.1f}" if r['robust_z'] is not None else "inf"
+            print(f"{r['name']:<45} {r['resource_type']:<6} {r['execution_time']:>8.2f} "
+                  f"{r['baseline_median']:>9.2f} {r['ratio']:>5.1f}x {z:>6}  {marker}")
+    else:
+        print("No significant runtime regressions")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'invocation_id': run_results.get('metadata', {}).get('invocation_id'),
+                'fail_ratio': args.fail_ratio,
+                'regressions': flagged,
+                'failing': [r['unique_id'] for r in failing]
+            }, f, indent=2)
+
+    if args.record:
+        metadata = run_results.get('metadata', {})
+        run_id = metadata.get('invocation_id') or datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+        started_at = metadata.get('generated_at') or datetime.now(timezone.utc).isoformat()
+        status = 'failed' if any(n['status'] in ('error', 'fail') for n in node_timings(run_results)) else 'success'
+        record_run(conn, run_id, started_at, status, run_results.get('elapsed_time'), {},
+                   {Path(args.run_results).stem: node_timings(run_results)})
+
+    if failing:
+        print(f"\n{len(failing)} node(s) at least {args.fail_ratio}x slower than their baseline")
+        return 1
+    return 0
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    conn = open_history(args.history)
+
+    if args.command == 'regressions':
+        sys.exit(report_regressions(conn, args))
+    elif args.command == 'top':
+        print(f"{'node':<45} {'type':<8} {'runs':>5} {'total s':>10} {'avg s':>8} {'max s':>8}")
+        for name, resource_type, runs, total, avg, peak in top_nodes(conn, args.days, args.limit):
+            print(f"{name:<45} {resource_type:<8} {runs:>5} {_num(total):>10} {_num(avg, '.2f'):>8} "
+                  f"{_num(peak, '.2f'):>8}")
+    elif args.command == 'trend':
+        print(f"{'week':<10} {'runs':>5} {'avg s':>8} {'max s':>8}")
+        for week, runs, avg, peak in weekly_trend(conn, args.node, args.weeks):
+            print(f"{week:<10} {runs:>5} {_num(avg, '.2f'):>8} {_num(peak, '.2f'):>8}")
+    elif args.command == 'steps':
+        for run_id, run_status, step, status, wall, cpu, rss, attempts in recent_steps(conn, args.runs):
+            rss_mb = f"{rss / 1024 / 1024:.0f} MB" if rss else "-"
+            print(f"{run_id}  {run_status:<8} {step:<15} {status:<8} wall {_num(wall, '.1f', 's'):>8}  "
+                  f"cpu {_num(cpu, '.1f', 's'):>7}  rss {rss_mb:>7}  attempts {_num(attempts, 'd')}")
+
+
+if __name__ == '__main__':
+    main()
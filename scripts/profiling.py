@@ -0,0 +1,181 @@
+"""
+Profiling support for the script entry points
+Adds a --profile switch to gx_run_checkpoint.py, gx_create_quality_scorecard.py,
+s3_upload.py and the pipeline runners. A profiled run writes to
+data/profiles/<script>_<timestamp>.*:
+  .prof     cProfile stats of the main thread (python -m pstats, snakeviz)
+  .folded   collapsed stacks sampled from all threads (flamegraph.pl, speedscope)
+
+The known hot calls - GX context startup, validator construction, validation,
+S3 transfers and SQL executes - are wrapped in span(), so a profiled run also
+prints how many seconds went to each of them. Spans are also traced (see
+tracing.py), nesting under the run's trace. A profiled pipeline run exports
+SCRIPTS_PROFILE_DIR, so the Python scripts it launches profile themselves too.
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from tracing import start_span
+
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'data/profiles')
+PROFILE_ENV = 'SCRIPTS_PROFILE_DIR'  # set: profile as if --profile was given
+SAMPLE_INTERVAL = 0.005  # seconds between stack samples
+TOP_FUNCTIONS = 20
+
+_spans_lock = threading.Lock()
+_span_totals: Dict[str, List[float]] = {}  # name -> [count, total seconds, max seconds]
+_sqlalchemy_instrumented = False
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """Time a block under ``name`` as a trace span; totals are reported by a profiled run."""
+    start = time.perf_counter()
+    try:
+        with start_span(name, **attributes) as traced:
+            yield traced
+    finally:
+        _record_span(name, time.perf_counter() - start)
+
+
+def _record_span(name: str, elapsed: float):
+    with _spans_lock:
+        entry = _span_totals.setdefault(name, [0, 0.0, 0.0])
+        entry[0] += 1
+        entry[1] += elapsed
+        entry[2] = max(entry[2], elapsed)
+
+
+def span_totals() -> Dict[str, Dict]:
+    with _spans_lock:
+        return {
+            name: {'count': int(count), 'seconds': round(total, 3), 'max_seconds': round(longest, 3)}
+            for name, (count, total, longest) in _span_totals.items()
+        }
+
+
+def instrument_sqlalchemy():
+    """Record every SQL statement run through SQLAlchemy (GX's Snowflake queries) as sql.execute"""
+    global _sqlalchemy_instrumented
+    if _sqlalchemy_instrumented:
+        return
+    try:
+        from sqlalchemy import event
+        from sqlalchemy.engine import Engine
+    except ImportError:
+        return
+
+    @event.listens_for(Engine, 'before_cursor_execute')
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('profiling_query_start', []).append(time.perf_counter())
+
+    @event.listens_for(Engine, 'after_cursor_execute')
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get('profiling_query_start')
+        if starts:
+            _record_span('sql.execute', time.perf_counter() - starts.pop())
+
+    _sqlalchemy_instrumented = True
+
+
+class StackSampler:
+    """Samples the stacks of all threads on a timer and folds them for flamegraphs.
+
+    Complements cProfile, which only sees the thread that enabled it and
+    keeps caller edges rather than whole stacks.
+    """
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                self.samples[';'.join(reversed(stack))] += 1
+
+    def write(self, path: Path):
+        with open(path, 'w') as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+def add_profile_argument(parser):
+    parser.add_argument('--profile', nargs='?', const=PROFILE_DIR, default=os.getenv(PROFILE_ENV), metavar='DIR',
+                        help=f'Write cProfile stats and collapsed stacks to DIR (default {PROFILE_DIR})')
+
+
+def print_span_summary():
+    totals = span_totals()
+    if not totals:
+        return
+    print(f"\n{'span':<28} {'calls':>6} {'total s':>9} {'max s':>8}")
+    for name, entry in sorted(totals.items(), key=lambda item: item[1]['seconds'], reverse=True):
+        print(f"{name:<28} {entry['count']:>6} {entry['seconds']:>9.2f} {entry['max_seconds']:>8.2f}")
+
+
+@contextmanager
+def profiled(output_dir: Optional[str], script_name: str):
+    """Profile the enclosed block when output_dir is set (the --profile value); no-op otherwise."""
+    if not output_dir:
+        yield
+        return
+
+    instrument_sqlalchemy()
+    out = Path(output_dir).resolve()  # runners chdir to the project root
+    os.environ[PROFILE_ENV] = str(out)
+    out.mkdir(parents=True, exist_ok=True)
+    stem = out / f"{script_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+
+    sampler = StackSampler()
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    sampler.start()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        sampler.stop()
+        wall = time.perf_counter() - start
+
+        profiler.dump_stats(f"{stem}.prof")
+        sampler.write(Path(f"{stem}.folded"))
+
+        top = io.StringIO()
+        pstats.Stats(profiler, stream=top).sort_stats('cumulative').print_stats(TOP_FUNCTIONS)
+        print(f"\n{'=' * 60}\nProfile ({wall:.2f}s wall)\n{'=' * 60}")
+        print(top.getvalue())
+        print_span_summary()
+        print(f"\ncProfile stats:    {stem}.prof")
+        print(f"Collapsed stacks:  {stem}.folded  (flamegraph.pl {stem}.folded > flame.svg)")
@@ -4,37 +4,46 @@ Data Quality Pipeline Runner
 Runs dbt tests and Great Expectations validations in sequence
 """
 
-import subprocess
+import argparse
 import sys
 import os
 from pathlib import Path
 
+from command_runner import stream_command
+from profiling import add_profile_argument, profiled, span
+
 def run_command(command, description):
-    """Run a shell command and handle errors"""
+    """Run a shell command, streaming its output, and handle errors"""
     print(f"\n{'='*60}")
     print(f"📊 {description}")
     print(f"{'='*60}")
-    print(f"Running: {command}\n")
+    print(f"Running: {command}\n", flush=True)
     
-    result = subprocess.run(
-        command,
-        shell=True,
-        capture_output=True,
-        text=True
-    )
+    with span(description):
+        returncode, tail = stream_command(command)
     
-    if result.returncode != 0:
-        print(f"❌ Error in {description}")
-        print(result.stderr)
+    if returncode != 0:
+        print(f"❌ Error in {description} (exit code {returncode})")
+        print(tail)
         return False
     else:
         print(f"✅ {description} completed successfully")
-        if result.stdout:
-            print(result.stdout)
         return True
 
-def main():
+def parse_args(argv=None):
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Run dbt tests and Great Expectations validations")
+    add_profile_argument(parser)
+    return parser.parse_args(argv)
+
+def main(argv=None):
     """Main pipeline execution"""
+    args = parse_args(argv)
+    with profiled(args.profile, "run_data_quality_pipeline"):
+        run_pipeline()
+
+def run_pipeline():
+    """Run the dbt and GX steps in sequence"""
     project_root = Path(__file__).parent.parent
     os.chdir(project_root)
     
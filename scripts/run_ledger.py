@@ -0,0 +1,209 @@
+"""
+Step ledger for run_pipeline_enhanced.py --resume
+Records each step's outcome as the run progresses, so a failed run can be
+restarted at the first failed step instead of from scratch. For failed dbt
+steps the failed nodes are taken from run_results.json, letting the resumed
+step rebuild just those nodes and their descendants.
+
+Also classifies failures as transient (connection drops, throttling,
+warehouse timeouts) for retry with exponential backoff.
+"""
+
+import json
+import os
+import random
+import re
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from pipeline_state import STATE_DIR
+
+LEDGER_PATH = STATE_DIR / "run_ledger.json"
+
+# Failures worth retrying: network drops, throttling and warehouse-side timeouts.
+# Matched against error text only (stderr, failed nodes' messages), never the
+# progress output, where status codes and "timeout" occur in ordinary lines.
+TRANSIENT_ERROR_PATTERNS = [
+    r"connection (reset|refused|aborted|closed)",
+    r"remote end closed connection",
+    r"\b(connection|connect|read|request|socket|login|network) timed? ?out\b",
+    r"\boperation timed out\b",
+    r"temporary failure in name resolution",
+    r"could not connect",
+    r"\bHTTP(/[\d.]+)? (429|502|503|504)\b",
+    r"\bstatus(?: code)?[:=]? ?(429|502|503|504)\b",
+    r"too many requests",
+    r"\bthrottl(ed|ing)\b",
+    r"\b250001\b",      # Snowflake: could not connect to backend
+    r"\b390114\b",      # Snowflake: authentication token expired
+    r"\b000630\b",      # Snowflake: statement reached its timeout
+    r"warehouse .* (is suspended|cannot be resumed)",
+]
+_TRANSIENT_RE = re.compile("|".join(TRANSIENT_ERROR_PATTERNS), re.IGNORECASE)
+
+
+def is_transient_error(error_text: str) -> bool:
+    """Whether error text (not a command's full output) describes a transient failure"""
+    return bool(error_text and _TRANSIENT_RE.search(error_text))
+
+
+def run_with_retries(execute: Callable[[], Tuple[bool, str]], max_retries: int, backoff_seconds: float,
+                     description: str = "",
+                     error_text: Optional[Callable[[str], str]] = None) -> Tuple[bool, str, int]:
+    """Call execute until it succeeds, retrying transient failures with exponential backoff.
+
+    ``error_text`` maps a failed attempt's output to the error lines that are
+    classified (default: the output itself, for executors returning only
+    errors). Waits backoff_seconds * 2**attempt (plus up to 10% jitter)
+    between attempts. Returns (success, output, attempts).
+    """
+    attempt = 0
+    while True:
+        success, output = execute()
+        attempt += 1
+        if success or attempt > max_retries:
+            return success, output, attempt
+        if not is_transient_error(error_text(output) if error_text else output):
+            return success, output, attempt
+        delay = backoff_seconds * 2 ** (attempt - 1)
+        delay += random.uniform(0, delay * 0.1)
+        print(f"🔁 Transient error in {description}; retrying in {delay:.0f}s "
+              f"(attempt {attempt + 1} of {max_retries + 1})")
+        time.sleep(delay)
+
+
+def failed_node_messages(run_results_path: Path, since: Optional[datetime] = None) -> List[str]:
+    """Error messages of the failed nodes in a dbt run_results.json (written after ``since``)"""
+    if not run_results_path.exists():
+        return []
+    with open(run_results_path, "r") as f:
+        run_results = json.load(f)
+    generated_at = run_results.get("metadata", {}).get("generated_at")
+    if since is not None and (not generated_at
+                              or datetime.fromisoformat(generated_at.replace("Z", "+00:00")) < since):
+        return []
+    return [
+        f"{r.get('unique_id')}: {r.get('message')}" for r in run_results.get("results", [])
+        if r.get("status") in ("error", "fail", "runtime error") and r.get("message")
+    ]
+
+
+BUILDABLE_RESOURCE_TYPES = ("model", "seed", "snapshot")
+
+
+def failed_dbt_nodes(run_results_path: Path, manifest_path: Optional[Path] = None) -> List[str]:
+    """Names of the nodes to rebuild after a failed dbt step, for a `<name>+` selector
+
+    Failed models, seeds and snapshots, and for failed tests the nodes they
+    test (a test's own unique_id ends in a hash no selector matches), so the
+    tests and the descendants skipped behind them run again. Names come
+    from the manifest next to run_results.json (default).
+    """
+    if not run_results_path.exists():
+        return []
+    with open(run_results_path, "r") as f:
+        results = json.load(f).get("results", [])
+    manifest_path = Path(manifest_path or Path(run_results_path).with_name("manifest.json"))
+    nodes = {}
+    if manifest_path.exists():
+        with open(manifest_path, "r") as f:
+            nodes = json.load(f).get("nodes", {})
+
+    names = set()
+    for r in results:
+        if r.get("status") not in ("error", "fail", "runtime error"):
+            continue
+        unique_id = r["unique_id"]
+        if unique_id.split(".")[0] in BUILDABLE_RESOURCE_TYPES:
+            targets = [unique_id]
+        else:
+            targets = [parent for parent in nodes.get(unique_id, {}).get("depends_on", {}).get("nodes", [])
+                       if parent.split(".")[0] in BUILDABLE_RESOURCE_TYPES]
+        for target in targets:
+            # <type>.<project>.<name>[.<version>] when the manifest is unavailable
+            names.add(nodes.get(target, {}).get("name") or target.split(".")[2])
+    return sorted(names)
+
+
+class RunLedger:
+    """JSON record of one pipeline run's steps, rewritten after every step.
+
+    Layout::
+
+        {
+          "run_id": ..., "status": "running|success|failed",
+          "started_at": ..., "resumed_at": [...],
+          "commands": {step: command},
+          "steps": {step: {status, seconds, attempts, finished_at, failed_nodes}}
+        }
+    """
+
+    def __init__(self, path: Path = LEDGER_PATH):
+        self.path = Path(path)
+        self.data: Dict = {}
+
+    @classmethod
+    def load(cls, path: Path = LEDGER_PATH) -> Optional["RunLedger"]:
+        ledger = cls(path)
+        if not ledger.path.exists():
+            return None
+        with open(ledger.path, "r") as f:
+            ledger.data = json.load(f)
+        return ledger
+
+    def start(self, commands: Dict[str, str]):
+        now = datetime.now(timezone.utc)
+        self.data = {
+            "run_id": now.strftime("%Y%m%dT%H%M%SZ"),
+            "status": "running",
+            "started_at": now.isoformat(),
+            "resumed_at": [],
+            "commands": commands,
+            "steps": {}
+        }
+        self._flush()
+
+    def resume(self):
+        self.data["status"] = "running"
+        self.data["resumed_at"].append(datetime.now(timezone.utc).isoformat())
+        self._flush()
+
+    def matches(self, commands: Dict[str, str]) -> bool:
+        """True if the ledger was written for the same step graph"""
+        return self.data.get("commands") == commands
+
+    def completed_steps(self) -> Dict[str, Dict]:
+        """Steps the previous attempt finished (successfully or with a tolerated warning)"""
+        return {
+            name: step for name, step in self.data.get("steps", {}).items()
+            if step["status"] in ("success", "warning", "disabled")
+        }
+
+    def failed_nodes(self, step_name: str) -> List[str]:
+        return self.data.get("steps", {}).get(step_name, {}).get("failed_nodes", [])
+
+    def record(self, step_name: str, result: Dict, failed_nodes: Optional[List[str]] = None):
+        entry = {
+            "status": result["status"],
+            "seconds": result.get("seconds", 0.0),
+            "attempts": result.get("attempts", 1),
+            "finished_at": datetime.now(timezone.utc).isoformat()
+        }
+        if failed_nodes:
+            entry["failed_nodes"] = failed_nodes
+        self.data["steps"][step_name] = entry
+        self._flush()
+
+    def finish(self, status: str):
+        self.data["status"] = status
+        self.data["finished_at"] = datetime.now(timezone.utc).isoformat()
+        self._flush()
+
+    def _flush(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(self.data, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
@@ -1,44 +1,93 @@
 #!/usr/bin/env python3
 """
 Enhanced Data Pipeline Runner
-Runs dbt models, tests, and Great Expectations with error handling and notifications
+Runs dbt models, tests, and Great Expectations with error handling and notifications.
+Steps are declared as a dependency graph; independent steps run in parallel
+(--max-parallel, default PIPELINE_MAX_PARALLEL or 2). With --dbt-backend inprocess
+dbt runs inside this process and parses the project once; --dbt-build builds
+and tests the model layers with a single `dbt build`. --changed-only builds just
+the models modified since the last successful run and those downstream of
+changed raw sources (see pipeline_state.py). Every run keeps a step ledger;
+--resume continues a failed run from its first failed step (run_ledger.py).
+--profile writes cProfile stats and collapsed stacks of the run (profiling.py).
+Each run is traced (tracing.py): one span per step attempt, per dbt node and
+per notification, with the steps' child processes nesting under them.
+Slack notifications (a failed or warning step, and the final status) are
+queued to a background dispatcher (notifications.py) and never block a step.
 """
 
-import subprocess
+import argparse
 import sys
 import os
 import json
 import datetime
+import shlex
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Callable, Dict, List, Optional, Tuple
 
-def run_command(command: str, description: str, continue_on_error: bool = False) -> Tuple[bool, str]:
-    """Run a shell command and handle errors"""
-    print(f"\n{'='*60}")
-    print(f"📊 {description}")
-    print(f"{'='*60}")
-    print(f"Running: {command}\n")
+from command_runner import console_lock, last_stderr, last_usage, reset_usage, stream_command
+from dbt_backend import InProcessDbt, only_tests_failed
+from pipeline_state import STATE_DIR, layer_selector, plan_changed_only, save_state
+from profiling import add_profile_argument, profiled, span
+from notifications import get_dispatcher
+from tracing import record_span, start_span
+from pipeline_telemetry import node_timings, open_history, record_run, write_prometheus_textfile
+from run_ledger import RunLedger, failed_dbt_nodes, failed_node_messages, run_with_retries
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+DEFAULT_MAX_PARALLEL = int(os.getenv('PIPELINE_MAX_PARALLEL', '2'))
+DEFAULT_DBT_BACKEND = os.getenv('PIPELINE_DBT_BACKEND', 'subprocess')
+RUN_RESULTS_PATH = Path("target") / "run_results.json"
+DEFAULT_MAX_RETRIES = int(os.getenv('PIPELINE_MAX_RETRIES', '2'))
+DEFAULT_RETRY_BACKOFF = float(os.getenv('PIPELINE_RETRY_BACKOFF_SECONDS', '30'))
+MODEL_LAYERS = ("staging", "intermediate", "marts")
+
+@dataclass
+class PipelineStep:
+    """One node of the pipeline graph"""
+    name: str
+    command: str
+    description: str
+    depends_on: List[str] = field(default_factory=list)
+    continue_on_error: bool = False
+    failure_message: str = ""
+    enabled: bool = True
+    # Called when the step fails; returning True downgrades the failure to a warning
+    non_fatal_check: Optional[Callable[[], bool]] = None
+
+def run_command(command: str, description: str, continue_on_error: bool = False,
+                label: Optional[str] = None) -> Tuple[bool, str]:
+    """Run a shell command, streaming its output, and handle errors
     
-    result = subprocess.run(
-        command,
-        shell=True,
-        capture_output=True,
-        text=True
-    )
+    The returned text is the tail of the command's output (see command_runner).
+    """
+    with console_lock:
+        print(f"\n{'='*60}")
+        print(f"📊 {description}")
+        print(f"{'='*60}")
+        print(f"Running: {command}\n", flush=True)
     
-    if result.returncode != 0:
-        print(f"❌ Error in {description}")
-        print(result.stderr)
+    returncode, tail = stream_command(command, label=label)
+    
+    if returncode != 0:
+        with console_lock:
+            print(f"❌ Error in {description} (exit code {returncode})")
+            print(tail)
         if not continue_on_error:
-            return False, result.stderr
+            return False, tail
         else:
             print(f"⚠️  Continuing despite error...")
-            return True, result.stderr
+            return True, tail
     else:
         print(f"✅ {description} completed successfully")
-        if result.stdout:
-            print(result.stdout)
-        return True, result.stdout
+        return True, tail
 
 def load_dbt_results(results_path: Path) -> Dict:
     """Load dbt run results"""
@@ -59,71 +108,492 @@ def get_test_summary(results: Dict) -> Dict:
     return {'passed': passed, 'failed': failed, 'warned': warned}
 
 def send_notification(status: str, message: str, webhook_url: str = None):
-    """Send notification (Slack, email, etc.)"""
-    if webhook_url:
+    """Queue a notification (Slack); never blocks the pipeline
+    
+    Delivery, deduplication, rate-limiting and spooling happen on the
+    dispatcher's background thread (notifications.py); queued messages are
+    flushed, for at most NOTIFY_FLUSH_TIMEOUT seconds, when the process exits.
+    """
+    dispatcher = get_dispatcher(webhook_url)
+    if dispatcher is not None:
+        dispatcher.notify(f"🚀 Pipeline {status}: {message}", status,
+                          icon_emoji=":hospital:" if status == "success" else ":warning:")
+
+def run_dbt_in_process(dbt, command: str, description: str) -> Tuple[bool, str]:
+    """Run a dbt command through the in-process backend, reporting like run_command"""
+    print(f"\n{'='*60}")
+    print(f"📊 {description}")
+    print(f"{'='*60}")
+    print(f"Running (in-process): {command}\n")
+    
+    success, output = dbt.invoke(command)
+    if not success:
+        print(f"❌ Error in {description}")
+        if output:
+            print(output)
+    else:
+        print(f"✅ {description} completed successfully")
+    return success, output
+
+def print_bronze_versions():
+    """Print the current bronze upload per dataset from the manifest log (one small S3 read)"""
+    if not os.getenv('S3_BUCKET_NAME'):
+        return
+    try:
+        sys.path.insert(0, str(Path(__file__).parent))
+        from manifest_store import resolve_current
+        from s3_upload import S3_BUCKET_NAME, initialize_s3_client
+        versions = resolve_current(initialize_s3_client(), S3_BUCKET_NAME, layer='bronze')
+    except Exception as e:
+        print(f"⚠️  Could not read bronze versions from the manifest log: {e}")
+        return
+    print("\n📦 Bronze inputs:")
+    for dataset, record in sorted(versions.items()):
+        print(f"   - {dataset}: {record['s3_key']} ({record.get('rows')} rows, "
+              f"uploaded {record['timestamp']}, sha256 {str(record.get('sha256'))[:12]})")
+
+def build_pipeline_steps(gx_configured: bool, build_mode: bool = False,
+                         selector: Optional[str] = None) -> List[PipelineStep]:
+    """Declare the pipeline as a step graph (listed in dependency order)
+    
+    In build mode one `dbt build` replaces the three model layers and dbt test;
+    if only tests fail the models are in place, so that is a warning as before.
+    A state ``selector`` (--changed-only) narrows every dbt model/test step.
+    """
+    def select(layer: Optional[str] = None) -> str:
+        if not selector:
+            return f" --select {layer}" if layer else ""
+        narrowed = layer_selector(selector, layer) if layer else selector
+        return f" --select {shlex.quote(narrowed)} --state {shlex.quote(str(STATE_DIR))}"
+    
+    deps = PipelineStep("deps", "dbt deps", "Installing dbt packages",
+                        continue_on_error=True, failure_message="dbt deps had issues")
+    if build_mode:
+        models = [
+            PipelineStep("build", "dbt build" + (select() if selector else " --select staging intermediate marts"),
+                         "Building and testing models", depends_on=["deps"],
+                         failure_message="Model build failed",
+                         non_fatal_check=lambda: only_tests_failed(RUN_RESULTS_PATH)),
+        ]
+        models_done = tests_done = "build"
+    else:
+        models = [
+            PipelineStep("staging", "dbt run" + select("staging"), "Building staging models",
+                         depends_on=["deps"], failure_message="Staging models failed"),
+            PipelineStep("intermediate", "dbt run" + select("intermediate"), "Building intermediate models",
+                         depends_on=["staging"], failure_message="Intermediate models failed"),
+            PipelineStep("marts", "dbt run" + select("marts"), "Building marts models",
+                         depends_on=["intermediate"], failure_message="Marts models failed"),
+            PipelineStep("dbt_test", "dbt test" + select(), "Running dbt tests",
+                         depends_on=["marts"], continue_on_error=True,
+                         failure_message="Some dbt tests failed"),
+        ]
+        models_done, tests_done = "marts", "dbt_test"
+    
+    return [deps] + models + [
+        PipelineStep("gx_checkpoint", "python scripts/gx_validate_marts.py",
+                     "Running Great Expectations validation (all marts suites)",
+                     depends_on=[models_done], continue_on_error=True, enabled=gx_configured,
+                     failure_message="Great Expectations validation had issues"),
+        # dbt docs generate rewrites target/run_results.json, so it waits for the tests
+        PipelineStep("docs_generate", "dbt docs generate", "Generating dbt documentation",
+                     depends_on=[tests_done], continue_on_error=True,
+                     failure_message="Documentation generation had issues"),
+        PipelineStep("gx_docs", "python scripts/gx_docs_build.py", "Building Great Expectations data docs",
+                     depends_on=["gx_checkpoint"], continue_on_error=True, enabled=gx_configured,
+                     failure_message="GX docs generation had issues"),
+    ]
+
+def _parse_dbt_time(value: str) -> datetime.datetime:
+    return datetime.datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+def trace_dbt_nodes(run_results_path: Path, since: datetime.datetime):
+    """Add a span per node of run_results.json, if the file was written after ``since``"""
+    if not run_results_path.exists():
+        return
+    with open(run_results_path, 'r') as f:
+        run_results = json.load(f)
+    generated_at = run_results.get('metadata', {}).get('generated_at')
+    if not generated_at or _parse_dbt_time(generated_at) < since:
+        return
+    warehouse = os.getenv('SNOWFLAKE_WAREHOUSE')
+    for result in run_results.get('results', []):
+        timing = next((t for t in result.get('timing', []) if t.get('name') == 'execute'), {})
+        if not timing.get('started_at') or not timing.get('completed_at'):
+            continue
+        record_span(
+            f"dbt.{result['unique_id'].split('.')[-1]}",
+            _parse_dbt_time(timing['started_at']),
+            _parse_dbt_time(timing['completed_at']),
+            status='error' if result.get('status') in ('error', 'fail', 'runtime error') else 'ok',
+            resource_type=result['unique_id'].split('.')[0],
+            dbt_status=result.get('status'),
+            rows_affected=(result.get('adapter_response') or {}).get('rows_affected'),
+            warehouse=warehouse
+        )
+
+def run_step_command(step: PipelineStep) -> Tuple[bool, str]:
+    """Default step execution: the step's shell command"""
+    return run_command(step.command, step.description, label=step.name)
+
+def run_step(step: PipelineStep, pipeline_start: float,
+             execute: Callable[[PipelineStep], Tuple[bool, str]] = run_step_command,
+             max_retries: int = 0, backoff_seconds: float = DEFAULT_RETRY_BACKOFF) -> Dict:
+    """Run one step and time it, retrying transient failures
+    
+    CPU time and peak RSS come from the step's command process; steps run in
+    this process (in-process dbt) fall back to this process's usage.
+    """
+    usage = {'cpu_seconds': 0.0, 'peak_rss_bytes': None}
+    last_error = {'text': ''}
+    
+    def attempt() -> Tuple[bool, str]:
+        reset_usage()
+        before = resource.getrusage(resource.RUSAGE_SELF) if resource else None
+        with span(f"step.{step.name}", command=step.command) as traced:
+            step_started = datetime.datetime.now(datetime.timezone.utc)
+            outcome = execute(step)
+            if not outcome[0]:
+                traced.fail(outcome[1][-500:] or "failed")
+                # Classify retries on error lines only: the command's stderr (or, in
+                # process, the returned error text) and the failed nodes' messages
+                stderr = last_stderr()
+                errors = [outcome[1] if stderr is None else stderr]
+                if step.command.startswith("dbt "):
+                    errors += failed_node_messages(RUN_RESULTS_PATH, step_started)
+                last_error['text'] = '\n'.join(e for e in errors if e)
+            if step.command.startswith("dbt "):
+                trace_dbt_nodes(RUN_RESULTS_PATH, step_started)
+            command_usage = last_usage()
+            if command_usage is None and before is not None:
+                after = resource.getrusage(resource.RUSAGE_SELF)
+                command_usage = {
+                    'cpu_seconds': (after.ru_utime - before.ru_utime) + (after.ru_stime - before.ru_stime),
+                    'peak_rss_bytes': after.ru_maxrss * (1 if sys.platform == 'darwin' else 1024)
+                }
+            if command_usage:
+                traced.set(**command_usage)
+                usage['cpu_seconds'] += command_usage['cpu_seconds']
+                usage['peak_rss_bytes'] = max(usage['peak_rss_bytes'] or 0, command_usage['peak_rss_bytes'])
+        return outcome
+    
+    started = time.perf_counter()
+    success, output, attempts = run_with_retries(
+        attempt, max_retries, backoff_seconds, description=step.description,
+        error_text=lambda output: last_error['text']
+    )
+    finished = time.perf_counter()
+    return {
+        'success': success,
+        'output': output,
+        'attempts': attempts,
+        'cpu_seconds': round(usage['cpu_seconds'], 3) if resource else None,
+        'peak_rss_bytes': usage['peak_rss_bytes'],
+        'started': round(started - pipeline_start, 3),
+        'finished': round(finished - pipeline_start, 3),
+        'seconds': round(finished - started, 3)
+    }
+
+def run_step_graph(steps: List[PipelineStep], max_parallel: int = DEFAULT_MAX_PARALLEL,
+                   on_step_complete: Optional[Callable[[PipelineStep, Dict], None]] = None,
+                   execute: Callable[[PipelineStep], Tuple[bool, str]] = run_step_command,
+                   completed: Optional[Dict[str, Dict]] = None, max_retries: int = 0,
+                   backoff_seconds: float = DEFAULT_RETRY_BACKOFF) -> Dict[str, Dict]:
+    """Run steps as soon as their dependencies are done, up to max_parallel at once.
+    
+    A failed continue_on_error step is recorded as a warning and its dependents
+    still run. Any other failure stops new steps from starting; steps already
+    running finish and everything left is marked not_run. Steps in
+    ``completed`` (finished by a previous attempt, see --resume) are not rerun.
+    """
+    names = {step.name for step in steps}
+    for step in steps:
+        missing = [dep for dep in step.depends_on if dep not in names]
+        if missing:
+            raise ValueError(f"Step {step.name} depends on unknown steps: {missing}")
+    
+    pipeline_start = time.perf_counter()
+    completed = completed or {}
+    pending = {step.name: step for step in steps if step.name not in completed}
+    results: Dict[str, Dict] = {
+        name: {'status': step['status'], 'seconds': 0.0, 'previous_run': True}
+        for name, step in completed.items()
+    }
+    running = {}
+    aborted = False
+    done_statuses = ('success', 'warning', 'disabled')
+    
+    with ThreadPoolExecutor(max_workers=max_parallel) as executor:
+        while pending or running:
+            scheduled = True
+            while scheduled and not aborted:
+                scheduled = False
+                for step in list(pending.values()):
+                    if len(running) >= max_parallel:
+                        break
+                    if not all(results.get(dep, {}).get('status') in done_statuses for dep in step.depends_on):
+                        continue
+                    del pending[step.name]
+                    scheduled = True
+                    if not step.enabled:
+                        results[step.name] = {'status': 'disabled', 'seconds': 0.0}
+                        print(f"\nℹ️  {step.description} not configured (skipping)")
+                        continue
+                    running[executor.submit(run_step, step, pipeline_start, execute,
+                                            max_retries, backoff_seconds)] = step
+            
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                step = running.pop(future)
+                result = future.result()
+                if result['success']:
+                    result['status'] = 'success'
+                elif step.continue_on_error or (step.non_fatal_check and step.non_fatal_check()):
+                    print(f"⚠️  Continuing despite error in {step.description}...")
+                    result['status'] = 'warning'
+                else:
+                    result['status'] = 'failed'
+                    aborted = True
+                results[step.name] = result
+                if on_step_complete:
+                    on_step_complete(step, result)
+    
+    for name in pending:
+        results[name] = {'status': 'not_run', 'seconds': 0.0}
+    return results
+
+def critical_path(steps: List[PipelineStep], results: Dict[str, Dict]) -> Tuple[List[str], float]:
+    """Longest chain of dependent step durations - the floor on pipeline wall time"""
+    finish: Dict[str, float] = {}
+    previous: Dict[str, Optional[str]] = {}
+    for step in steps:
+        if results.get(step.name, {}).get('status') in ('not_run', None):
+            continue
+        deps = [dep for dep in step.depends_on if dep in finish]
+        before = max(deps, key=lambda dep: finish[dep]) if deps else None
+        finish[step.name] = (finish[before] if before else 0.0) + results[step.name]['seconds']
+        previous[step.name] = before
+    if not finish:
+        return [], 0.0
+    
+    name = max(finish, key=finish.get)
+    total = finish[name]
+    path = []
+    while name:
+        path.append(name)
+        name = previous[name]
+    return list(reversed(path)), total
+
+def print_step_report(steps: List[PipelineStep], results: Dict[str, Dict], wall_seconds: float,
+                      dbt: Optional[InProcessDbt] = None):
+    """Print per-step timings, the critical path and parse time saved in-process"""
+    icons = {'success': '✅', 'warning': '⚠️ ', 'failed': '❌', 'disabled': 'ℹ️ ', 'not_run': '⏭️ '}
+    print(f"\n⏱️  Step timings:")
+    for step in steps:
+        result = results[step.name]
+        note = " (previous run)" if result.get('previous_run') else ""
+        if result.get('attempts', 1) > 1:
+            note += f" after {result['attempts']} attempts"
+        usage = ""
+        if result.get('cpu_seconds') is not None:
+            usage += f"  cpu {result['cpu_seconds']:>7.1f}s"
+        if result.get('peak_rss_bytes'):
+            usage += f"  rss {result['peak_rss_bytes'] / 1024 / 1024:>6.0f} MB"
+        print(f"   {icons[result['status']]} {step.name:<15} {result['seconds']:>8.1f}s{usage}  "
+              f"{result['status']}{note}")
+    path, path_seconds = critical_path(steps, results)
+    if path:
+        print(f"\n🧭 Critical path: {' → '.join(path)}")
+        print(f"   {path_seconds:.1f}s of {wall_seconds:.1f}s wall time")
+    if dbt is not None and dbt.parse_seconds is not None:
+        saved = dbt.parse_time_saved()
+        print(f"\n📦 dbt parsed once in {saved['parse_seconds']:.1f}s; "
+              f"{saved['steps_reusing_manifest']} steps reused the manifest")
+        for command in dbt.reused:
+            print(f"   - {command}: ~{saved['per_step_seconds_saved']:.1f}s parse skipped")
+        print(f"   Net parse time saved: ~{saved['seconds_saved']:.1f}s")
+
+def prepare_resume(steps: List[PipelineStep], commands: Dict[str, str]) -> Tuple[Optional[RunLedger], Dict[str, Dict]]:
+    """Load the last run's ledger and narrow the failed dbt step to its failed nodes
+    
+    Returns (ledger, completed steps), or (None, {}) when there is nothing to
+    resume and a fresh run should start.
+    """
+    ledger = RunLedger.load()
+    if ledger is None:
+        print("\nℹ️  No previous run ledger - starting a fresh run")
+        return None, {}
+    if ledger.data.get("status") == "success":
+        print(f"\nℹ️  Last run ({ledger.data['run_id']}) completed - starting a fresh run")
+        return None, {}
+    if not ledger.matches(commands):
+        print("\n⚠️  Last run used different steps or options - starting a fresh run")
+        return None, {}
+    
+    completed = ledger.completed_steps()
+    print(f"\n⏯️  Resuming run {ledger.data['run_id']}: {len(completed)} steps already done")
+    for step in steps:
+        nodes = ledger.failed_nodes(step.name)
+        if step.name in completed or not nodes:
+            continue
+        selector = " ".join(f"{node}+" for node in nodes)
+        if step.name in MODEL_LAYERS:
+            selector = layer_selector(selector, step.name)
+        step.command = f"{step.command.split(' --select')[0]} --select {shlex.quote(selector)}"
+        print(f"   {step.name}: rebuilding {', '.join(nodes)} (failed or with failed tests) and descendants")
+    return ledger, completed
+
+def record_telemetry(ledger: RunLedger, status: str, wall_seconds: float,
+                     results: Dict[str, Dict], node_results: Dict[str, List[Dict]]):
+    """Append the run's step and node timings to the run history and the Prometheus textfile"""
+    try:
+        conn = open_history()
         try:
-            import requests
-            payload = {
-                "text": f"🚀 Pipeline {status}: {message}",
-                "username": "Healthcare Analytics Pipeline",
-                "icon_emoji": ":hospital:" if status == "success" else ":warning:"
-            }
-            requests.post(webhook_url, json=payload, timeout=10)
-        except Exception as e:
-            print(f"⚠️  Failed to send notification: {e}")
+            record_run(conn, ledger.data['run_id'], ledger.data['started_at'], status,
+                       wall_seconds, results, node_results)
+        finally:
+            conn.close()
+        write_prometheus_textfile(ledger.data['run_id'], status, wall_seconds, results, node_results)
+    except Exception as e:
+        print(f"⚠️  Could not record run telemetry: {e}")
+
+def print_changed_only_summary(plan: Dict):
+    """Print selected/skipped model counts for a --changed-only run"""
+    selected = len(plan['selected'])
+    print(f"\n🔁 Changed-only ({plan['reason']}):")
+    print(f"   Selected: {selected} of {plan['total']} models")
+    print(f"   Skipped:  {plan['total'] - selected} models")
+    if plan['changed_sources']:
+        print(f"   Changed sources: {', '.join(plan['changed_sources'])}")
+
+def parse_args(argv=None):
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Run dbt models, tests and Great Expectations")
+    parser.add_argument("--max-parallel", type=int, default=DEFAULT_MAX_PARALLEL,
+                        help="Maximum number of independent steps run at once")
+    parser.add_argument("--dbt-backend", choices=["subprocess", "inprocess"], default=DEFAULT_DBT_BACKEND,
+                        help="Run dbt as separate processes or in this process with one parsed manifest "
+                             "(in-process dbt steps run one at a time; other steps still run in parallel)")
+    parser.add_argument("--dbt-build", action="store_true",
+                        help="Build and test all model layers with a single `dbt build`")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue the last failed run from its first failed step (or failed dbt nodes)")
+    parser.add_argument("--max-retries", type=int, default=DEFAULT_MAX_RETRIES,
+                        help="Retries per step for transient warehouse/network errors")
+    parser.add_argument("--retry-backoff-seconds", type=float, default=DEFAULT_RETRY_BACKOFF,
+                        help="Initial retry delay, doubled on every further attempt")
+    parser.add_argument("--changed-only", action="store_true",
+                        help="Only build models modified since the last successful run, models "
+                             "downstream of changed raw sources, and their descendants")
+    add_profile_argument(parser)
+    return parser.parse_args(argv)
 
-def main():
+def main(argv=None):
     """Main pipeline execution"""
+    args = parse_args(argv)
+    with profiled(args.profile, "run_pipeline_enhanced"), \
+            start_span("pipeline", dbt_backend=args.dbt_backend, dbt_build=args.dbt_build,
+                       changed_only=args.changed_only, resume=args.resume) as traced:
+        print(f"Trace ID: {traced.trace_id} (python scripts/tracing.py show {traced.trace_id})")
+        run_pipeline(args)
+
+def run_pipeline(args):
+    """Run the step graph and report; exits with the pipeline's status"""
     project_root = Path(__file__).parent.parent
     os.chdir(project_root)
     
     print("🚀 Starting Enhanced Data Quality Pipeline")
     print("="*60)
     print(f"Timestamp: {datetime.datetime.now().isoformat()}")
+    print(f"Max parallel steps: {args.max_parallel}")
+    print(f"dbt backend: {args.dbt_backend}{' (dbt build)' if args.dbt_build else ''}")
     print("="*60)
+    print_bronze_versions()
     
     pipeline_status = "success"
     errors = []
     warnings = []
+    test_results_path = project_root / "target" / "run_results.json"
+    test_summary = {'passed': 0, 'failed': 0, 'warned': 0}
     
-    # Step 1: Install dependencies
-    success, output = run_command("dbt deps", "Installing dbt packages", continue_on_error=True)
-    if not success:
-        warnings.append("dbt deps had issues")
+    node_results: Dict[str, List[Dict]] = {}
+    webhook_url = os.getenv('SLACK_WEBHOOK_URL')
     
-    # Step 2: Run dbt models (staging)
-    success, output = run_command("dbt run --select staging", "Building staging models")
-    if not success:
-        errors.append("Staging models failed")
-        pipeline_status = "failed"
-        print("\n❌ Pipeline failed at staging models")
-        sys.exit(1)
+    def on_step_complete(step: PipelineStep, result: Dict):
+        nonlocal test_summary
+        failed_nodes = None
+        if step.name in ("dbt_test", "build"):
+            # Read before dbt docs generate replaces run_results.json
+            test_summary = get_test_summary(load_dbt_results(test_results_path))
+        if step.command.startswith("dbt ") and step.name != "deps":
+            # dbt steps never overlap, so run_results.json belongs to this step
+            node_results[step.name] = node_timings(load_dbt_results(RUN_RESULTS_PATH))
+            if result['status'] == 'failed':
+                failed_nodes = failed_dbt_nodes(RUN_RESULTS_PATH)
+        ledger.record(step.name, result, failed_nodes)
+        if result['status'] in ('failed', 'warning'):
+            send_notification(result['status'], step.failure_message, webhook_url)
     
-    # Step 3: Run dbt models (intermediate)
-    success, output = run_command("dbt run --select intermediate", "Building intermediate models")
-    if not success:
-        errors.append("Intermediate models failed")
-        pipeline_status = "failed"
-        print("\n❌ Pipeline failed at intermediate models")
-        sys.exit(1)
+    plan = None
+    if args.changed_only:
+        try:
+            plan = plan_changed_only()
+        except Exception as e:
+            print(f"⚠️  Could not work out changes ({e}); building everything")
+        if plan:
+            print_changed_only_summary(plan)
+            if plan['selector'] and not plan['selected']:
+                print("\n✅ Nothing changed since the last successful run - skipping")
+                sys.exit(0)
     
-    # Step 4: Run dbt models (marts)
-    success, output = run_command("dbt run --select marts", "Building marts models")
-    if not success:
-        errors.append("Marts models failed")
-        pipeline_status = "failed"
-        print("\n❌ Pipeline failed at marts models")
-        sys.exit(1)
+    gx_dir = project_root / "gx"
+    steps = build_pipeline_steps(gx_configured=gx_dir.exists(), build_mode=args.dbt_build,
+                                 selector=plan['selector'] if plan else None)
     
-    # Step 5: Run dbt tests
-    success, output = run_command("dbt test", "Running dbt tests", continue_on_error=True)
-    if not success:
-        warnings.append("Some dbt tests failed")
+    commands = {step.name: step.command for step in steps}
+    ledger, completed = prepare_resume(steps, commands) if args.resume else (None, {})
+    if ledger is None:
+        ledger = RunLedger()
+        ledger.start(commands)
+    else:
+        ledger.resume()
     
-    # Load test results
-    test_results_path = project_root / "target" / "run_results.json"
-    test_results = load_dbt_results(test_results_path)
-    test_summary = get_test_summary(test_results)
+    execute = run_step_command
+    dbt = None
+    if args.dbt_backend == "inprocess":
+        dbt = InProcessDbt()
+        
+        def execute(step: PipelineStep) -> Tuple[bool, str]:
+            if step.command.startswith("dbt "):
+                return run_dbt_in_process(dbt, step.command, step.description)
+            return run_command(step.command, step.description, label=step.name)
+    
+    start = time.perf_counter()
+    results = run_step_graph(steps, max_parallel=args.max_parallel,
+                             on_step_complete=on_step_complete, execute=execute,
+                             completed=completed, max_retries=args.max_retries,
+                             backoff_seconds=args.retry_backoff_seconds)
+    wall_seconds = time.perf_counter() - start
+    
+    for step in steps:
+        status = results[step.name]['status']
+        if status == 'warning':
+            warnings.append(step.failure_message)
+        elif status == 'failed':
+            errors.append(step.failure_message)
+    
+    failed_steps = [step for step in steps if results[step.name]['status'] == 'failed']
+    if failed_steps:
+        print_step_report(steps, results, wall_seconds, dbt)
+        ledger.finish("failed")
+        record_telemetry(ledger, "failed", wall_seconds, results, node_results)
+        print(f"\n❌ Pipeline failed: {failed_steps[0].failure_message}")
+        print(f"   Re-run with --resume to continue from {failed_steps[0].name}")
+        send_notification("failed", f"stopped at {failed_steps[0].name}: {failed_steps[0].failure_message}",
+                          webhook_url)
+        sys.exit(1)
     
     print(f"\n📊 Test Summary:")
     print(f"   ✅ Passed: {test_summary['passed']}")
@@ -133,33 +603,13 @@ def main():
     if test_summary['failed'] > 0:
         warnings.append(f"{test_summary['failed']} tests failed")
     
-    # Step 6: Run Great Expectations (if configured)
-    gx_dir = project_root / "gx"
-    if gx_dir.exists():
-        success, output = run_command(
-            "python scripts/gx_run_checkpoint.py",
-            "Running Great Expectations validation",
-            continue_on_error=True
-        )
-        if not success:
-            warnings.append("Great Expectations validation had issues")
-    else:
-        print("\nℹ️  Great Expectations not configured (skipping)")
-    
-    # Step 7: Generate documentation
-    success, output = run_command("dbt docs generate", "Generating dbt documentation", continue_on_error=True)
-    if not success:
-        warnings.append("Documentation generation had issues")
-    
-    # Step 8: Build GX data docs (if configured)
-    if gx_dir.exists():
-        success, output = run_command(
-            "python scripts/gx_docs_build.py",
-            "Building Great Expectations data docs",
-            continue_on_error=True
-        )
-        if not success:
-            warnings.append("GX docs generation had issues")
+    print_step_report(steps, results, wall_seconds, dbt)
+    ledger.finish("success")
+    record_telemetry(ledger, "success", wall_seconds, results, node_results)
+    if plan:
+        print_changed_only_summary(plan)
+        if not errors:
+            save_state(plan['fingerprints'])
     
     # Final summary
     print("\n" + "="*60)
@@ -182,7 +632,6 @@ def main():
     print("   - GX docs: python scripts/gx_docs_build.py")
     
     # Send notification (if webhook URL is set)
-    webhook_url = os.getenv('SLACK_WEBHOOK_URL')
     if webhook_url:
         message = f"Pipeline completed. Tests: {test_summary['passed']} passed, {test_summary['failed']} failed"
         send_notification(pipeline_status, message, webhook_url)
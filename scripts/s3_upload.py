@@ -3,12 +3,29 @@ S3 Data Lake Upload Script
 Uploads healthcare analytics CSV files to S3 bronze layer with proper organization.
 """
 
+import argparse
 import boto3
+import hashlib
+import json
 import os
+import time
+from boto3.s3.transfer import TransferConfig
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from datetime import datetime, timezone
 import logging
 
+from manifest_store import append_manifest_records
+from profiling import add_profile_argument, profiled, span
+from tracing import start_span
+from upload_journal import UploadJournal, abort_orphaned_uploads, resumable_upload
+from upload_stream import (
+    COMPRESSION_SUFFIXES,
+    CompressedUploadStream,
+    CsvUploadStream,
+    UploadValidationError,
+)
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -19,6 +36,36 @@ logger = logging.getLogger(__name__)
 # Configuration
 S3_BUCKET_NAME = os.getenv('S3_BUCKET_NAME', 'healthcare-analytics-datalake')
 AWS_REGION = os.getenv('AWS_REGION', 'us-east-1')
+# Optional endpoint override (e.g. a local moto server: http://127.0.0.1:5000)
+S3_ENDPOINT_URL = os.getenv('S3_ENDPOINT_URL')
+
+# Transfer tuning (used by --concurrent mode)
+MB = 1024 * 1024
+DEFAULT_MAX_WORKERS = int(os.getenv('S3_UPLOAD_MAX_WORKERS', '3'))
+DEFAULT_PART_SIZE_MB = int(os.getenv('S3_UPLOAD_PART_SIZE_MB', '16'))
+DEFAULT_MAX_CONCURRENCY = int(os.getenv('S3_UPLOAD_MAX_CONCURRENCY', '8'))
+DEFAULT_MAX_BANDWIDTH_MB = float(os.getenv('S3_UPLOAD_MAX_BANDWIDTH_MB', '0'))  # 0 = unlimited
+
+# Local cache of what was last uploaded (size, mtime, sha256, ETag per S3 key)
+UPLOAD_STATE_PATH = os.getenv('S3_UPLOAD_STATE_PATH', 'data/.s3_upload_state.json')
+CHECKSUM_CHUNK_SIZE = 1 * MB
+
+# Allowed relative deviation of streamed row counts from FILES_TO_UPLOAD expected_rows
+ROW_COUNT_TOLERANCE = float(os.getenv('S3_UPLOAD_ROW_TOLERANCE', '0.05'))
+
+# Checkpoint journal for --resumable mode
+UPLOAD_JOURNAL_PATH = os.getenv('S3_UPLOAD_JOURNAL_PATH', 'data/.s3_upload_journal.json')
+ORPHAN_UPLOAD_TTL_HOURS = float(os.getenv('S3_UPLOAD_ORPHAN_TTL_HOURS', '24'))
+
+# On-the-fly compression of bronze CSVs ('none', 'gzip' or 'zstd')
+UPLOAD_COMPRESSION = os.getenv('S3_UPLOAD_COMPRESSION', 'none')
+COMPRESSION_CONTENT_TYPES = {
+    'gzip': 'application/gzip',
+    'zstd': 'application/zstd'
+}
+
+# Local working directory for the optional CSV -> Parquet silver stage
+PARQUET_WORK_DIR = os.getenv('PARQUET_WORK_DIR', 'data/parquet')
 
 # Data lake folder structure
 BRONZE_LAYER = 'bronze/raw/cms-data'
@@ -54,7 +101,7 @@ FILES_TO_UPLOAD = [
 def initialize_s3_client():
     """Initialize S3 client with credentials from environment or AWS config."""
     try:
-        s3_client = boto3.client('s3', region_name=AWS_REGION)
+        s3_client = boto3.client('s3', region_name=AWS_REGION, endpoint_url=S3_ENDPOINT_URL)
         # Test connection - try to list bucket or create if doesn't exist
         try:
             s3_client.head_bucket(Bucket=S3_BUCKET_NAME)
@@ -120,59 +167,213 @@ def create_s3_folder_structure(s3_client):
             logger.warning(f"Could not create folder {folder}: {str(e)}")
 
 
-def upload_file_to_s3(s3_client, local_path, s3_key, metadata):
-    """Upload a single file to S3 with metadata and validation."""
+def build_transfer_config(part_size_mb=DEFAULT_PART_SIZE_MB,
+                          max_concurrency=DEFAULT_MAX_CONCURRENCY,
+                          max_bandwidth_mb=DEFAULT_MAX_BANDWIDTH_MB):
+    """Build a boto3 TransferConfig for multipart uploads.
+
+    Files larger than one part are split into ``part_size_mb`` parts which are
+    sent by up to ``max_concurrency`` threads. ``max_bandwidth_mb`` caps the
+    transfer rate in MB/s per file (0 disables the cap).
+    """
+    part_size = int(part_size_mb * MB)
+    return TransferConfig(
+        multipart_threshold=part_size,
+        multipart_chunksize=part_size,
+        max_concurrency=max_concurrency,
+        max_bandwidth=int(max_bandwidth_mb * MB) if max_bandwidth_mb else None,
+        use_threads=True
+    )
+
+
+def load_upload_state(state_path=UPLOAD_STATE_PATH):
+    """Load the local upload-state cache (empty if missing or unreadable)."""
+    path = Path(state_path)
+    if not path.exists():
+        return {}
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable upload state {state_path}: {str(e)}")
+        return {}
+
+
+def save_upload_state(upload_state, state_path=UPLOAD_STATE_PATH):
+    """Persist the upload-state cache atomically."""
+    path = Path(state_path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(path.suffix + '.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(upload_state, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def compute_file_checksum(local_path, chunk_size=CHECKSUM_CHUNK_SIZE):
+    """Compute a SHA-256 of a file in fixed-size chunks (constant memory)."""
+    digest = hashlib.sha256()
+    with open(local_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def get_remote_object(s3_client, s3_key):
+    """Return head_object for s3_key, or None if it does not exist."""
+    try:
+        return s3_client.head_object(Bucket=S3_BUCKET_NAME, Key=s3_key)
+    except s3_client.exceptions.ClientError as e:
+        if e.response['Error']['Code'] in ('404', 'NoSuchKey', 'NotFound'):
+            return None
+        raise
+
+
+def check_file_unchanged(s3_client, local_path, s3_key, cached):
+    """Decide whether a local file matches what is already in S3.
+    
+    Returns ``(unchanged, checksum)``. When size and mtime match the cache the
+    file is not re-read, so the check costs one stat and one HEAD request.
+    Otherwise the file is hashed once so that a re-downloaded but identical
+    file is still skipped; the checksum is returned for the object metadata.
+    """
+    stat = Path(local_path).stat()
+    checksum = None
+    
+    if not cached:
+        return False, checksum
+    
+    same_stat = cached.get('size') == stat.st_size and cached.get('mtime') == stat.st_mtime
+    if not same_stat:
+        checksum = compute_file_checksum(local_path)
+        if checksum != cached.get('sha256'):
+            return False, checksum
+    
+    remote = get_remote_object(s3_client, s3_key)
+    if remote is None:
+        return False, checksum
+    
+    remote_sha256 = remote.get('Metadata', {}).get('sha256')
+    unchanged = (
+        remote['ETag'] == cached.get('etag')
+        and remote['ContentLength'] == cached.get('remote_size', stat.st_size)
+        and remote_sha256 in (None, cached.get('sha256'))
+    )
+    return unchanged, checksum
+
+
+def upload_file_to_s3(s3_client, local_path, s3_key, metadata, transfer_config=None,
+                      row_tolerance=ROW_COUNT_TOLERANCE, journal=None, compression=None,
+                      compression_level=None):
+    """Upload a single file to S3 with metadata and validation.
+    
+    The file is streamed through CsvUploadStream, so row counts, malformed
+    records and the SHA-256 are gathered from the same read that feeds the
+    upload. If the row count is outside ``row_tolerance`` of
+    ``metadata['expected_rows']`` the transfer is aborted before it completes.
+    
+    With a ``journal`` the file is sent as a journaled multipart upload that
+    resumes from the last completed part after an interruption.
+    
+    With ``compression`` ('gzip' or 'zstd') the bytes are compressed on the fly
+    between the validating reader and the upload; nothing is written to disk.
+    
+    Returns ``(head_object response, stream stats)``; the response is None on
+    failure.
+    """
     file_path = Path(local_path)
     
     if not file_path.exists():
         logger.error(f"File not found: {local_path}")
-        return False
+        return None, {}
     
     file_size_mb = file_path.stat().st_size / (1024 * 1024)
     logger.info(f"Uploading {file_path.name} ({file_size_mb:.2f} MB) to {s3_key}")
     
+    stream = CsvUploadStream(
+        local_path,
+        expected_rows=metadata.get('expected_rows'),
+        row_tolerance=row_tolerance
+    )
+    upload_stream = stream
+    if compression:
+        upload_stream = CompressedUploadStream(stream, codec=compression, level=compression_level)
+    extra_args = {
+        'Metadata': {
+            'upload_date': datetime.now(timezone.utc).isoformat(),
+            'description': metadata['description'],
+            'expected_rows': str(metadata['expected_rows']),
+            'source': 'CMS',
+            'data_layer': 'bronze',
+            'file_type': 'csv',
+            **({'sha256': metadata['sha256']} if metadata.get('sha256') else {}),
+            **({'compression': compression} if compression else {})
+        },
+        'ContentType': COMPRESSION_CONTENT_TYPES.get(compression, 'text/csv'),
+        'ServerSideEncryption': 'AES256'  # Enable encryption
+    }
     try:
         # Upload with metadata
-        s3_client.upload_file(
-            local_path,
-            S3_BUCKET_NAME,
-            s3_key,
-            ExtraArgs={
-                'Metadata': {
-                    'upload_date': datetime.now(timezone.utc).isoformat(),
-                    'description': metadata['description'],
-                    'expected_rows': str(metadata['expected_rows']),
-                    'source': 'CMS',
-                    'data_layer': 'bronze',
-                    'file_type': 'csv'
-                },
-                'ContentType': 'text/csv',
-                'ServerSideEncryption': 'AES256'  # Enable encryption
-            }
-        )
+        with upload_stream, span('s3.upload_fileobj'):
+            if journal is not None:
+                resumable_upload(
+                    s3_client, S3_BUCKET_NAME, s3_key, upload_stream, extra_args, journal,
+                    part_size=transfer_config.multipart_chunksize if transfer_config else DEFAULT_PART_SIZE_MB * MB,
+                    max_concurrency=transfer_config.max_concurrency if transfer_config else DEFAULT_MAX_CONCURRENCY
+                )
+            else:
+                s3_client.upload_fileobj(
+                    upload_stream,
+                    S3_BUCKET_NAME,
+                    s3_key,
+                    ExtraArgs=extra_args,
+                    Config=transfer_config
+                )
+        stats = upload_stream.stats()
+        sent_bytes = stats.get('compressed_bytes', stats['bytes'])
         
         # Verify upload
         response = s3_client.head_object(Bucket=S3_BUCKET_NAME, Key=s3_key)
         uploaded_size_mb = response['ContentLength'] / (1024 * 1024)
+        if response['ContentLength'] != sent_bytes:
+            raise UploadValidationError(
+                f"uploaded size {response['ContentLength']:,} bytes does not match "
+                f"{sent_bytes:,} bytes sent"
+            )
+        if journal is not None:
+            stat = file_path.stat()
+            journal.finish(s3_key, stat.st_size, stat.st_mtime, response['ETag'], stats)
         
         logger.info(f"✓ Successfully uploaded {file_path.name}")
         logger.info(f"  Size: {uploaded_size_mb:.2f} MB")
+        if compression:
+            logger.info(f"  Compression: {compression} level {stats['compression_level']}, "
+                        f"{stats['compression_ratio']}x in {stats['compression_seconds']:.2f}s")
+        logger.info(f"  Rows: {stats['rows']:,} (expected {metadata['expected_rows']:,})")
+        if stats['malformed_rows']:
+            logger.warning(f"  Malformed rows: {stats['malformed_rows']:,} "
+                           f"(first: {stats['malformed_examples'][:3]})")
         logger.info(f"  S3 Path: s3://{S3_BUCKET_NAME}/{s3_key}")
         
-        return True
+        return response, stats
         
+    except UploadValidationError as e:
+        logger.error(f"Validation failed for {file_path.name}, upload aborted: {str(e)}")
+        return None, upload_stream.stats()
     except Exception as e:
         logger.error(f"Failed to upload {file_path.name}: {str(e)}")
-        return False
+        return None, upload_stream.stats()
 
 
-def create_upload_manifest(s3_client, upload_results):
+def create_upload_manifest(s3_client, upload_results, silver_results=None):
     """Create a manifest file documenting the upload."""
     manifest = {
         'upload_timestamp': datetime.now(timezone.utc).isoformat(),
         'bucket': S3_BUCKET_NAME,
         'region': AWS_REGION,
-        'files': []
+        'transferred': [r['s3_key'] for r in upload_results if r['status'] == 'success'],
+        'skipped': [r['s3_key'] for r in upload_results if r['status'] == 'skipped'],
+        'files': [],
+        'silver': silver_results or []
     }
     
     for result in upload_results:
@@ -181,26 +382,350 @@ def create_upload_manifest(s3_client, upload_results):
             'local_path': result['local_path'],
             'description': result['description'],
             'status': result['status'],
-            'size_mb': result.get('size_mb', 0)
+            'size_mb': result.get('size_mb', 0),
+            'bytes': result.get('bytes'),
+            'expected_size_mb': result.get('expected_size_mb'),
+            'rows': result.get('rows'),
+            'expected_rows': result.get('expected_rows'),
+            'malformed_rows': result.get('malformed_rows'),
+            'compression': result.get('compression'),
+            'compressed_bytes': result.get('compressed_bytes'),
+            'compression_ratio': result.get('compression_ratio'),
+            'compression_seconds': result.get('compression_seconds'),
+            'sha256': result.get('sha256'),
+            'etag': result.get('etag')
         })
     
     manifest_key = f"metadata/upload_manifest_{datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S')}.json"
     
-    import json
-    s3_client.put_object(
-        Bucket=S3_BUCKET_NAME,
-        Key=manifest_key,
-        Body=json.dumps(manifest, indent=2),
-        ContentType='application/json',
-        Metadata={'purpose': 'upload_manifest'}
-    )
+    with span('s3.put_object'):
+        s3_client.put_object(
+            Bucket=S3_BUCKET_NAME,
+            Key=manifest_key,
+            Body=json.dumps(manifest, indent=2),
+            ContentType='application/json',
+            Metadata={'purpose': 'upload_manifest'}
+        )
     
     logger.info(f"Created upload manifest: {manifest_key}")
+    
+    # One record per dataset in the consolidated manifest log
+    records = [
+        {
+            'layer': 'bronze',
+            'dataset': Path(entry['local_path']).stem,
+            'timestamp': manifest['upload_timestamp'],
+            **{field: entry[field] for field in ('s3_key', 'status', 'bytes', 'rows', 'compression', 'sha256', 'etag')}
+        }
+        for entry in manifest['files']
+    ] + [
+        {
+            'layer': 'silver',
+            'dataset': entry['s3_prefix'].rstrip('/').rsplit('/', 1)[-1],
+            'timestamp': manifest['upload_timestamp'],
+            **entry
+        }
+        for entry in manifest['silver']
+    ]
+    try:
+        append_manifest_records(s3_client, S3_BUCKET_NAME, records, 'upload', manifest_key=manifest_key)
+    except Exception as e:
+        # current.json would silently go stale - fail the run instead
+        logger.error(f"Could not append to the manifest log: {str(e)}")
+        raise
     return manifest_key
 
 
-def main():
+def summarize_stream_stats(stats):
+    """Map upload stream stats onto the fields of an upload result record."""
+    summary = {
+        'bytes': stats['bytes'],
+        'size_mb': round(stats['bytes'] / MB, 2),
+        'rows': stats['rows'],
+        'malformed_rows': stats['malformed_rows'],
+        'sha256': stats['sha256']
+    }
+    for field in ('compression', 'compressed_bytes', 'compression_ratio', 'compression_seconds'):
+        if field in stats:
+            summary[field] = stats[field]
+    return summary
+
+
+def build_state_entry(stat, stats, etag, uploaded_at):
+    """Build the upload-state cache entry for a file that is now in S3."""
+    return {
+        'size': stat.st_size,
+        'mtime': stat.st_mtime,
+        'remote_size': stats.get('compressed_bytes', stats['bytes']),
+        'sha256': stats['sha256'],
+        'rows': stats['rows'],
+        'malformed_rows': stats['malformed_rows'],
+        'etag': etag,
+        'uploaded_at': uploaded_at
+    }
+
+
+def upload_file_config(s3_client, file_config, transfer_config=None, **options):
+    """Upload one FILES_TO_UPLOAD entry (see _upload_file_config) as a trace span."""
+    with start_span('s3_upload.file', s3_key=file_config['s3_key']) as traced:
+        result = _upload_file_config(s3_client, file_config, transfer_config, **options)
+        traced.set(
+            status=result['status'],
+            bytes=result.get('bytes'),
+            rows=result.get('rows'),
+            compressed_bytes=result.get('compressed_bytes')
+        )
+        if result['status'] == 'failed':
+            traced.fail('upload failed')
+        return result
+
+
+def _upload_file_config(s3_client, file_config, transfer_config=None, upload_state=None, force=False,
+                        row_tolerance=ROW_COUNT_TOLERANCE, journal=None, compression=None,
+                        compression_level=None):
+    """Upload one FILES_TO_UPLOAD entry and return its result record.
+    
+    When ``upload_state`` is given, files whose content already matches the
+    remote object are skipped and the cache entry is refreshed after each
+    transfer. ``force`` uploads regardless of the cache. With a ``journal``,
+    files finished by an interrupted earlier run are not sent again.
+    Compressed uploads get the codec's suffix appended to the S3 key.
+    """
+    local_path = file_config['local_path']
+    s3_key = file_config['s3_key'] + COMPRESSION_SUFFIXES.get(compression, '')
+    result = {
+        's3_key': s3_key,
+        'local_path': local_path,
+        'description': file_config['description'],
+        'status': 'failed',
+        'size_mb': 0,
+        'expected_size_mb': file_config['expected_size_mb'],
+        'expected_rows': file_config['expected_rows'],
+        'bytes': 0,
+        'seconds': 0.0
+    }
+    
+    start = time.perf_counter()
+    
+    if journal is not None and Path(local_path).exists():
+        stat = Path(local_path).stat()
+        finished = journal.get_finished(s3_key, stat.st_size, stat.st_mtime)
+        if finished:
+            logger.info(f"- {Path(local_path).name} already uploaded by the interrupted run")
+            result.update(summarize_stream_stats(finished['stats']))
+            result.update({'status': 'success', 'etag': finished['etag']})
+            if upload_state is not None:
+                upload_state[s3_key] = build_state_entry(
+                    stat, finished['stats'], finished['etag'], finished['completed_at']
+                )
+            return result
+    
+    checksum = None
+    if upload_state is not None and Path(local_path).exists():
+        cached = upload_state.get(s3_key)
+        if force:
+            unchanged = False
+        else:
+            try:
+                unchanged, checksum = check_file_unchanged(s3_client, local_path, s3_key, cached)
+            except Exception as e:
+                logger.warning(f"Could not compare {s3_key} with S3, uploading: {str(e)}")
+                unchanged = False
+        if unchanged:
+            stat = Path(local_path).stat()
+            cached['mtime'] = stat.st_mtime
+            logger.info(f"- Skipping {Path(local_path).name} (unchanged since last upload)")
+            result.update({
+                'status': 'skipped',
+                'size_mb': round(stat.st_size / MB, 2),
+                'rows': cached.get('rows'),
+                'malformed_rows': cached.get('malformed_rows'),
+                'sha256': cached.get('sha256'),
+                'etag': cached.get('etag'),
+                'seconds': round(time.perf_counter() - start, 3)
+            })
+            return result
+    
+    response, stats = upload_file_to_s3(
+        s3_client,
+        local_path,
+        s3_key,
+        {
+            'description': file_config['description'],
+            'expected_rows': file_config['expected_rows'],
+            'sha256': checksum
+        },
+        transfer_config=transfer_config,
+        row_tolerance=row_tolerance,
+        journal=journal,
+        compression=compression,
+        compression_level=compression_level
+    )
+    result['seconds'] = round(time.perf_counter() - start, 3)
+    result.update({
+        'rows': stats.get('rows'),
+        'malformed_rows': stats.get('malformed_rows'),
+        'sha256': stats.get('sha256')
+    })
+    
+    if response is not None:
+        result.update(summarize_stream_stats(stats))
+        result.update({'status': 'success', 'etag': response['ETag']})
+        if upload_state is not None:
+            upload_state[s3_key] = build_state_entry(
+                Path(local_path).stat(), stats, response['ETag'],
+                datetime.now(timezone.utc).isoformat()
+            )
+    
+    return result
+
+
+def upload_parquet_dataset(s3_client, result, upload_state=None, work_dir=PARQUET_WORK_DIR,
+                           force=False, transfer_config=None):
+    """Convert an uploaded bronze CSV to Parquet and upload it to the silver layer.
+    
+    Output lands under ``SILVER_LAYER/<dataset>/`` using the partition layout
+    from csv_to_parquet.PARQUET_DATASETS. Conversion is skipped when the CSV
+    checksum matches the one the current silver copy was built from.
+    """
+    from csv_to_parquet import convert_csv_to_parquet
+    
+    local_path = Path(result['local_path'])
+    dataset = local_path.stem
+    s3_prefix = f'{SILVER_LAYER}/{dataset}/'
+    cached = (upload_state or {}).get(s3_prefix)
+    
+    if not force and cached and result.get('sha256') and cached.get('source_sha256') == result['sha256']:
+        logger.info(f"- Skipping Parquet for {dataset} (source unchanged)")
+        return {'s3_prefix': s3_prefix, 'status': 'skipped', **cached}
+    
+    logger.info(f"Converting {local_path.name} to Parquet...")
+    start = time.perf_counter()
+    output_dir = Path(work_dir) / dataset
+    with span('parquet.convert', dataset=dataset) as traced:
+        stats = convert_csv_to_parquet(local_path, output_dir, dataset=dataset)
+        traced.set(rows=stats['rows'], bytes=stats['bytes'], files=len(stats['files']))
+    
+    for relative_path in stats['files']:
+        with span('s3.upload_file'):
+            s3_client.upload_file(
+                str(output_dir / relative_path),
+                S3_BUCKET_NAME,
+                f'{s3_prefix}{relative_path}',
+                ExtraArgs={
+                    'Metadata': {
+                        'source_s3_key': result['s3_key'],
+                        'data_layer': 'silver',
+                        'file_type': 'parquet'
+                    },
+                    'ContentType': 'application/vnd.apache.parquet',
+                    'ServerSideEncryption': 'AES256'
+                },
+                Config=transfer_config
+            )
+    
+    summary = {
+        'source_sha256': result.get('sha256'),
+        'rows': stats['rows'],
+        'files': len(stats['files']),
+        'bytes': stats['bytes'],
+        'compression': stats['compression'],
+        'converted_at': datetime.now(timezone.utc).isoformat()
+    }
+    if upload_state is not None:
+        upload_state[s3_prefix] = summary
+    
+    logger.info(
+        f"✓ Wrote {stats['rows']:,} rows to s3://{S3_BUCKET_NAME}/{s3_prefix} "
+        f"({len(stats['files'])} files, {stats['bytes'] / MB:.2f} MB, "
+        f"{time.perf_counter() - start:.2f}s)"
+    )
+    return {'s3_prefix': s3_prefix, 'status': 'success', **summary}
+
+
+def upload_files_concurrently(s3_client, file_configs, transfer_config, max_workers=DEFAULT_MAX_WORKERS,
+                              **upload_options):
+    """Upload files in parallel through a bounded worker pool.
+    
+    Each worker uploads one file; large files are additionally split into
+    multipart parts according to ``transfer_config``. ``upload_options`` are
+    passed through to upload_file_config. Results are returned in the same
+    order as ``file_configs``.
+    """
+    logger.info(
+        f"Concurrent mode: {max_workers} file workers, "
+        f"{transfer_config.multipart_chunksize // MB} MB parts, "
+        f"{transfer_config.max_concurrency} part threads per file"
+    )
+    start = time.perf_counter()
+    results = [None] * len(file_configs)
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(
+                upload_file_config, s3_client, file_config, transfer_config, **upload_options
+            ): index
+            for index, file_config in enumerate(file_configs)
+        }
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+    
+    elapsed = time.perf_counter() - start
+    total_bytes = sum(r['bytes'] for r in results)
+    throughput = (total_bytes / MB) / elapsed if elapsed > 0 else 0.0
+    logger.info(
+        f"Aggregate throughput: {total_bytes / MB:.2f} MB in {elapsed:.2f}s "
+        f"({throughput:.2f} MB/s)"
+    )
+    return results
+
+
+def parse_args(argv=None):
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Upload CMS data files to the S3 bronze layer')
+    parser.add_argument('--concurrent', action='store_true',
+                        help='Upload files in parallel with multipart transfers')
+    parser.add_argument('--max-workers', type=int, default=DEFAULT_MAX_WORKERS,
+                        help='Number of files uploaded at once (concurrent mode)')
+    parser.add_argument('--part-size-mb', type=int, default=DEFAULT_PART_SIZE_MB,
+                        help='Multipart part size in MB (concurrent mode)')
+    parser.add_argument('--max-concurrency', type=int, default=DEFAULT_MAX_CONCURRENCY,
+                        help='Parallel part uploads per file (concurrent mode)')
+    parser.add_argument('--max-bandwidth-mb', type=float, default=DEFAULT_MAX_BANDWIDTH_MB,
+                        help='Per-file bandwidth cap in MB/s, 0 for unlimited (concurrent mode)')
+    parser.add_argument('--force', action='store_true',
+                        help='Upload every file even if unchanged since the last upload')
+    parser.add_argument('--state-path', default=UPLOAD_STATE_PATH,
+                        help='Local upload-state cache used to skip unchanged files')
+    parser.add_argument('--row-tolerance', type=float, default=ROW_COUNT_TOLERANCE,
+                        help='Allowed relative deviation from expected_rows before an upload is aborted')
+    parser.add_argument('--resumable', action='store_true',
+                        help='Journal multipart progress so an interrupted run resumes where it stopped')
+    parser.add_argument('--journal-path', default=UPLOAD_JOURNAL_PATH,
+                        help='Local checkpoint journal used by --resumable')
+    parser.add_argument('--orphan-ttl-hours', type=float, default=ORPHAN_UPLOAD_TTL_HOURS,
+                        help='Abort incomplete multipart uploads older than this (resumable mode)')
+    parser.add_argument('--compression', choices=['none', *COMPRESSION_SUFFIXES], default=UPLOAD_COMPRESSION,
+                        help='Compress CSVs on the fly before upload (zstd requires the zstandard package)')
+    parser.add_argument('--compression-level', type=int, default=None,
+                        help='Codec compression level (default: gzip 6, zstd 3)')
+    parser.add_argument('--parquet', action='store_true',
+                        help='Also convert each CSV to partitioned Parquet in the silver layer (requires pyarrow)')
+    parser.add_argument('--parquet-dir', default=PARQUET_WORK_DIR,
+                        help='Local working directory for Parquet conversion output')
+    add_profile_argument(parser)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
     """Main execution function."""
+    args = parse_args(argv)
+    with profiled(args.profile, 's3_upload'), start_span('s3_upload', bucket=S3_BUCKET_NAME):
+        run_upload(args)
+
+
+def run_upload(args):
+    """Upload every configured file, then write the manifest."""
     logger.info("=" * 60)
     logger.info("S3 Data Lake Upload - Healthcare Analytics Platform")
     logger.info("=" * 60)
@@ -218,37 +743,79 @@ def main():
     
     # Upload files
     logger.info("\nStarting file uploads...")
-    upload_results = []
-    
-    for file_config in FILES_TO_UPLOAD:
-        success = upload_file_to_s3(
-            s3_client,
-            file_config['local_path'],
-            file_config['s3_key'],
-            {
-                'description': file_config['description'],
-                'expected_rows': file_config['expected_rows']
-            }
+    upload_state = load_upload_state(args.state_path)
+    journal = None
+    if args.resumable:
+        journal = UploadJournal(args.journal_path)
+        try:
+            aborted = abort_orphaned_uploads(
+                s3_client, S3_BUCKET_NAME, f'{BRONZE_LAYER}/', journal, ttl_hours=args.orphan_ttl_hours
+            )
+            if aborted:
+                logger.info(f"Aborted {aborted} orphaned multipart uploads")
+        except Exception as e:
+            logger.warning(f"Could not clean up orphaned multipart uploads: {str(e)}")
+    
+    transfer_config = None
+    if args.concurrent or args.resumable:
+        transfer_config = build_transfer_config(
+            part_size_mb=args.part_size_mb,
+            max_concurrency=args.max_concurrency,
+            max_bandwidth_mb=args.max_bandwidth_mb
         )
-        
-        upload_results.append({
-            's3_key': file_config['s3_key'],
-            'local_path': file_config['local_path'],
-            'description': file_config['description'],
-            'status': 'success' if success else 'failed',
-            'size_mb': file_config['expected_size_mb']
-        })
+    upload_options = {
+        'upload_state': upload_state,
+        'force': args.force,
+        'row_tolerance': args.row_tolerance,
+        'journal': journal,
+        'compression': None if args.compression == 'none' else args.compression,
+        'compression_level': args.compression_level
+    }
+    if args.concurrent:
+        upload_results = upload_files_concurrently(
+            s3_client, FILES_TO_UPLOAD, transfer_config, max_workers=args.max_workers, **upload_options
+        )
+    else:
+        upload_results = [
+            upload_file_config(s3_client, file_config, transfer_config, **upload_options)
+            for file_config in FILES_TO_UPLOAD
+        ]
+    
+    # Optional silver-layer Parquet conversion
+    silver_results = []
+    if args.parquet:
+        logger.info("\nConverting bronze CSVs to silver Parquet...")
+        for result in upload_results:
+            if result['status'] == 'failed':
+                continue
+            try:
+                silver_results.append(upload_parquet_dataset(
+                    s3_client, result, upload_state, work_dir=args.parquet_dir, force=args.force
+                ))
+            except Exception as e:
+                logger.error(f"Parquet conversion failed for {result['local_path']}: {str(e)}")
+                silver_results.append({
+                    's3_prefix': f"{SILVER_LAYER}/{Path(result['local_path']).stem}/",
+                    'status': 'failed'
+                })
+    
+    save_upload_state(upload_state, args.state_path)
+    if journal is not None and all(r['status'] != 'failed' for r in upload_results):
+        # Everything landed and the upload state is saved - the journal is no longer needed
+        journal.clear_finished()
     
     # Create manifest
     logger.info("\nCreating upload manifest...")
-    manifest_key = create_upload_manifest(s3_client, upload_results)
+    manifest_key = create_upload_manifest(s3_client, upload_results, silver_results)
     
     # Summary
     logger.info("\n" + "=" * 60)
     logger.info("Upload Summary")
     logger.info("=" * 60)
     successful = sum(1 for r in upload_results if r['status'] == 'success')
+    skipped = sum(1 for r in upload_results if r['status'] == 'skipped')
     logger.info(f"Successfully uploaded: {successful}/{len(upload_results)} files")
+    logger.info(f"Skipped (unchanged): {skipped}/{len(upload_results)} files")
     logger.info(f"Manifest: s3://{S3_BUCKET_NAME}/{manifest_key}")
     logger.info("\nNext steps:")
     logger.info("1. Verify files in S3 console")
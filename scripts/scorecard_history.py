@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+Data Quality Scorecard History
+Appends every scored validation result to a local SQLite history: the overall
+score per suite and run, the score per category, and each expectation's
+outcome (observed value and unexpected percent for failures), so quality can
+be followed over time instead of only in the latest scorecard.json.
+
+Tables are keyed by (suite, ..., run time) and stored WITHOUT ROWID, so the
+rows of one suite/category/expectation sit together in run-time order and the
+trend queries are index range scans - milliseconds even after years of
+nightly runs across all marts suites. Recording is append-only: a run already
+in the history is left as it was.
+
+Usage:
+    python scripts/scorecard_history.py trend [--suite marts.fct_inpatient_charges]
+    python scripts/scorecard_history.py daily --suite marts.fct_inpatient_charges [--days 30]
+    python scripts/scorecard_history.py regressions [--days 7] [--baseline-days 30] [--limit 15]
+    python scripts/scorecard_history.py backfill        # import the whole validations store
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from gx_results import (RUN_TIME_FORMAT, VALIDATIONS_DIR, expectation_category, expectation_type,
+                        list_validation_results, list_validation_suites)
+
+
+def history_path(root_directory=None) -> str:
+    """The history database: SCORECARD_HISTORY_PATH, else uncommitted/ of the GX project root"""
+    if os.getenv('SCORECARD_HISTORY_PATH'):
+        return os.environ['SCORECARD_HISTORY_PATH']
+    return str(Path(root_directory or 'gx') / 'uncommitted' / 'scorecard_history.db')
+
+
+HISTORY_PATH = history_path()
+# Expectation kwargs that do not change what is checked
+NON_IDENTIFYING_KWARGS = ('column', 'batch_id', 'result_format', 'catch_exceptions', 'include_config')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scorecard_runs (
+    suite TEXT NOT NULL,
+    run_time TEXT NOT NULL,
+    run_id TEXT,
+    overall_score REAL NOT NULL,
+    evaluated INTEGER NOT NULL,
+    passed INTEGER NOT NULL,
+    recorded_at TEXT NOT NULL,
+    PRIMARY KEY (suite, run_time)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_scorecard_runs_time ON scorecard_runs (run_time);
+
+CREATE TABLE IF NOT EXISTS category_scores (
+    suite TEXT NOT NULL,
+    category TEXT NOT NULL,
+    run_time TEXT NOT NULL,
+    score REAL NOT NULL,
+    evaluated INTEGER NOT NULL,
+    passed INTEGER NOT NULL,
+    PRIMARY KEY (suite, category, run_time)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_category_scores_time ON category_scores (run_time);
+
+CREATE TABLE IF NOT EXISTS expectation_results (
+    suite TEXT NOT NULL,
+    expectation TEXT NOT NULL,
+    run_time TEXT NOT NULL,
+    expectation_type TEXT NOT NULL,
+    column_name TEXT,
+    category TEXT NOT NULL,
+    success INTEGER NOT NULL,
+    unexpected_percent REAL,
+    observed_value TEXT,
+    PRIMARY KEY (suite, expectation, run_time)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_expectation_results_time ON expectation_results (run_time, success);
+"""
+
+
+def open_history(path=HISTORY_PATH):
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def _iso_run_time(run_time: Optional[str]) -> str:
+    """ISO-8601 UTC form of a store run time (RUN_TIME_FORMAT), for date arithmetic in SQL"""
+    if not run_time:
+        return datetime.now(timezone.utc).isoformat()
+    try:
+        parsed = datetime.strptime(run_time, RUN_TIME_FORMAT)
+    except ValueError:
+        parsed = datetime.fromisoformat(run_time.replace('Z', '+00:00'))
+    return parsed.replace(tzinfo=parsed.tzinfo or timezone.utc).astimezone(timezone.utc).isoformat()
+
+
+def _since(days: int) -> str:
+    return (datetime.now(timezone.utc) - timedelta(days=days)).isoformat()
+
+
+def expectation_key(exp_type: str, kwargs: Dict) -> str:
+    """Identity of an expectation in the history: type, column and its other kwargs
+
+    Two checks of the same type on one column (e.g. different bounds) get
+    different keys; one without other kwargs keeps the plain `type:column` key.
+    """
+    key = f"{exp_type}:{kwargs['column']}" if kwargs.get('column') else exp_type
+    params = {k: v for k, v in kwargs.items() if k not in NON_IDENTIFYING_KWARGS}
+    return f"{key} {json.dumps(params, sort_keys=True, default=str)}" if params else key
+
+
+def expectation_rows(result: Dict) -> List[Dict]:
+    """One row per expectation of a validation result dict"""
+    rows = []
+    for item in result.get('results', []):
+        exp_type = expectation_type(item)
+        kwargs = item.get('expectation_config', {}).get('kwargs', {})
+        column = kwargs.get('column')
+        outcome = item.get('result') or {}
+        success = bool(item.get('success'))
+        rows.append({
+            'expectation': expectation_key(exp_type, kwargs),
+            'expectation_type': exp_type,
+            'column_name': column,
+            'category': expectation_category(exp_type),
+            'success': success,
+            'unexpected_percent': outcome.get('unexpected_percent'),
+            'observed_value': None if success or outcome.get('observed_value') is None
+            else json.dumps(outcome.get('observed_value'), default=str)
+        })
+    return rows
+
+
+def record_result(conn, suite: str, result: Dict) -> bool:
+    """Append one validation result; returns False if its run was already recorded"""
+    run = result.get('meta', {}).get('run_id') or {}
+    run_time = _iso_run_time(run.get('run_time'))
+    run_id = f"{run['run_name']}/{run['run_time']}" if run.get('run_name') else None
+    rows = expectation_rows(result)
+    passed = sum(r['success'] for r in rows)
+
+    categories: Dict[str, List[bool]] = {}
+    for r in rows:
+        categories.setdefault(r['category'], []).append(r['success'])
+
+    with conn:
+        inserted = conn.execute(
+            "INSERT OR IGNORE INTO scorecard_runs VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (suite, run_time, run_id, round(passed / len(rows) * 100, 2) if rows else 0, len(rows), passed,
+             datetime.now(timezone.utc).isoformat())
+        ).rowcount
+        if not inserted:
+            return False
+        conn.executemany(
+            "INSERT OR IGNORE INTO category_scores VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (suite, category, run_time, round(sum(outcomes) / len(outcomes) * 100, 2), len(outcomes),
+                 sum(outcomes))
+                for category, outcomes in categories.items()
+            ]
+        )
+        conn.executemany(
+            "INSERT OR IGNORE INTO expectation_results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (suite, r['expectation'], run_time, r['expectation_type'], r['column_name'], r['category'],
+                 int(r['success']), r['unexpected_percent'], r['observed_value'])
+                for r in rows
+            ]
+        )
+    return True
+
+
+def backfill(conn, validations_dir: Path = VALIDATIONS_DIR) -> int:
+    """Record every result in the validations store; returns the number of new runs"""
+    added = 0
+    for suite in list_validation_suites(validations_dir):
+        for run in list_validation_results(suite, validations_dir=validations_dir):
+            with open(run['path'], 'r') as f:
+                result = json.load(f)
+            result.setdefault('meta', {}).setdefault(
+                'run_id', {'run_name': run['run_name'], 'run_time': run['run_time']}
+            )
+            added += record_result(conn, suite, result)
+    return added
+
+
+# -- Queries ---------------------------------------------------------------
+
+def score_trends(conn, suite: Optional[str] = None):
+    """Per suite and category: latest score, 7- and 30-day averages, 30-day minimum"""
+    since_7, since_30 = _since(7), _since(30)
+    overall = (
+        "SELECT suite, 'overall', overall_score, run_time FROM scorecard_runs "
+        "WHERE run_time >= :since_30 AND (:suite IS NULL OR suite = :suite)"
+    )
+    by_category = (
+        "SELECT suite, category, score, run_time FROM category_scores "
+        "WHERE run_time >= :since_30 AND (:suite IS NULL OR suite = :suite)"
+    )
+    return conn.execute(
+        f"WITH scores (suite, category, score, run_time) AS ({overall} UNION ALL {by_category}) "
+        "SELECT suite, category, "
+        "(SELECT s2.score FROM scores s2 WHERE s2.suite = s.suite AND s2.category = s.category "
+        " ORDER BY s2.run_time DESC LIMIT 1), "
+        "AVG(CASE WHEN run_time >= :since_7 THEN score END), AVG(score), MIN(score), COUNT(*) "
+        "FROM scores s GROUP BY suite, category "
+        "ORDER BY suite, category != 'overall', category",
+        {'since_7': since_7, 'since_30': since_30, 'suite': suite}
+    ).fetchall()
+
+
+def daily_scores(conn, suite: str, days: int = 30):
+    """Overall score of one suite per day (the day's last run)"""
+    return conn.execute(
+        "SELECT substr(run_time, 1, 10) AS day, COUNT(*), "
+        "(SELECT overall_score FROM scorecard_runs r2 WHERE r2.suite = r.suite "
+        " AND substr(r2.run_time, 1, 10) = substr(r.run_time, 1, 10) ORDER BY r2.run_time DESC LIMIT 1), "
+        "MIN(overall_score) "
+        "FROM scorecard_runs r WHERE suite = ? AND run_time >= ? GROUP BY day ORDER BY day",
+        (suite, _since(days))
+    ).fetchall()
+
+
+def worst_regressions(conn, days: int = 7, baseline_days: int = 30, limit: int = 15):
+    """Expectations failing more often (or by more) in the last days than in the baseline before them"""
+    recent, baseline = _since(days), _since(days + baseline_days)
+    return conn.execute(
+        "SELECT suite, expectation, expectation_type, column_name, "
+        "AVG(CASE WHEN run_time >= :recent THEN 1.0 - success END) AS recent_fail, "
+        "AVG(CASE WHEN run_time < :recent THEN 1.0 - success END) AS baseline_fail, "
+        "AVG(CASE WHEN run_time >= :recent THEN unexpected_percent END) AS recent_unexpected, "
+        "AVG(CASE WHEN run_time < :recent THEN unexpected_percent END) AS baseline_unexpected, "
+        "SUM(run_time >= :recent), "
+        "(SELECT e2.observed_value FROM expectation_results e2 WHERE e2.suite = e.suite "
+        " AND e2.expectation = e.expectation AND e2.success = 0 ORDER BY e2.run_time DESC LIMIT 1) "
+        "FROM expectation_results e WHERE run_time >= :baseline "
+        "GROUP BY suite, expectation "
+        "HAVING recent_fail > COALESCE(baseline_fail, 0) "
+        "OR recent_unexpected > COALESCE(baseline_unexpected, 0) "
+        "ORDER BY recent_fail - COALESCE(baseline_fail, 0) DESC, "
+        "COALESCE(recent_unexpected, 0) - COALESCE(baseline_unexpected, 0) DESC LIMIT :limit",
+        {'recent': recent, 'baseline': baseline, 'limit': limit}
+    ).fetchall()
+
+
+def _pct(value) -> str:
+    return f"{value:.1f}" if value is not None else "-"
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Query the data quality scorecard history')
+    parser.add_argument('--history', default=HISTORY_PATH, help='Scorecard history database')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    trend = subparsers.add_parser('trend', help='Latest, 7-day and 30-day scores per suite and category')
+    trend.add_argument('--suite', default=None, help='Only this suite (default: all)')
+
+    daily = subparsers.add_parser('daily', help='Overall score of one suite per day')
+    daily.add_argument('--suite', required=True)
+    daily.add_argument('--days', type=int, default=30)
+
+    regressions = subparsers.add_parser('regressions', help='Expectations that got worse recently')
+    regressions.add_argument('--days', type=int, default=7, help='Recent window')
+    regressions.add_argument('--baseline-days', type=int, default=30, help='Window before it to compare with')
+    regressions.add_argument('--limit', type=int, default=15)
+
+    backfill_parser = subparsers.add_parser('backfill', help='Import all results in the validations store')
+    backfill_parser.add_argument('--validations-dir', default=str(VALIDATIONS_DIR))
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    conn = open_history(args.history)
+
+    if args.command == 'backfill':
+        print(f"Recorded {backfill(conn, Path(args.validations_dir))} new run(s) from {args.validations_dir}")
+    elif args.command == 'trend':
+        print(f"{'suite':<34} {'category':<13} {'latest':>7} {'7d avg':>7} {'30d avg':>8} {'30d min':>8} {'runs':>5}")
+        for suite, category, latest, avg_7, avg_30, min_30, runs in score_trends(conn, args.suite):
+            print(f"{suite:<34} {category:<13} {_pct(latest):>7} {_pct(avg_7):>7} {_pct(avg_30):>8} "
+                  f"{_pct(min_30):>8} {runs:>5}")
+    elif args.command == 'daily':
+        print(f"{'day':<11} {'runs':>5} {'score':>7} {'min':>7}")
+        for day, runs, score, lowest in daily_scores(conn, args.suite, args.days):
+            print(f"{day:<11} {runs:>5} {_pct(score):>7} {_pct(lowest):>7}")
+    elif args.command == 'regressions':
+        rows = worst_regressions(conn, args.days, args.baseline_days, args.limit)
+        if not rows:
+            print(f"No expectations got worse in the last {args.days} days")
+        else:
+            print(f"{'suite':<30} {'expectation':<45} {'fail % now':>10} {'before':>7} "
+                  f"{'unexp % now':>11} {'before':>7} {'runs':>5}")
+        for (suite, key, exp_type, column, recent_fail, baseline_fail, recent_unexp, baseline_unexp, runs,
+             observed) in rows:
+            name = f"{exp_type} on {column}" if column else exp_type
+            print(f"{suite:<30} {name[:45]:<45} {_pct(recent_fail * 100):>10} "
+                  f"{_pct(baseline_fail * 100 if baseline_fail is not None else None):>7} "
+                  f"{_pct(recent_unexp):>11} {_pct(baseline_unexp):>7} {runs:>5}")
+            params = key.partition(' ')[2]
+            if params:
+                print(f"{'':<30}   with: {params[:80]}")
+            if observed is not None:
+                print(f"{'':<30}   last observed: {observed[:80]}")
+
+
+if __name__ == '__main__':
+    main()
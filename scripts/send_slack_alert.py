@@ -2,68 +2,46 @@
 """
 Send Slack notifications for pipeline status
 Usage: python scripts/send_slack_alert.py "Pipeline completed successfully"
+Messages go through the shared background dispatcher (notifications.py), which
+deduplicates, rate-limits and spools undeliverable alerts.
 """
 
 import sys
-import os
-import requests
-import json
 from typing import Optional
 
+from notifications import get_dispatcher
+
 def send_slack_alert(
     message: str,
     webhook_url: Optional[str] = None,
-    status: str = "info"
+    status: str = "info",
+    wait: bool = False
 ) -> bool:
     """
-    Send a Slack notification
+    Send a Slack notification through the background dispatcher (notifications.py)
     
     Args:
         message: Message to send
         webhook_url: Slack webhook URL (or set SLACK_WEBHOOK_URL env var)
         status: Status type (success, failure, warning, info)
+        wait: Block until the message has been handled (sent, digested or spooled)
     
     Returns:
-        True if successful, False otherwise
+        True if the message was accepted (and, with wait, handled in time), False otherwise
     """
-    webhook_url = webhook_url or os.getenv('SLACK_WEBHOOK_URL')
+    dispatcher = get_dispatcher(webhook_url)
     
-    if not webhook_url:
+    if dispatcher is None:
         print("⚠️  No Slack webhook URL provided. Set SLACK_WEBHOOK_URL env var or pass webhook_url parameter.")
         return False
     
-    # Status emoji mapping
-    emoji_map = {
-        "success": ":white_check_mark:",
-        "failure": ":x:",
-        "warning": ":warning:",
-        "info": ":information_source:"
-    }
-    
-    emoji = emoji_map.get(status, ":information_source:")
-    
-    payload = {
-        "text": f"{emoji} {message}",
-        "username": "Healthcare Analytics Pipeline",
-        "icon_emoji": ":hospital:",
-        "attachments": [
-            {
-                "color": "good" if status == "success" else "danger" if status == "failure" else "warning",
-                "text": message,
-                "footer": "Healthcare Analytics Platform",
-                "ts": int(os.path.getmtime(__file__)) if os.path.exists(__file__) else None
-            }
-        ]
-    }
-    
-    try:
-        response = requests.post(webhook_url, json=payload, timeout=10)
-        response.raise_for_status()
-        print(f"✅ Slack notification sent successfully")
-        return True
-    except Exception as e:
-        print(f"❌ Failed to send Slack notification: {e}")
+    if not dispatcher.notify(message, status):
+        print("❌ Notification queue full; Slack notification dropped")
         return False
+    if wait and not dispatcher.flush():
+        print("⚠️  Slack notification not handled in time; it will be spooled")
+        return False
+    return True
 
 if __name__ == "__main__":
     if len(sys.argv) < 2:
@@ -74,6 +52,22 @@ if __name__ == "__main__":
     message = sys.argv[1]
     status = sys.argv[2] if len(sys.argv) > 2 else "info"
     
-    success = send_slack_alert(message, status=status)
-    sys.exit(0 if success else 1)
-
+    handled = send_slack_alert(message, status=status, wait=True)
+    dispatcher = get_dispatcher()
+    if dispatcher is None:
+        sys.exit(1)
+    # Deduplicated, digested and spooled messages are handled as designed; only
+    # a dropped or rejected message (or a dispatcher error) is a failed alert
+    stats = dispatcher.stats
+    if stats['dropped'] or stats['rejected'] or stats['errors']:
+        print(f"❌ Slack notification failed: {dict(stats)}")
+        sys.exit(1)
+    if stats['sent']:
+        print(f"✅ Slack notification sent successfully")
+    elif stats['spooled'] or not handled:
+        print(f"⚠️  Slack notification spooled for later delivery")
+    elif stats['deduplicated']:
+        print("ℹ️  Slack notification suppressed: the same alert was sent recently")
+    elif stats['digested']:
+        print("ℹ️  Slack notification rate-limited; it will go out in a digest")
+    sys.exit(0)
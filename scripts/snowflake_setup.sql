@@ -228,6 +228,19 @@ COMMENT = 'Raw readmissions data - Hospital Readmissions Reduction Program. Exac
 
 USE WAREHOUSE loading_wh;
 
+-- Note: s3_upload.py --compression gzip|zstd uploads ipps_charges.csv.gz /
+-- ipps_charges.csv.zst instead. csv_format uses COMPRESSION = AUTO, so the
+-- paths below match them as prefixes - remove any stale uncompressed copy
+-- first so rows are not loaded twice.
+-- The exact key of the current upload per dataset (with its sha256/ETag) is
+-- in metadata/manifest_log/current.json; print it with
+--   python scripts/manifest_store.py current
+-- and pin a load to it with FILES = ('<key relative to the stage>').
+
+-- To trace the load as part of the nightly run (tracing.py), run it through
+-- the span wrapper, e.g.:
+--   python scripts/tracing.py run --name copy_into --attr warehouse=LOADING_WH -- snowsql -f <copy statements>.sql
+
 -- Load IPPS Charges
 COPY INTO raw.ipps_charges
 FROM @healthcare_bronze_stage/ipps_charges/ipps_charges.csv
@@ -249,6 +262,31 @@ FILE_FORMAT = (FORMAT_NAME = csv_format)
 ON_ERROR = 'CONTINUE'
 FORCE = TRUE;
 
+-- ----------------------------------------------------------------------------
+-- Optional: Query typed Parquet from the silver layer
+-- Written by: python scripts/s3_upload.py --parquet
+-- Currency and count columns are already parsed to DECIMAL/INTEGER, so no
+-- REPLACE/CAST is needed when reading these files.
+-- ----------------------------------------------------------------------------
+
+-- CREATE OR REPLACE FILE FORMAT parquet_format
+--     TYPE = 'PARQUET'
+--     COMMENT = 'Parquet file format for silver layer CMS data';
+--
+-- CREATE OR REPLACE STAGE healthcare_silver_stage
+--     URL = 's3://your-bucket-name/silver/processed/'
+--     CREDENTIALS = (
+--         AWS_KEY_ID = 'YOUR_AWS_ACCESS_KEY_ID'
+--         AWS_SECRET_KEY = 'YOUR_AWS_SECRET_ACCESS_KEY'
+--     )
+--     FILE_FORMAT = parquet_format
+--     COMMENT = 'External stage for S3 silver layer - typed Parquet';
+--
+-- SELECT $1:Rndrng_Prvdr_CCN::VARCHAR AS hospital_id,
+--        $1:Avg_Submtd_Cvrd_Chrg::DECIMAL(18, 2) AS avg_covered_charges
+-- FROM @healthcare_silver_stage/ipps_charges/Rndrng_Prvdr_State_Abrvtn=CA/
+-- LIMIT 5;
+
 -- ============================================================================
 -- STEP 7: Verify Data Loaded
 -- ============================================================================
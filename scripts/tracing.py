@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Lightweight run tracing across the pipeline
+One trace ID per nightly run, with nested spans for each stage (upload, COPY
+INTO, dbt steps and models, GX validation, Slack alert) carrying attributes
+such as rows, bytes and warehouse. Spans are appended as JSON lines to
+logs/traces/<trace_id>.jsonl by every process taking part.
+
+The trace context travels to child processes in the W3C TRACEPARENT
+environment variable (stream_command passes it on), so s3_upload.py or
+gx_run_checkpoint.py launched by the pipeline runner nest under the step that
+started them. Shell steps outside Python, such as the COPY INTO load, are
+traced with the run subcommand. Set PIPELINE_TRACING=0 to turn tracing off.
+
+Usage:
+    python scripts/tracing.py run --name copy_into --attr warehouse=LOADING_WH -- snowsql -f load.sql
+    python scripts/tracing.py show [TRACE_ID]
+    python scripts/tracing.py chrome [TRACE_ID] [-o trace.json]   # open in chrome://tracing or Perfetto
+"""
+
+import argparse
+import contextvars
+import json
+import os
+import secrets
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+TRACE_DIR = os.getenv('PIPELINE_TRACE_DIR', 'logs/traces')
+TRACEPARENT_ENV = 'TRACEPARENT'
+TRACING_ENABLED = os.getenv('PIPELINE_TRACING', '1') != '0'
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar('current_span', default=None)
+_process_root: Optional['Span'] = None
+_export_lock = threading.Lock()
+_export_files: Dict[str, object] = {}
+
+
+def _parse_traceparent(value: Optional[str]):
+    """(trace_id, parent_span_id) from a W3C traceparent header, or (None, None)"""
+    parts = (value or '').split('-')
+    if len(parts) == 4 and len(parts[1]) == 32 and len(parts[2]) == 16:
+        return parts[1], parts[2]
+    return None, None
+
+
+class Span:
+    """One timed operation; written to the trace file when it ends."""
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], attributes: Dict):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.attributes = {k: v for k, v in attributes.items() if v is not None}
+        self.status = 'ok'
+        self.error: Optional[str] = None
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+
+    def set(self, **attributes):
+        """Add attributes (None values are dropped)"""
+        self.attributes.update({k: v for k, v in attributes.items() if v is not None})
+
+    def fail(self, error):
+        self.status = 'error'
+        self.error = str(error)[:500]
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def end(self, end_ns: Optional[int] = None):
+        self.end_ns = end_ns or time.time_ns()
+        _export(self)
+
+    def to_dict(self) -> Dict:
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'start_us': self.start_ns // 1000,
+            'duration_us': (self.end_ns - self.start_ns) // 1000,
+            'pid': os.getpid(),
+            'tid': threading.get_ident(),
+            'thread': threading.current_thread().name,
+            'status': self.status,
+            'error': self.error,
+            'attributes': self.attributes
+        }
+
+
+def _export(span: Span):
+    if not TRACING_ENABLED:
+        return
+    line = json.dumps(span.to_dict(), default=str)
+    with _export_lock:
+        f = _export_files.get(span.trace_id)
+        if f is None:
+            Path(TRACE_DIR).mkdir(parents=True, exist_ok=True)
+            f = _export_files[span.trace_id] = open(Path(TRACE_DIR) / f"{span.trace_id}.jsonl", 'a')
+        f.write(line + '\n')
+        f.flush()
+
+
+def current_span() -> Optional[Span]:
+    """The innermost open span of this context, else the process's root span"""
+    return _current_span.get() or _process_root
+
+
+def _new_span(name: str, attributes: Dict) -> Span:
+    global _process_root
+    parent = current_span()
+    if parent is not None:
+        return Span(name, parent.trace_id, parent.span_id, attributes)
+    trace_id, parent_id = _parse_traceparent(os.getenv(TRACEPARENT_ENV))
+    span = Span(name, trace_id or secrets.token_hex(16), parent_id, attributes)
+    _process_root = span
+    return span
+
+
+@contextmanager
+def start_span(name: str, **attributes) -> Iterator[Span]:
+    """Open a span nested under the current one (or the inherited TRACEPARENT)"""
+    span = _new_span(name, attributes)
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        if not (isinstance(e, SystemExit) and not e.code):
+            span.fail(e if str(e) else type(e).__name__)
+        raise
+    finally:
+        _current_span.reset(token)
+        span.end()
+
+
+def record_span(name: str, start: datetime, end: datetime, status: str = 'ok', **attributes):
+    """Add an already finished span (e.g. a dbt node from run_results.json) under the current span"""
+    span = _new_span(name, attributes)
+    span.start_ns = int(start.timestamp() * 1e9)
+    span.status = status
+    span.end(int(end.timestamp() * 1e9))
+    return span
+
+
+def child_env(env: Optional[Dict] = None) -> Dict:
+    """Environment for a child process, carrying the current span as TRACEPARENT"""
+    env = dict(os.environ if env is None else env)
+    span = current_span()
+    if span is not None and TRACING_ENABLED:
+        env[TRACEPARENT_ENV] = span.traceparent
+    return env
+
+
+def load_trace(trace_id: Optional[str] = None, trace_dir: str = TRACE_DIR) -> List[Dict]:
+    """Spans of a trace (the most recently written one by default), by start time"""
+    directory = Path(trace_dir)
+    if trace_id:
+        path = directory / f"{trace_id}.jsonl"
+    else:
+        files = sorted(directory.glob('*.jsonl'), key=lambda p: p.stat().st_mtime)
+        if not files:
+            raise FileNotFoundError(f"No traces in {directory}")
+        path = files[-1]
+    with open(path, 'r') as f:
+        spans = [json.loads(line) for line in f if line.strip()]
+    return sorted(spans, key=lambda s: s['start_us'])
+
+
+def to_chrome_trace(spans: List[Dict]) -> Dict:
+    """Chrome trace-event JSON (complete events, one row per process/thread)"""
+    events = []
+    named = set()
+    for span in spans:
+        if span['pid'] not in named:
+            # Spans are sorted by start, so a process's first span is its root
+            named.add(span['pid'])
+            events.append({'name': 'process_name', 'ph': 'M', 'pid': span['pid'], 'args': {'name': span['name']}})
+        events.append({
+            'name': span['name'],
+            'cat': span['name'].split('.')[0],
+            'ph': 'X',
+            'ts': span['start_us'],
+            'dur': span['duration_us'],
+            'pid': span['pid'],
+            'tid': span['tid'],
+            'args': {**span['attributes'], 'status': span['status'], **({'error': span['error']} if span['error'] else {})}
+        })
+    return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+
+def print_trace(spans: List[Dict]):
+    children: Dict[Optional[str], List[Dict]] = {}
+    ids = {s['span_id'] for s in spans}
+    for span in spans:
+        children.setdefault(span['parent_id'] if span['parent_id'] in ids else None, []).append(span)
+    origin = spans[0]['start_us'] if spans else 0
+
+    def walk(parent_id, depth):
+        for span in children.get(parent_id, []):
+            attributes = ' '.join(f"{k}={v}" for k, v in span['attributes'].items())
+            marker = ' ✗' if span['status'] == 'error' else ''
+            print(f"{(span['start_us'] - origin) / 1e6:>8.2f}s {span['duration_us'] / 1e6:>8.2f}s  "
+                  f"{'  ' * depth}{span['name']}{marker}  {attributes}")
+            walk(span['span_id'], depth + 1)
+
+    print(f"Trace {spans[0]['trace_id'] if spans else '-'} ({len(spans)} spans)")
+    print(f"{'start':>9} {'duration':>9}")
+    walk(None, 0)
+
+
+def run_traced(name: str, command: List[str], attributes: Dict) -> int:
+    """Run a command as one span, passing the trace context on to it"""
+    with start_span(name, command=' '.join(command), **attributes) as span:
+        returncode = subprocess.call(command, env=child_env())
+        span.set(exit_code=returncode)
+        if returncode != 0:
+            span.fail(f"exit code {returncode}")
+    return returncode
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Pipeline run traces')
+    parser.add_argument('--trace-dir', default=TRACE_DIR)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run = subparsers.add_parser('run', help='Run a command as a span of the current trace')
+    run.add_argument('--name', required=True)
+    run.add_argument('--attr', action='append', default=[], metavar='KEY=VALUE')
+    run.add_argument('cmd', nargs=argparse.REMAINDER)
+
+    show = subparsers.add_parser('show', help='Print a trace as an indented span tree')
+    show.add_argument('trace_id', nargs='?')
+
+    chrome = subparsers.add_parser('chrome', help='Convert a trace to Chrome trace-event JSON')
+    chrome.add_argument('trace_id', nargs='?')
+    chrome.add_argument('-o', '--output', default=None, help='Output file (default <trace_id>.chrome.json)')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.command == 'run':
+        command = args.cmd[1:] if args.cmd[:1] == ['--'] else args.cmd
+        attributes = dict(item.split('=', 1) for item in args.attr)
+        sys.exit(run_traced(args.name, command, attributes))
+
+    spans = load_trace(args.trace_id, args.trace_dir)
+    if args.command == 'show':
+        print_trace(spans)
+    elif args.command == 'chrome':
+        output = args.output or str(Path(args.trace_dir) / f"{spans[0]['trace_id']}.chrome.json")
+        with open(output, 'w') as f:
+            json.dump(to_chrome_trace(spans), f)
+        print(f"Wrote {output} - open it in chrome://tracing or https://ui.perfetto.dev")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,246 @@
+"""
+Resumable multipart uploads for s3_upload.py
+Keeps a local checkpoint journal of in-flight multipart uploads (upload ID and
+completed parts) and finished files, so an interrupted run continues from the
+last completed part instead of byte zero.
+"""
+
+import json
+import logging
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from upload_stream import UploadValidationError
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+MIN_PART_SIZE = 5 * MB  # S3 minimum for every part except the last
+
+
+class UploadJournal:
+    """Thread-safe JSON journal of multipart progress, flushed after every change.
+
+    Layout::
+
+        {
+          "in_flight": {s3_key: {upload_id, part_size, size, mtime, variant,
+                                 started_at, parts: {part_number: etag}}},
+          "finished": {s3_key: {size, mtime, etag, stats, completed_at}}
+        }
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self.data = {'in_flight': {}, 'finished': {}}
+        if self.path.exists():
+            try:
+                with open(self.path, 'r') as f:
+                    self.data.update(json.load(f))
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable upload journal {self.path}: {str(e)}")
+
+    def _flush(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(self.path.suffix + '.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(self.data, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def get_in_flight(self, s3_key):
+        with self._lock:
+            entry = self.data['in_flight'].get(s3_key)
+            return json.loads(json.dumps(entry)) if entry else None
+
+    def start(self, s3_key, upload_id, part_size, size, mtime, variant=None):
+        with self._lock:
+            self.data['in_flight'][s3_key] = {
+                'upload_id': upload_id,
+                'part_size': part_size,
+                'size': size,
+                'mtime': mtime,
+                'variant': variant,
+                'started_at': datetime.now(timezone.utc).isoformat(),
+                'parts': {}
+            }
+            self.data['finished'].pop(s3_key, None)
+            self._flush()
+
+    def record_part(self, s3_key, part_number, etag):
+        with self._lock:
+            self.data['in_flight'][s3_key]['parts'][str(part_number)] = etag
+            self._flush()
+
+    def finish(self, s3_key, size, mtime, etag, stats):
+        with self._lock:
+            self.data['in_flight'].pop(s3_key, None)
+            self.data['finished'][s3_key] = {
+                'size': size,
+                'mtime': mtime,
+                'etag': etag,
+                'stats': stats,
+                'completed_at': datetime.now(timezone.utc).isoformat()
+            }
+            self._flush()
+
+    def get_finished(self, s3_key, size, mtime):
+        """Return the finished entry for s3_key if it matches the local file."""
+        with self._lock:
+            entry = self.data['finished'].get(s3_key)
+            if entry and entry['size'] == size and entry['mtime'] == mtime:
+                return entry
+            return None
+
+    def discard(self, s3_key):
+        with self._lock:
+            self.data['in_flight'].pop(s3_key, None)
+            self._flush()
+
+    def clear_finished(self):
+        with self._lock:
+            self.data['finished'] = {}
+            self._flush()
+
+
+def abort_orphaned_uploads(s3_client, bucket, prefix, journal, ttl_hours=24):
+    """Abort multipart uploads under prefix that are older than ttl_hours.
+
+    Uploads still referenced by the journal are kept unless they have also
+    outlived the TTL, in which case their journal entry is dropped too.
+    Returns the number of uploads aborted.
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(hours=ttl_hours)
+    journal_ids = {
+        entry['upload_id']: key for key, entry in journal.data['in_flight'].items()
+    }
+    aborted = 0
+
+    paginator = s3_client.get_paginator('list_multipart_uploads')
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        for upload in page.get('Uploads', []):
+            if upload['Initiated'] >= cutoff:
+                continue
+            s3_client.abort_multipart_upload(
+                Bucket=bucket, Key=upload['Key'], UploadId=upload['UploadId']
+            )
+            aborted += 1
+            logger.info(f"Aborted orphaned multipart upload for {upload['Key']} "
+                        f"(initiated {upload['Initiated'].isoformat()})")
+            if upload['UploadId'] in journal_ids:
+                journal.discard(journal_ids[upload['UploadId']])
+
+    return aborted
+
+
+def _list_uploaded_parts(s3_client, bucket, s3_key, upload_id):
+    """Return {part_number: etag} for the parts S3 has for an upload, or None if it is gone."""
+    parts = {}
+    try:
+        paginator = s3_client.get_paginator('list_parts')
+        for page in paginator.paginate(Bucket=bucket, Key=s3_key, UploadId=upload_id):
+            for part in page.get('Parts', []):
+                parts[part['PartNumber']] = part['ETag']
+    except s3_client.exceptions.ClientError as e:
+        if e.response['Error']['Code'] in ('NoSuchUpload', '404'):
+            return None
+        raise
+    return parts
+
+
+def resumable_upload(s3_client, bucket, s3_key, stream, extra_args, journal,
+                     part_size=16 * MB, max_concurrency=4):
+    """Upload a stream as a journaled multipart upload, resuming if possible.
+
+    ``stream`` is read sequentially exactly once. Parts that the journal (and
+    S3) already have are read and discarded rather than re-sent, so stream
+    statistics still cover the whole file. Parts are uploaded by up to
+    ``max_concurrency`` threads and journaled as each one completes.
+
+    Files smaller than one part are sent with a single put_object. Streams
+    that transform the file (e.g. compression) expose a ``variant``; an
+    interrupted upload is only resumed when the variant is unchanged.
+    """
+    local_file = Path(stream.local_path)
+    stat = local_file.stat()
+    part_size = max(int(part_size), MIN_PART_SIZE)
+    variant = getattr(stream, 'variant', None)
+
+    if stat.st_size <= part_size:
+        body = stream.read()
+        stream.read()  # signal end of file so the stream validates
+        s3_client.put_object(Bucket=bucket, Key=s3_key, Body=body, **extra_args)
+        return
+
+    completed = {}
+    entry = journal.get_in_flight(s3_key)
+    fingerprint = (stat.st_size, stat.st_mtime, part_size, variant)
+    if entry and (entry['size'], entry['mtime'], entry['part_size'], entry.get('variant')) != fingerprint:
+        logger.info(f"Local file or upload settings changed since the interrupted upload of {s3_key}; starting over")
+        s3_client.abort_multipart_upload(Bucket=bucket, Key=s3_key, UploadId=entry['upload_id'])
+        journal.discard(s3_key)
+        entry = None
+
+    if entry:
+        remote_parts = _list_uploaded_parts(s3_client, bucket, s3_key, entry['upload_id'])
+        if remote_parts is None:
+            journal.discard(s3_key)
+            entry = None
+        else:
+            completed = {
+                int(number): etag for number, etag in entry['parts'].items()
+                if remote_parts.get(int(number)) == etag
+            }
+            logger.info(f"Resuming {s3_key}: {len(completed)} parts already uploaded")
+
+    if entry:
+        upload_id = entry['upload_id']
+    else:
+        upload_id = s3_client.create_multipart_upload(Bucket=bucket, Key=s3_key, **extra_args)['UploadId']
+        journal.start(s3_key, upload_id, part_size, stat.st_size, stat.st_mtime, variant)
+
+    def send_part(part_number, body):
+        response = s3_client.upload_part(
+            Bucket=bucket, Key=s3_key, UploadId=upload_id, PartNumber=part_number, Body=body
+        )
+        journal.record_part(s3_key, part_number, response['ETag'])
+        return part_number, response['ETag']
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+            pending = set()
+            part_number = 0
+            while True:
+                body = stream.read(part_size)
+                if not body:
+                    break
+                part_number += 1
+                if part_number in completed:
+                    continue
+                # Bound memory to max_concurrency parts in flight
+                if len(pending) >= max_concurrency:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        number, etag = future.result()
+                        completed[number] = etag
+                pending.add(executor.submit(send_part, part_number, body))
+            for future in pending:
+                number, etag = future.result()
+                completed[number] = etag
+    except UploadValidationError:
+        # The file itself is wrong - resuming would not help
+        s3_client.abort_multipart_upload(Bucket=bucket, Key=s3_key, UploadId=upload_id)
+        journal.discard(s3_key)
+        raise
+
+    s3_client.complete_multipart_upload(
+        Bucket=bucket,
+        Key=s3_key,
+        UploadId=upload_id,
+        MultipartUpload={
+            'Parts': [{'PartNumber': number, 'ETag': completed[number]} for number in sorted(completed)]
+        }
+    )
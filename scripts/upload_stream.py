@@ -0,0 +1,242 @@
+"""
+Streaming upload helpers for s3_upload.py
+Wraps a local CSV in a file-like reader that counts rows, detects malformed
+records and computes a checksum on the same bytes that are sent to S3, and
+optionally compresses them on the fly.
+"""
+
+import csv
+import hashlib
+import time
+import zlib
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Codec name -> S3 key suffix (Snowflake COMPRESSION = AUTO detects these)
+COMPRESSION_SUFFIXES = {
+    'gzip': '.gz',
+    'zstd': '.zst'
+}
+DEFAULT_COMPRESSION_LEVELS = {
+    'gzip': 6,
+    'zstd': 3
+}
+
+
+class UploadValidationError(Exception):
+    """Raised when a file being uploaded does not match its expected shape."""
+
+
+class CsvUploadStream:
+    """Read-only, non-seekable view of a CSV file that validates while it streams.
+
+    boto3's ``upload_fileobj`` reads the object sequentially, so every byte is
+    hashed and scanned exactly once as it goes out - there is no second pass
+    over the file. Records are split on newlines outside double quotes and a
+    record is malformed when its field count differs from the header's.
+
+    ``expected_rows`` (data rows, excluding the header) is checked with a
+    relative ``row_tolerance``: too many rows abort the transfer as soon as the
+    limit is crossed, too few abort it at end of file before the upload is
+    completed.
+    """
+
+    def __init__(self, local_path, expected_rows=None, row_tolerance=0.05, max_malformed_examples=5):
+        self.local_path = str(local_path)
+        self.expected_rows = expected_rows
+        self.row_tolerance = row_tolerance
+        self.max_malformed_examples = max_malformed_examples
+
+        self.bytes_read = 0
+        self.records = 0
+        self.malformed_rows = 0
+        self.malformed_examples = []
+        self.header_fields = None
+
+        self._file = open(self.local_path, 'rb')
+        self._sha256 = hashlib.sha256()
+        self._pending = b''
+        self._pending_quotes = 0
+        self._finished = False
+
+    # -- file-like interface used by boto3 -------------------------------
+
+    def read(self, size=-1):
+        data = self._file.read(size)
+        if data:
+            self.bytes_read += len(data)
+            self._sha256.update(data)
+            self._scan(data)
+        elif not self._finished:
+            self._finish()
+        return data
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    # -- results ---------------------------------------------------------
+
+    @property
+    def rows(self):
+        """Data rows seen so far (records excluding the header)."""
+        return max(self.records - 1, 0)
+
+    @property
+    def sha256(self):
+        return self._sha256.hexdigest()
+
+    def stats(self):
+        """Return the figures gathered while streaming."""
+        return {
+            'rows': self.rows,
+            'bytes': self.bytes_read,
+            'sha256': self.sha256,
+            'malformed_rows': self.malformed_rows,
+            'malformed_examples': self.malformed_examples
+        }
+
+    # -- scanning --------------------------------------------------------
+
+    def _scan(self, data):
+        lines = data.split(b'\n')
+        # Last element is an incomplete line (or b'' if data ended with \n)
+        for line in lines[:-1]:
+            self._pending += line + b'\n'
+            self._pending_quotes += line.count(b'"')
+            if self._pending_quotes % 2 == 0:
+                self._finish_record(self._pending)
+                self._pending = b''
+                self._pending_quotes = 0
+        tail = lines[-1]
+        self._pending += tail
+        self._pending_quotes += tail.count(b'"')
+
+    def _finish_record(self, record):
+        if not record.strip():
+            return
+        self.records += 1
+
+        if b'"' in record:
+            text = record.decode('utf-8', errors='replace')
+            field_count = len(next(csv.reader([text]), []))
+        else:
+            field_count = record.count(b',') + 1
+
+        if self.header_fields is None:
+            self.header_fields = field_count
+        elif field_count != self.header_fields:
+            self.malformed_rows += 1
+            if len(self.malformed_examples) < self.max_malformed_examples:
+                self.malformed_examples.append({
+                    'record': self.records,
+                    'fields': field_count,
+                    'expected_fields': self.header_fields
+                })
+
+        if self.expected_rows and self.rows > self.expected_rows * (1 + self.row_tolerance):
+            raise UploadValidationError(
+                f"{self.local_path}: more than {self.rows:,} rows, expected "
+                f"{self.expected_rows:,} (tolerance {self.row_tolerance:.0%})"
+            )
+
+    def _finish(self):
+        self._finished = True
+        if self._pending:
+            if self._pending_quotes % 2:
+                # Unterminated quote at end of file
+                self.records += 1
+                self.malformed_rows += 1
+            else:
+                self._finish_record(self._pending)
+            self._pending = b''
+
+        if self.expected_rows and self.rows < self.expected_rows * (1 - self.row_tolerance):
+            raise UploadValidationError(
+                f"{self.local_path}: {self.rows:,} rows, expected {self.expected_rows:,} "
+                f"(tolerance {self.row_tolerance:.0%})"
+            )
+
+
+class CompressedUploadStream:
+    """Compress another upload stream on the fly, with no temporary file.
+
+    Raw bytes are pulled from ``source`` (so its row counts and checksum still
+    describe the uncompressed CSV) and pushed through a gzip or zstd
+    compressor; ``read`` returns compressed bytes. Output is deterministic for
+    a given codec and level, which keeps resumed multipart uploads consistent.
+    """
+
+    def __init__(self, source, codec='gzip', level=None, chunk_size=1024 * 1024):
+        if codec not in COMPRESSION_SUFFIXES:
+            raise ValueError(f"Unsupported compression codec: {codec}")
+        self.source = source
+        self.codec = codec
+        self.level = level if level is not None else DEFAULT_COMPRESSION_LEVELS[codec]
+        self.chunk_size = chunk_size
+        self.local_path = source.local_path
+
+        if codec == 'gzip':
+            # wbits=31 writes a gzip header with a zero mtime
+            self._compressor = zlib.compressobj(self.level, zlib.DEFLATED, 31)
+        else:
+            if zstandard is None:
+                raise ImportError("zstandard not installed. Install with: pip install zstandard")
+            self._compressor = zstandard.ZstdCompressor(level=self.level).compressobj()
+
+        self.compressed_bytes = 0
+        self.compress_seconds = 0.0
+        self._buffer = bytearray()
+        self._eof = False
+
+    @property
+    def variant(self):
+        """Identifies the exact byte stream produced (codec and level)."""
+        return f'{self.codec}-{self.level}'
+
+    def read(self, size=-1):
+        while not self._eof and (size is None or size < 0 or len(self._buffer) < size):
+            raw = self.source.read(self.chunk_size)
+            start = time.perf_counter()
+            if raw:
+                self._buffer += self._compressor.compress(raw)
+            else:
+                self._buffer += self._compressor.flush()
+                self._eof = True
+            self.compress_seconds += time.perf_counter() - start
+
+        if size is None or size < 0:
+            size = len(self._buffer)
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        self.compressed_bytes += len(data)
+        return data
+
+    def close(self):
+        self.source.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def stats(self):
+        """Source stream stats plus compression figures."""
+        stats = self.source.stats()
+        stats.update({
+            'compression': self.codec,
+            'compression_level': self.level,
+            'compressed_bytes': self.compressed_bytes,
+            'compression_ratio': round(stats['bytes'] / self.compressed_bytes, 3) if self.compressed_bytes else None,
+            'compression_seconds': round(self.compress_seconds, 3)
+        })
+        return stats